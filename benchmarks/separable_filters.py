@@ -0,0 +1,65 @@
+"""
+Compare the batched whole-stack path of the separable filters against filtering each tile
+through ImageStack.apply.
+
+Usage: python benchmarks/separable_filters.py [--rounds 4] [--channels 4] [--zlayers 5] ...
+"""
+import argparse
+import time
+from typing import Callable, Sequence, Tuple, Union
+
+import numpy as np
+
+from starfish import ImageStack
+from starfish.image._filter.gaussian_high_pass import GaussianHighPass
+from starfish.image._filter.gaussian_low_pass import GaussianLowPass
+from starfish.image._filter.mean_high_pass import MeanHighPass
+
+
+def best_of(repeats: int, func: Callable[[], object]) -> float:
+    """return the shortest wall-clock time, in seconds, of repeats calls to func"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(args: Sequence[str]=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--zlayers", type=int, default=5)
+    parser.add_argument("--height", type=int, default=1024)
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--n-processes", type=int, default=None)
+    parsed = parser.parse_args(args)
+
+    shape = (parsed.rounds, parsed.channels, parsed.zlayers, parsed.height, parsed.width)
+    stack = ImageStack.from_numpy_array(np.random.rand(*shape).astype(np.float32))
+    print(f"ImageStack of shape {shape} ({stack.numpy_array.nbytes / 2 ** 20:.0f} MiB)")
+
+    filters: Sequence[Tuple[str, Union[GaussianLowPass, GaussianHighPass, MeanHighPass]]] = (
+        ("GaussianLowPass 2d", GaussianLowPass(sigma=2)),
+        ("GaussianLowPass 3d", GaussianLowPass(sigma=(1, 2, 2), is_volume=True)),
+        ("GaussianHighPass 2d", GaussianHighPass(sigma=3)),
+        ("MeanHighPass 2d", MeanHighPass(size=9)),
+        ("MeanHighPass 3d", MeanHighPass(size=(3, 9, 9), is_volume=True)),
+    )
+    executors = ("batch", "serial", "thread", "process")
+
+    print(f"{'filter':<22}" + "".join(f"{executor:>10}" for executor in executors))
+    for name, filter_ in filters:
+        timings = [
+            best_of(parsed.repeats, lambda: filter_.run(
+                stack, in_place=False, verbose=False, n_processes=parsed.n_processes,
+                executor=executor))
+            for executor in executors
+        ]
+        print(f"{name:<22}" + "".join(f"{timing:>9.2f}s" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Measure how the time to concatenate the spots found independently in each (channel, round) of a
+non-multiplex experiment into an IntensityTable scales with the number of spots, and compare it
+against filling the IntensityTable one spot at a time.
+
+Usage: python benchmarks/spot_concatenation.py [--spots 10000 100000 1000000] [--channels 4] ...
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from starfish.intensity_table import IntensityTable
+from starfish.spots._detector.detect import concatenate_spot_attributes_to_intensities
+from starfish.types import Features, Indices, SpotAttributes
+
+
+def best_of(repeats: int, func: Callable[[], object]) -> float:
+    """return the shortest wall-clock time, in seconds, of repeats calls to func"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def random_spot_attributes(
+        n_spots: int, n_ch: int, n_round: int
+) -> List[Tuple[SpotAttributes, Dict[Indices, int]]]:
+    """split n_spots random spots evenly across the (channel, round) pairs of an experiment"""
+    attributes = []
+    for ch in range(n_ch):
+        for round_ in range(n_round):
+            n = n_spots // (n_ch * n_round)
+            spots = pd.DataFrame({
+                'z': np.zeros(n, dtype=int),
+                'y': np.random.randint(0, 2048, n),
+                'x': np.random.randint(0, 2048, n),
+                Features.SPOT_RADIUS: np.random.randint(1, 4, n),
+                'spot_id': np.arange(n),
+                'intensity': np.random.random(n),
+            })
+            attributes.append((SpotAttributes(spots), {Indices.CH: ch, Indices.ROUND: round_}))
+    return attributes
+
+
+def concatenate_by_row(
+        spot_attributes: Sequence[Tuple[SpotAttributes, Dict[Indices, int]]]
+) -> IntensityTable:
+    """the previous implementation, which sets the intensity of one spot at a time"""
+    n_ch: int = max(inds[Indices.CH] for _, inds in spot_attributes) + 1
+    n_round: int = max(inds[Indices.ROUND] for _, inds in spot_attributes) + 1
+    all_spots = pd.concat([sa.data for sa, inds in spot_attributes])
+    features_coordinates = all_spots.drop(['spot_id', 'intensity'], axis=1)
+    intensity_table = IntensityTable.empty_intensity_table(
+        SpotAttributes(features_coordinates), n_ch, n_round,
+    )
+    i = 0
+    for attrs, inds in spot_attributes:
+        for _, row in attrs.data.iterrows():
+            intensity_table[i, inds[Indices.CH], inds[Indices.ROUND]] = row['intensity']
+            i += 1
+    return intensity_table
+
+
+def main(args: Sequence[str]=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spots", type=int, nargs="+", default=[10000, 100000, 1000000, 4000000])
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--max-by-row-spots", type=int, default=10000,
+        help="only time the spot-at-a-time implementation up to this many spots")
+    parsed = parser.parse_args(args)
+
+    print(f"{'spots':>10}{'vectorized':>14}{'us/spot':>10}{'by row':>12}")
+    for n_spots in parsed.spots:
+        attributes = random_spot_attributes(n_spots, parsed.channels, parsed.rounds)
+        vectorized = best_of(
+            parsed.repeats, lambda: concatenate_spot_attributes_to_intensities(attributes))
+        by_row = "-"
+        if n_spots <= parsed.max_by_row_spots:
+            by_row = f"{best_of(1, lambda: concatenate_by_row(attributes)):.2f}s"
+        print(
+            f"{n_spots:>10}{vectorized:>13.3f}s{vectorized / n_spots * 1e6:>10.3f}{by_row:>12}")
+
+
+if __name__ == "__main__":
+    main()
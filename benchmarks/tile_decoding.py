@@ -0,0 +1,108 @@
+"""
+Measure the time to construct an ImageStack from a FOV of 100+ tiles stored on disk, decoding the
+tiles with a single thread and with a pool of threads.
+
+Usage: python benchmarks/tile_decoding.py [--rounds 4] [--channels 4] [--zlayers 8] ...
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from slicedimage import ImageFormat, Writer
+
+from starfish import ImageStack
+from starfish.experiment.builder import build_image, FetchedTile, TileFetcher
+from starfish.types import Coordinates, Indices, Number
+
+
+class NoiseTile(FetchedTile):
+    """uint16 tile of random noise"""
+    def __init__(self, shape: Tuple[int, int]) -> None:
+        super().__init__()
+        self._shape = shape
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def coordinates(self) -> Mapping[Union[str, Coordinates], Union[Number, Tuple[Number, Number]]]:
+        return {
+            Coordinates.X: (0.0, 0.0001),
+            Coordinates.Y: (0.0, 0.0001),
+            Coordinates.Z: (0.0, 0.0001),
+        }
+
+    @property
+    def format(self) -> ImageFormat:
+        return ImageFormat.TIFF
+
+    @property
+    def tile_data(self) -> np.ndarray:
+        return np.random.randint(0, 2 ** 12, size=self._shape, dtype=np.uint16)
+
+
+class NoiseTileFetcher(TileFetcher):
+    def __init__(self, shape: Tuple[int, int]) -> None:
+        self._shape = shape
+
+    def get_tile(self, fov: int, round_: int, ch: int, z: int) -> FetchedTile:
+        return NoiseTile(self._shape)
+
+
+def tile_opener(tileset_path, tile, ext):
+    """name the tile files by their indices, as the tiles share their physical coordinates"""
+    tile_basename = os.path.splitext(tileset_path)[0]
+    return open(
+        f"{tile_basename}-H{tile.indices[Indices.ROUND]}-C{tile.indices[Indices.CH]}"
+        f"-Z{tile.indices[Indices.Z]}.{ext}",
+        "wb")
+
+
+def time_construction(path: str, repeats: int, n_io_workers: Optional[int]) -> float:
+    """return the shortest time, in seconds, to construct the ImageStack stored at path"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        ImageStack.from_path_or_url(path, n_io_workers=n_io_workers)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(args: Sequence[str]=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--zlayers", type=int, default=8)
+    parser.add_argument("--height", type=int, default=1024)
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--n-io-workers", type=int, default=None)
+    parsed = parser.parse_args(args)
+
+    collection = build_image(
+        1, parsed.rounds, parsed.channels, parsed.zlayers,
+        NoiseTileFetcher((parsed.height, parsed.width)))
+    tileset = list(collection.all_tilesets())[0][1]
+    n_tiles = len(tileset.tiles())
+    print(f"{n_tiles} uint16 tiles of shape ({parsed.height}, {parsed.width})")
+
+    with tempfile.TemporaryDirectory() as directory:
+        tiff_path = os.path.join(directory, "hybridization.json")
+        Writer.write_to_path(tileset, tiff_path, pretty=True, tile_opener=tile_opener)
+        zarr_path = os.path.join(directory, "hybridization.zarr")
+        ImageStack.from_path_or_url(tiff_path).write(zarr_path)
+
+        n_workers = parsed.n_io_workers or os.cpu_count()
+        print(f"{'format':<10}{'1 worker':>12}{f'{n_workers} workers':>14}")
+        for name, path in (("tiff", tiff_path), ("zarr", zarr_path)):
+            serial = time_construction(path, parsed.repeats, 1)
+            concurrent = time_construction(path, parsed.repeats, parsed.n_io_workers)
+            print(f"{name:<10}{serial:>11.2f}s{concurrent:>13.2f}s")
+
+
+if __name__ == "__main__":
+    main()
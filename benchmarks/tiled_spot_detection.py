@@ -0,0 +1,79 @@
+"""
+Compare detecting spots in a whole volume with GaussianSpotDetector against detecting them tile
+by tile, reporting the wall-clock time and peak memory of each.
+
+Peak memory is the maximum resident set size of the process running the detection, or of any of
+its worker processes, so each configuration is measured in its own process.
+
+Usage: python benchmarks/tiled_spot_detection.py [--zlayers 20] [--height 1024] ...
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.ndimage.filters import gaussian_filter
+
+from starfish.spots._detector.gaussian import GaussianSpotDetector
+
+
+def synthetic_volume(shape: Tuple[int, int, int], n_spots: int) -> np.ndarray:
+    """a float32 volume of gaussian spots at random positions"""
+    np.random.seed(0)
+    volume = np.zeros(shape, dtype=np.float32)
+    volume[tuple(np.random.randint(0, size, n_spots) for size in shape)] = 1
+    return gaussian_filter(volume, sigma=(1, 2, 2))
+
+
+def detect(
+        shape: Tuple[int, int, int], n_spots: int, tile_size: Optional[int], executor: str,
+        n_processes: Optional[int], queue: multiprocessing.Queue,
+) -> None:
+    volume = synthetic_volume(shape, n_spots)
+    detector = GaussianSpotDetector(
+        min_sigma=1, max_sigma=4, num_sigma=10, threshold=0.002, tile_size=tile_size,
+        executor=executor, n_processes=n_processes)
+    start = time.perf_counter()
+    spots = detector.image_to_spots(volume)
+    elapsed = time.perf_counter() - start
+    # include the worker processes of the process executor, which have exited by now
+    peak_mib = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    ) / 1024
+    queue.put((elapsed, peak_mib, len(spots.data)))
+
+
+def main(args: Sequence[str]=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zlayers", type=int, default=20)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--spots", type=int, default=500)
+    parser.add_argument("--tile-size", type=int, default=128)
+    parser.add_argument("--n-processes", type=int, default=None)
+    parsed = parser.parse_args(args)
+
+    shape = (parsed.zlayers, parsed.height, parsed.width)
+    print(f"volume of shape {shape}, {parsed.spots} spots")
+    configurations = (
+        ("whole volume", None, "serial"),
+        (f"tiles of {parsed.tile_size}, serial", parsed.tile_size, "serial"),
+        (f"tiles of {parsed.tile_size}, process", parsed.tile_size, "process"),
+    )
+    print(f"{'configuration':<28}{'time':>10}{'peak memory':>14}{'spots':>8}")
+    for name, tile_size, executor in configurations:
+        queue: multiprocessing.Queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=detect,
+            args=(shape, parsed.spots, tile_size, executor, parsed.n_processes, queue))
+        process.start()
+        elapsed, peak_mib, n_spots = queue.get()
+        process.join()
+        print(f"{name:<28}{elapsed:>9.2f}s{peak_mib:>10.0f} MiB{n_spots:>8}")
+
+
+if __name__ == "__main__":
+    main()
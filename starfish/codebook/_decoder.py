@@ -0,0 +1,319 @@
+from typing import Tuple
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+EXACT_METRICS = ("euclidean", "cosine")
+"""Metrics for which metric_decode finds the nearest code exactly, with matrix multiplication."""
+
+DEFAULT_MAX_DECODE_BATCH_BYTES = 4 * 1024 * 1024
+"""Bounds the size of the (features, codes) arrays computed at once when decoding exactly. Small
+batches keep these arrays in cache."""
+
+
+def normalize_traces(traces: np.ndarray, norm_order) -> Tuple[np.ndarray, np.ndarray]:
+    """unit normalize each feature of a (n_features, n_ch, n_round) array. Codebooks and
+    IntensityTables are normalized with it by Codebook._normalize_features
+
+    Returns
+    -------
+    np.ndarray :
+        the normalized features
+    np.ndarray :
+        A 1 dimensional numpy array containing the feature norms
+
+    """
+    norm = np.linalg.norm(traces.reshape(traces.shape[0], -1), ord=norm_order, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized = traces / norm[:, None, None]
+
+    # if a feature is all zero, the information should be spread across the channel
+    n = traces.shape[1] * traces.shape[2]
+    partitioned_intensity = np.linalg.norm(np.full(n, fill_value=1 / n), ord=norm_order) / n
+    normalized[np.isnan(normalized)] = partitioned_intensity
+
+    return normalized, norm
+
+
+def prepare_exact_codes(
+        linear_codes: np.ndarray, metric: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """precompute the arrays exact_nearest_codes searches for a (n_codes, n_traces) array of
+    linearized codes
+
+    Returns
+    -------
+    np.ndarray :
+        the codes, unit normalized if metric is cosine
+    np.ndarray :
+        the transpose of the codes, contiguous in memory
+    np.ndarray :
+        the offset subtracted from the inner product of a feature with each code
+
+    """
+    if metric not in EXACT_METRICS:
+        raise ValueError(f"metric must be one of {EXACT_METRICS}, not {metric!r}")
+
+    linear_codes = linear_codes.astype(np.float64)
+    code_norms = np.linalg.norm(linear_codes, axis=1)
+    if metric == "cosine":
+        with np.errstate(divide='ignore', invalid='ignore'):
+            linear_codes = np.nan_to_num(linear_codes / code_norms[:, None])
+        offsets = np.zeros_like(code_norms)
+    else:
+        offsets = code_norms ** 2 / 2
+    return linear_codes, np.ascontiguousarray(linear_codes.T), offsets
+
+
+def exact_nearest_codes(
+        linear_codes: np.ndarray,
+        transposed_codes: np.ndarray,
+        offsets: np.ndarray,
+        linear_features: np.ndarray,
+        metric: str,
+        n_neighbors: int=1,
+        max_batch_bytes: int=DEFAULT_MAX_DECODE_BATCH_BYTES,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """find the indices of the n_neighbors nearest codes of each feature by matrix multiplication
+
+    The nearest code of each feature by euclidean distance maximizes f.c - ||c||^2 / 2, and its
+    nearest code by cosine distance maximizes f.c / ||c||, so the nearest codes of many features
+    are found with one matrix multiplication and an argmax. The distance of each feature to its
+    nearest codes is then computed directly. Features are processed in batches so that each
+    (features, codes) array is at most max_batch_bytes.
+
+    Parameters
+    ----------
+    linear_codes, transposed_codes, offsets : np.ndarray
+        the output of prepare_exact_codes
+    linear_features : np.ndarray
+        (n_features, n_traces) array of linearized features
+    metric : str
+        one of EXACT_METRICS
+    n_neighbors : int
+        the number of closest codes to find for each feature
+    max_batch_bytes : int
+        upper bound on the size of the arrays of inner products computed at once
+
+    Returns
+    -------
+    np.ndarray : metric_output
+        (n_features, n_neighbors) array of the output of metric applied to each feature and its
+        closest codes, in increasing order
+    np.ndarray : indices
+        (n_features, n_neighbors) array of the indices of each feature's closest codes in
+        linear_codes
+
+    Notes
+    -----
+    Ties are broken in favor of the code that comes first in the codebook.
+
+    """
+    n_features, n_codes = linear_features.shape[0], linear_codes.shape[0]
+    metric_output = np.empty((n_features, n_neighbors), dtype=np.float64)
+    indices = np.empty((n_features, n_neighbors), dtype=np.intp)
+    batch_size = max(1, max_batch_bytes // (n_codes * np.dtype(np.float64).itemsize))
+    for start in range(0, n_features, batch_size):
+        batch = linear_features[start:start + batch_size].astype(np.float64)
+        rows = np.arange(batch.shape[0])[:, None]
+        scores = batch @ transposed_codes
+        scores -= offsets
+        if n_neighbors == 1:
+            nearest = np.argmax(scores, axis=1)[:, None]
+        else:
+            candidates = np.argpartition(-scores, n_neighbors - 1, axis=1)[:, :n_neighbors]
+            # rank the candidates by decreasing score, breaking ties in favor of the code that
+            # comes first in the codebook
+            ranks = np.lexsort((candidates, -scores[rows, candidates]))
+            nearest = candidates[rows, ranks]
+        if metric == "euclidean":
+            distances = np.linalg.norm(batch[:, None, :] - linear_codes[nearest], axis=2)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                similarity = scores[rows, nearest] / np.linalg.norm(batch, axis=1)[:, None]
+            distances = 1 - np.nan_to_num(similarity)
+        metric_output[start:start + batch.shape[0]] = distances
+        indices[start:start + batch.shape[0]] = nearest
+
+    return metric_output, indices
+
+
+class CodebookDecoder:
+    """Finds the closest codes of features in a normalized codebook
+
+    Decoders are built by ``Codebook.build_decoder``, which normalizes the codes and prepares the
+    search over them once, so that the decoder can be reused to decode any number of features.
+    Codes are searched exactly by matrix multiplication for the metrics in EXACT_METRICS, and with
+    a ball tree fit to the codes for any other metric. Decoders can be pickled, e.g. to send them
+    to worker processes along with their codebook.
+
+    Parameters
+    ----------
+    norm_codes : np.ndarray
+        (n_codes, n_ch, n_round) array of codes normalized to unit length
+    targets : np.ndarray
+        the target of each code
+    norm_order : int
+        the norm the codes were normalized with, and which the decoder applies to features
+    metric : str
+        the sklearn metric used to compare features to codes
+    """
+
+    def __init__(
+            self, norm_codes: np.ndarray, targets: np.ndarray, norm_order: int, metric: str
+    ) -> None:
+        self._code_shape = norm_codes.shape[1:]
+        self._targets = targets
+        self._norm_order = norm_order
+        self._metric = metric
+
+        linear_codes = norm_codes.reshape(norm_codes.shape[0], -1)
+        if metric in EXACT_METRICS:
+            self._exact_codes = prepare_exact_codes(linear_codes, metric)
+        else:
+            self._tree = NearestNeighbors(
+                n_neighbors=1, algorithm='ball_tree', metric=metric).fit(linear_codes)
+
+    @property
+    def targets(self) -> np.ndarray:
+        return self._targets
+
+    @property
+    def n_codes(self) -> int:
+        return len(self._targets)
+
+    @property
+    def norm_order(self) -> int:
+        return self._norm_order
+
+    @property
+    def metric(self) -> str:
+        return self._metric
+
+    def nearest_codes(
+            self, linear_features: np.ndarray, n_neighbors: int=1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """find the n_neighbors closest codes of each normalized feature
+
+        Parameters
+        ----------
+        linear_features : np.ndarray
+            (n_features, n_ch * n_round) array of normalized features, linearized in the same
+            (ch, round) order as the codes
+        n_neighbors : int
+            the number of closest codes to find for each feature
+
+        Returns
+        -------
+        np.ndarray : metric_output
+            (n_features, n_neighbors) array of the output of metric applied to each feature and its
+            closest codes, in increasing order
+        np.ndarray : indices
+            (n_features, n_neighbors) array of the indices of each feature's closest codes
+
+        """
+        if not 1 <= n_neighbors <= self.n_codes:
+            raise ValueError(
+                f'n_neighbors must be between 1 and the number of codes ({self.n_codes}), not '
+                f'{n_neighbors}')
+
+        if self._metric in EXACT_METRICS:
+            return exact_nearest_codes(
+                *self._exact_codes, linear_features, self._metric, n_neighbors=n_neighbors)
+        return self._tree.kneighbors(linear_features, n_neighbors=n_neighbors)
+
+    def decode_traces(
+            self, traces: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """normalize and find the closest code of each feature of a (n_features, n_ch, n_round)
+        array
+
+        Returns
+        -------
+        np.ndarray :
+            the normalized features
+        np.ndarray :
+            the norm of each feature
+        np.ndarray :
+            the output of metric applied to each feature and its closest code
+        np.ndarray :
+            the index of the closest code of each feature
+
+        """
+        if traces.shape[1:] != self._code_shape:
+            raise ValueError(
+                f'traces of shape {traces.shape[1:]} cannot be decoded with codes of shape '
+                f'{self._code_shape}')
+        normalized, norms = normalize_traces(traces, self._norm_order)
+        metric_output, indices = self.nearest_codes(normalized.reshape(normalized.shape[0], -1))
+        return normalized, norms, metric_output[:, 0], indices[:, 0]
+
+
+class HammingDecoder:
+    """Decodes binarized features by looking up their bits in a table of binary codes
+
+    The table holds the key of every code and of every code with one bit flipped, so a feature
+    whose bits match a code exactly, or match a code after correcting one bit error, is decoded
+    with a single binary search over the sorted keys. Bit patterns that are one bit error away from
+    more than one code cannot be corrected unambiguously, and are left out of the table.
+
+    Parameters
+    ----------
+    binary_codes : np.ndarray
+        (n_codes, n_bits) boolean array of codes. At most 63 bits are supported.
+    """
+
+    MAX_BITS = 63
+
+    def __init__(self, binary_codes: np.ndarray) -> None:
+        n_codes, n_bits = binary_codes.shape
+        if n_bits > self.MAX_BITS:
+            raise ValueError(
+                f'codes of {n_bits} bits are longer than the {self.MAX_BITS} bits supported')
+        self._place_values = np.left_shift(1, np.arange(n_bits, dtype=np.int64))
+
+        binary_codes = binary_codes.astype(bool)
+        flipped_codes = binary_codes[:, None, :] ^ np.eye(n_bits, dtype=bool)[None, :, :]
+        keys = np.concatenate([
+            self.keys(binary_codes), self.keys(flipped_codes.reshape(-1, n_bits))])
+        codes = np.concatenate([np.arange(n_codes), np.repeat(np.arange(n_codes), n_bits)])
+        bit_errors = np.concatenate([
+            np.zeros(n_codes, dtype=np.int8), np.ones(n_codes * n_bits, dtype=np.int8)])
+
+        # for each key, keep the entry with the fewest bit errors, unless another code matches the
+        # key with as few errors
+        order = np.lexsort((codes, bit_errors, keys))
+        keys, codes, bit_errors = keys[order], codes[order], bit_errors[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        tied = np.zeros(len(keys), dtype=bool)
+        tied[:-1] = ~first[1:] & (bit_errors[1:] == bit_errors[:-1])
+        unambiguous = first & ~tied
+
+        self._keys = keys[unambiguous]
+        self._codes = codes[unambiguous]
+        self._bit_errors = bit_errors[unambiguous]
+
+    def keys(self, bits: np.ndarray) -> np.ndarray:
+        """pack each row of a (n, n_bits) boolean array into an int64 key"""
+        return bits.astype(np.int64) @ self._place_values
+
+    def decode(self, bits: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """find the code of each row of a (n_features, n_bits) boolean array
+
+        Returns
+        -------
+        np.ndarray :
+            the index of the code of each feature, or -1 if the feature does not match a code
+            within one bit error
+        np.ndarray :
+            the number of bit errors corrected to match each feature to its code, or -1 if the
+            feature does not match a code
+
+        """
+        feature_keys = self.keys(bits)
+        positions = np.minimum(np.searchsorted(self._keys, feature_keys), len(self._keys) - 1)
+        matched = self._keys[positions] == feature_keys
+        code_indices = np.where(matched, self._codes[positions], -1)
+        bit_errors = np.where(matched, self._bit_errors[positions], -1)
+        return code_indices, bit_errors
@@ -0,0 +1,182 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from starfish.types import Features, Indices
+
+SIDECAR_EXTENSION = ".npz"
+"""Binary sidecars of codebooks are written next to their json file, with this extension appended
+to the json file name."""
+
+
+class SparseCodes(NamedTuple):
+    """Coordinate (COO) representation of the non-zero values of a codebook
+
+    Each non-zero value of the (target, ch, round) codebook tensor is an entry of the target_index,
+    ch, round and value arrays. Codebooks are converted to and from spaceTx code arrays through
+    this representation, so that no Python loop visits the zero values of the codebook, and no
+    xarray indexing is done per entry.
+    """
+    targets: np.ndarray
+    """name of each target, in codebook order"""
+    target_index: np.ndarray
+    """index of the target of each entry"""
+    ch: np.ndarray
+    """channel of each entry"""
+    round: np.ndarray
+    """imaging round of each entry"""
+    value: np.ndarray
+    """value of each entry"""
+    n_ch: int
+    n_round: int
+
+    @classmethod
+    def from_code_array(
+            cls, code_array: List[Dict[str, Any]],
+            n_round: Optional[int]=None, n_ch: Optional[int]=None,
+    ) -> "SparseCodes":
+        """read the entries of a spaceTx-spec array of codewords
+
+        Parameters
+        ----------
+        code_array : List[Dict[str, Any]]
+            Array of dictionaries, each containing a codeword and target
+        n_round : Optional[int]
+            The number of imaging rounds used in the codes. Will be inferred if not provided
+        n_ch : Optional[int]
+            The number of channels used in the codes. Will be inferred if not provided
+
+        """
+        # verify codebook structure and fields
+        required_fields = {Features.CODEWORD, Features.TARGET}
+        for code in code_array:
+            if not isinstance(code, dict):
+                raise ValueError(f'codebook must be an array of dictionary codes. Found: {code}.')
+            missing_fields = required_fields.difference(code)
+            if missing_fields:
+                raise ValueError(
+                    f'Each entry of codebook must contain {required_fields}. Missing fields: '
+                    f'{missing_fields}')
+
+        codewords = [code[Features.CODEWORD] for code in code_array]
+        entries = [entry for codeword in codewords for entry in codeword]
+        target_index = np.repeat(
+            np.arange(len(code_array)), [len(codeword) for codeword in codewords])
+        ch = np.array([entry[Indices.CH] for entry in entries], dtype=np.intp)
+        round_ = np.array([entry[Indices.ROUND] for entry in entries], dtype=np.intp)
+        value = np.array([entry[Features.CODE_VALUE] for entry in entries], dtype=np.float64)
+
+        targets = np.array([code[Features.TARGET] for code in code_array], dtype=object)
+        return cls.from_entries(targets, target_index, ch, round_, value, n_round, n_ch)
+
+    @classmethod
+    def from_entries(
+            cls, targets: np.ndarray, target_index: np.ndarray, ch: np.ndarray,
+            round_: np.ndarray, value: np.ndarray,
+            n_round: Optional[int]=None, n_ch: Optional[int]=None,
+    ) -> "SparseCodes":
+        """build SparseCodes from the coordinates and values of their entries, inferring the
+        number of rounds and channels if they are not provided"""
+        # guess the max round and channel if not provided, otherwise check provided values are valid
+        max_round = int(round_.max()) if len(round_) else 0
+        max_ch = int(ch.max()) if len(ch) else 0
+        n_round = n_round if n_round is not None else max_round + 1
+        n_ch = n_ch if n_ch is not None else max_ch + 1
+        if max_round + 1 > n_round:
+            raise ValueError(
+                f'code detected that requires an imaging round value ({max_round + 1}) that is '
+                f'greater than provided n_round: {n_round}')
+        if max_ch + 1 > n_ch:
+            raise ValueError(
+                f'code detected that requires a channel value ({max_ch + 1}) that is greater '
+                f'than provided n_ch: {n_ch}')
+
+        return cls(targets, target_index, ch, round_, value, n_ch, n_round)
+
+    def to_code_array(self) -> List[Dict[str, Any]]:
+        """build a spaceTx-spec array of codewords from the entries
+
+        The entries of each codeword are in (ch, round) order, and typed as follows:
+        ch, round : int
+        value : float
+        target : str
+
+        """
+        # tolist converts the entries to python ints and floats in one pass
+        entries = [
+            {Indices.CH.value: ch, Indices.ROUND.value: round_, Features.CODE_VALUE: value}
+            for ch, round_, value in zip(
+                self.ch.tolist(), self.round.tolist(), self.value.astype(float).tolist())
+        ]
+        order = np.lexsort((self.round, self.ch, self.target_index))
+        ends = np.cumsum(np.bincount(self.target_index, minlength=len(self.targets))).tolist()
+        starts = [0] + ends[:-1]
+        order_list = order.tolist()
+        return [
+            {
+                Features.CODEWORD: [entries[i] for i in order_list[start:end]],
+                Features.TARGET: str(target),
+            }
+            for target, start, end in zip(self.targets, starts, ends)
+        ]
+
+    @classmethod
+    def from_dense(cls, codes: np.ndarray, targets: Sequence) -> "SparseCodes":
+        """read the non-zero entries of a (target, ch, round) codebook tensor"""
+        target_index, ch, round_ = np.nonzero(codes)
+        return cls(
+            np.asarray(targets, dtype=object), target_index, ch, round_,
+            codes[target_index, ch, round_], codes.shape[1], codes.shape[2])
+
+
+def write_sidecar(path: str, sparse: SparseCodes, json_digest: str) -> None:
+    """Write the entries of a codebook to a binary sidecar of its json file
+
+    The sidecar is an uncompressed npz archive of the entry arrays, which loads without parsing
+    json or building Python objects per entry. It records the digest of the json file it was
+    written with, so that a sidecar that no longer matches its json file is not used.
+
+    Parameters
+    ----------
+    path : str
+        path to write the sidecar to
+    sparse : SparseCodes
+        the entries of the codebook
+    json_digest : str
+        sha256 hex digest of the json file the sidecar accompanies
+    """
+    with open(path, "wb") as fh:
+        np.savez(
+            fh,
+            json_digest=np.array(json_digest),
+            targets=sparse.targets.astype(str),
+            target_index=sparse.target_index,
+            ch=sparse.ch,
+            round=sparse.round,
+            value=sparse.value.astype(np.float64),
+        )
+
+
+def read_sidecar(
+        path: str, json_digest: str, n_round: Optional[int]=None, n_ch: Optional[int]=None,
+) -> Optional[SparseCodes]:
+    """Read the entries of a codebook from a binary sidecar written by write_sidecar
+
+    Returns
+    -------
+    Optional[SparseCodes] :
+        the entries of the codebook, or None if the sidecar was written with a different json file
+
+    """
+    with np.load(path, allow_pickle=False) as sidecar:
+        if str(sidecar["json_digest"]) != json_digest:
+            return None
+        return SparseCodes.from_entries(
+            sidecar["targets"].astype(object),
+            sidecar["target_index"],
+            sidecar["ch"],
+            sidecar["round"],
+            sidecar["value"],
+            n_round,
+            n_ch,
+        )
@@ -1,15 +1,18 @@
+import hashlib
 import json
+import os
 import uuid
 from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 
 import numpy as np
 import pandas as pd
 import xarray as xr
-from sklearn.neighbors import NearestNeighbors
 from slicedimage.io import resolve_path_or_url
 
 from starfish.intensity_table import IntensityTable
 from starfish.types import Features, Indices, Number
+from ._decoder import CodebookDecoder, HammingDecoder, normalize_traces
+from ._sparse import read_sidecar, SIDECAR_EXTENSION, SparseCodes, write_sidecar
 
 
 class Codebook(xr.DataArray):
@@ -46,6 +49,12 @@ class Codebook(xr.DataArray):
     decode_per_round_maximum(intensities)
         find codes that match the per-channel max intensity for each spot in intensities
 
+    decode_binary(intensities, threshold)
+        find the binary code within one bit error of each binarized spot in intensities
+
+    build_decoder(norm_order, metric)
+        build (or reuse) a decoder holding the normalized codes and the index used to search them
+
     code_length()
         return the total length of the codes in the codebook
 
@@ -75,6 +84,10 @@ class Codebook(xr.DataArray):
 
     """
 
+    _decoders: Optional[Dict[Tuple[int, str], Tuple[np.ndarray, CodebookDecoder]]] = None
+    """decoders built by build_decoder, by norm order and metric, with the codes they were built
+    from. Declared on the class so that xarray permits setting it on instances."""
+
     @property
     def code_length(self) -> int:
         """return the length of codes in this codebook"""
@@ -188,58 +201,24 @@ class Codebook(xr.DataArray):
 
         """
 
-        # guess the max round and channel if not provided, otherwise check provided values are valid
-        max_round, max_ch = 0, 0
-
-        for code in code_array:
-            for entry in code[Features.CODEWORD]:
-                max_round = max(max_round, entry[Indices.ROUND])
-                max_ch = max(max_ch, entry[Indices.CH])
-
-        # set n_ch and n_round if either were not provided
-        n_round = n_round if n_round is not None else max_round + 1
-        n_ch = n_ch if n_ch is not None else max_ch + 1
-
-        # raise errors if provided n_round or n_ch are out of range
-        if max_round + 1 > n_round:
-            raise ValueError(
-                f'code detected that requires an imaging round value ({max_round + 1}) that is '
-                f'greater than provided n_round: {max_round}')
-        if max_ch + 1 > n_ch:
-            raise ValueError(
-                f'code detected that requires a channel value ({max_ch + 1}) that is greater '
-                f'than provided n_ch: {n_ch}')
-
-        # verify codebook structure and fields
-        for code in code_array:
-
-            if not isinstance(code, dict):
-                raise ValueError(f'codebook must be an array of dictionary codes. Found: {code}.')
-
-            # verify all necessary fields are present
-            required_fields = {Features.CODEWORD, Features.TARGET}
-            missing_fields = required_fields.difference(code)
-            if missing_fields:
-                raise ValueError(
-                    f'Each entry of codebook must contain {required_fields}. Missing fields: '
-                    f'{missing_fields}')
-
-        target_names = [w[Features.TARGET] for w in code_array]
-        code_data = cls._empty_codebook(target_names, n_ch, n_round)
-
-        # fill the codebook
-        for code_dict in code_array:
-            codeword = code_dict[Features.CODEWORD]
-            target = code_dict[Features.TARGET]
-            for entry in codeword:
-                code_data.loc[target, entry[Indices.CH], entry[Indices.ROUND]] = entry[
-                    Features.CODE_VALUE]
+        return cls._from_sparse(SparseCodes.from_code_array(code_array, n_round, n_ch))
 
+    @classmethod
+    def _from_sparse(cls, sparse: SparseCodes) -> "Codebook":
+        """construct a codebook from the coordinates and values of its non-zero entries"""
+        code_data = cls._empty_codebook(sparse.targets, sparse.n_ch, sparse.n_round)
+        code_data.values[sparse.target_index, sparse.ch, sparse.round] = sparse.value
         return code_data
 
+    def _to_sparse(self) -> SparseCodes:
+        """the coordinates and values of the non-zero entries of the codebook"""
+        codes = self.transpose(Features.TARGET, Indices.CH.value, Indices.ROUND.value)
+        return SparseCodes.from_dense(codes.values, self.indexes[Features.TARGET].values)
+
     @classmethod
     def from_json(
-            cls, json_codebook: str, n_round: Optional[int]=None, n_ch: Optional[int]=None
+            cls, json_codebook: str, n_round: Optional[int]=None, n_ch: Optional[int]=None,
+            use_binary_sidecar: bool=True,
     ) -> "Codebook":
         """Load a codebook from a spaceTx spec-compliant json file or a url pointing to such a file
 
@@ -251,6 +230,10 @@ class Codebook(xr.DataArray):
             The number of imaging rounds used in the codes. Will be inferred if not provided
         n_ch : Optional[int]
             The number of channels used in the codes. Will be inferred if not provided
+        use_binary_sidecar : bool
+            If True (default) and json_codebook is a local file with a binary sidecar written by
+            to_json, the codebook is read from the sidecar instead of by parsing the json file. The
+            sidecar is ignored if the json file has changed since the sidecar was written.
 
         Examples
         --------
@@ -307,10 +290,18 @@ class Codebook(xr.DataArray):
         """
         backend, name, _ = resolve_path_or_url(json_codebook)
         with backend.read_contextmanager(name) as fh:
-            code_array = json.load(fh)
-        return cls.from_code_array(code_array, n_round, n_ch)
+            json_data = fh.read()
 
-    def to_json(self, filename: str) -> None:
+        sidecar_path = json_codebook + SIDECAR_EXTENSION
+        if use_binary_sidecar and os.path.isfile(sidecar_path):
+            sparse = read_sidecar(
+                sidecar_path, hashlib.sha256(json_data).hexdigest(), n_round, n_ch)
+            if sparse is not None:
+                return cls._from_sparse(sparse)
+
+        return cls.from_code_array(json.loads(json_data), n_round, n_ch)
+
+    def to_json(self, filename: str, binary_sidecar: bool=False) -> None:
         """save a codebook to json
 
         Notes
@@ -324,27 +315,19 @@ class Codebook(xr.DataArray):
         ----------
         filename : str
             filename
+        binary_sidecar : bool
+            If True, also write the codebook to a binary sidecar file, named filename with
+            SIDECAR_EXTENSION appended, which from_json loads instead of parsing the json file.
 
         """
-        code_array = []
-        for target in self[Features.TARGET]:
-            codeword = []
-            for ch in self[Indices.CH.value]:
-                for round_ in self[Indices.ROUND.value]:
-                    if self.loc[target, ch, round_]:
-                        codeword.append(
-                            {
-                                Indices.CH.value: int(ch),
-                                Indices.ROUND.value: int(round_),
-                                Features.CODE_VALUE: float(self.loc[target, ch, round_])
-                            })
-            code_array.append({
-                Features.CODEWORD: codeword,
-                Features.TARGET: str(target.values)
-            })
-
-        with open(filename, 'w') as f:
-            json.dump(code_array, f)
+        sparse = self._to_sparse()
+        # encoding the whole array at once uses the C encoder in a single pass
+        json_data = json.dumps(sparse.to_code_array()).encode()
+        with open(filename, 'wb') as f:
+            f.write(json_data)
+        if binary_sidecar:
+            write_sidecar(
+                filename + SIDECAR_EXTENSION, sparse, hashlib.sha256(json_data).hexdigest())
 
     @staticmethod
     def _normalize_features(
@@ -373,54 +356,115 @@ class Codebook(xr.DataArray):
             A 1 dimensional numpy array containing the feature norms
 
         """
-        feature_traces = array.stack(traces=(Indices.CH.value, Indices.ROUND.value))
-        norm = np.linalg.norm(feature_traces.values, ord=norm_order, axis=1)
-        array = array / norm[:, None, None]
+        feature_axis = next(
+            dim for dim in array.dims if dim not in (Indices.CH.value, Indices.ROUND.value))
+        traces = array.transpose(feature_axis, Indices.CH.value, Indices.ROUND.value)
+        normalized_traces, norm = normalize_traces(traces.values, norm_order)
 
-        # if a feature is all zero, the information should be spread across the channel
-        n = array.sizes[Indices.CH.value] * array.sizes[Indices.ROUND.value]
-        partitioned_intensity = np.linalg.norm(np.full(n, fill_value=1 / n), ord=norm_order) / n
-        array = array.fillna(partitioned_intensity)
+        # a shallow copy shares the coordinates of array, and receives the normalized traces
+        normalized = traces.copy(deep=False)
+        normalized.values = normalized_traces
 
-        return array, norm
+        return normalized.transpose(*array.dims), norm
 
-    @staticmethod
-    def _approximate_nearest_code(
-            norm_codes: "Codebook", norm_intensities: xr.DataArray, metric: str,
-    ) -> Tuple[np.ndarray, np.ndarray]:
-        """find the nearest code for each feature using the ball_tree approximate NN algorithm
+    def build_decoder(self, norm_order: int, metric: str='euclidean') -> CodebookDecoder:
+        """Build a reusable decoder that finds the closest codes of features in this codebook
+
+        The decoder holds the codes normalized by norm_order and any index needed to search them
+        by metric, so that decoding many sets of features (e.g. the chunks or fields of view of an
+        experiment) normalizes the codebook and fits the index once. Decoders are memoized on the
+        codebook, and are pickled along with it, so that worker processes decoding fields of view
+        with a codebook whose decoder was built before it was sent to them reuse that decoder.
 
         Parameters
         ----------
-        norm_codes : Codebook
-            codebook with each code normalized to unit length (sum = 1)
-        norm_intensities : IntensityTable
-            intensity table with each feature normalized to unit length (sum = 1)
+        norm_order : int
+            the scipy.linalg norm to apply to normalize codes and intensities
         metric : str
-            the sklearn metric string to pass to NearestNeighbors
+            the sklearn metric string used to compare features to codes
 
         Returns
         -------
-        np.ndarray : metric_output
-            the output of metric applied to each feature closest code
-        np.ndarray : targets
-            the gene that corresponds to each matched code
+        CodebookDecoder :
+            decoder for this codebook
 
-        Notes
-        -----
-        This function does not verify that the intensities have been normalized.
+        """
+        key = (norm_order, metric)
+        if self._decoders is None:
+            self._decoders = {}
+        cached = self._decoders.get(key)
+        # a decoder built before the codebook was modified in place is rebuilt
+        if cached is not None and np.array_equal(cached[0], self.values):
+            return cached[1]
+
+        norm_codes, _ = self._normalize_features(self, norm_order=norm_order)
+        decoder = CodebookDecoder(
+            norm_codes.transpose(Features.TARGET, Indices.CH.value, Indices.ROUND.value).values,
+            self.indexes[Features.TARGET].values,
+            norm_order,
+            metric,
+        )
+        self._decoders[key] = (self.values.copy(), decoder)
+        return decoder
+
+    def _decode_traces(
+            self, traces: np.ndarray, norm_order: int, metric: str,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """normalize and find the closest code of each feature of a (n_features, n_ch, n_round)
+        array, as metric_decode does for an IntensityTable
+
+        Returns
+        -------
+        np.ndarray :
+            the normalized features
+        np.ndarray :
+            the norm of each feature
+        np.ndarray :
+            the output of metric applied to each feature and its closest code
+        np.ndarray :
+            the index of the closest code of each feature along the target axis of the codebook
 
         """
-        linear_codes = norm_codes.stack(traces=(Indices.CH.value, Indices.ROUND.value)).values
-        linear_features = norm_intensities.stack(
-            traces=(Indices.CH.value, Indices.ROUND.value)).values
+        return self.build_decoder(norm_order, metric).decode_traces(traces)
+
+    @staticmethod
+    def _per_round_max_keys(
+            feature_channels: np.ndarray, code_channels: np.ndarray, n_ch: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode the per-round max channels of features and codes as one integer key per row
+
+        Each row of channels is read as the digits of a base-n_ch number. If the number of rounds
+        is too large for these numbers to fit in an int64, the rows are instead numbered by their
+        rank among the distinct rows of both arrays.
+
+        Parameters
+        ----------
+        feature_channels : np.ndarray
+            (n_features, n_round) array of the max channel of each feature in each round
+        code_channels : np.ndarray
+            (n_codes, n_round) array of the max channel of each code in each round
+        n_ch : int
+            number of channels
 
-        # reshape into traces
-        nn = NearestNeighbors(n_neighbors=1, algorithm='ball_tree', metric=metric).fit(linear_codes)
-        metric_output, indices = nn.kneighbors(linear_features)
-        gene_ids = np.ravel(norm_codes.indexes[Features.TARGET].values[indices])
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray] :
+            int64 keys of the features and of the codes. Rows are equal if and only if their keys
+            are equal.
+
+        """
+        n_round = code_channels.shape[1]
+        if n_round * np.log2(max(n_ch, 2)) < 63:
+            place_values = n_ch ** np.arange(n_round, dtype=np.int64)
+            return (
+                feature_channels.astype(np.int64) @ place_values,
+                code_channels.astype(np.int64) @ place_values,
+            )
 
-        return np.ravel(metric_output), gene_ids
+        rows = np.concatenate([feature_channels, code_channels])
+        _, keys = np.unique(rows, axis=0, return_inverse=True)
+        keys = keys.astype(np.int64)
+        return keys[:feature_channels.shape[0]], keys[feature_channels.shape[0]:]
 
     def _validate_decode_intensity_input_matches_codebook_shape(
             self,
@@ -435,7 +479,7 @@ class Codebook(xr.DataArray):
 
     def metric_decode(
             self, intensities: IntensityTable, max_distance: Number, min_intensity: Number,
-            norm_order: int, metric: str='euclidean'
+            norm_order: int, metric: str='euclidean', n_neighbors: int=1,
     ) -> IntensityTable:
         """Assign the closest target by euclidean distance to each feature in an intensity table
 
@@ -454,7 +498,15 @@ class Codebook(xr.DataArray):
         norm_order : int
             the scipy.linalg norm to apply to normalize codes and intensities
         metric : str
-            the sklearn metric string to pass to NearestNeighbors
+            the sklearn metric string to pass to NearestNeighbors. The nearest codes for the metrics
+            in EXACT_METRICS ("euclidean" and "cosine") are found exactly by matrix
+            multiplication; any other metric is passed to a ball tree.
+        n_neighbors : int
+            number of closest codes to find for each feature (default 1). If greater than 1, the
+            targets and distances of the runner-up codes are stored in the coordinates
+            Features.RANKED_TARGET and Features.RANKED_DISTANCE formatted with their rank (2 for
+            the second closest code, and so on), and the difference between the distances of the
+            second closest and closest codes is stored in Features.MARGIN.
 
         See Also
         --------
@@ -465,18 +517,22 @@ class Codebook(xr.DataArray):
         -------
         IntensityTable :
             Intensity table containing normalized intensities, target assignments, distances to
-            the nearest code, and the filtering status of each feature.
+            the nearest code, and the filtering status of each feature. The targets are also stored
+            as integer codes into the targets of the codebook (see IntensityTable.target_codes).
 
         """
 
         self._validate_decode_intensity_input_matches_codebook_shape(intensities)
+        decoder = self.build_decoder(norm_order, metric)
 
-        # normalize both the intensities and the codebook
+        # normalize the intensities; the decoder holds the normalized codebook
         norm_intensities, norms = self._normalize_features(intensities, norm_order=norm_order)
-        norm_codes, _ = self._normalize_features(self, norm_order=norm_order)
 
-        metric_outputs, targets = self._approximate_nearest_code(
-            norm_codes, norm_intensities, metric=metric)
+        linear_features = norm_intensities.transpose(
+            Features.AXIS, Indices.CH.value, Indices.ROUND.value).values
+        ranked_outputs, ranked_indices = decoder.nearest_codes(
+            linear_features.reshape(linear_features.shape[0], -1), n_neighbors)
+        metric_outputs = ranked_outputs[:, 0]
 
         # only targets with low distances and high intensities should be retained
         passes_filters = np.logical_and(
@@ -485,13 +541,27 @@ class Codebook(xr.DataArray):
             dtype=np.bool
         )
 
-        # set targets, distances, and filtering results
-        norm_intensities[Features.TARGET] = (Features.AXIS, targets)
+        # set distances and filtering results
         norm_intensities[Features.DISTANCE] = (Features.AXIS, metric_outputs)
         norm_intensities[Features.PASSES_THRESHOLDS] = (Features.AXIS, passes_filters)
 
-        # norm_intensities is a DataArray, make it back into an IntensityTable
-        return IntensityTable(norm_intensities)
+        # the runner-up codes and the margin by which each feature's closest code won
+        for rank in range(2, n_neighbors + 1):
+            norm_intensities[Features.RANKED_TARGET.format(rank)] = (
+                Features.AXIS,
+                IntensityTable.target_names(ranked_indices[:, rank - 1], decoder.targets),
+            )
+            norm_intensities[Features.RANKED_DISTANCE.format(rank)] = (
+                Features.AXIS, ranked_outputs[:, rank - 1])
+        if n_neighbors > 1:
+            norm_intensities[Features.MARGIN] = (
+                Features.AXIS, ranked_outputs[:, 1] - ranked_outputs[:, 0])
+
+        # norm_intensities is a DataArray, make it back into an IntensityTable, and set targets as
+        # codes into the codebook's targets
+        decoded = IntensityTable(norm_intensities)
+        decoded.set_target_codes(ranked_indices[:, 0], decoder.targets)
+        return decoded
 
     def decode_per_round_max(self, intensities: IntensityTable) -> IntensityTable:
         """decode each feature by selecting the per-imaging-round max-valued channel
@@ -516,30 +586,6 @@ class Codebook(xr.DataArray):
 
         """
 
-        def _view_row_as_element(array: np.ndarray) -> np.ndarray:
-            """view an entire code as a single element
-
-            This view allows vectors (codes) to be compared for equality without need for multiple
-            comparisons by casting the data in each code to a structured dtype that registers as
-            a single value
-
-            Parameters
-            ----------
-            array : np.ndarray
-                2-dimensional numpy array of shape (n_observations, (n_ch * n_round)) where
-                observations may be either features or codes.
-
-            Returns
-            -------
-            np.ndarray :
-                1-dimensional vector of shape n_observations
-
-            """
-            nrows, ncols = array.shape
-            dtype = {'names': ['f{}'.format(i) for i in range(ncols)],
-                     'formats': ncols * [array.dtype]}
-            return array.view(dtype)
-
         self._validate_decode_intensity_input_matches_codebook_shape(intensities)
 
         max_channels = intensities.argmax(Indices.CH.value)
@@ -552,21 +598,79 @@ class Codebook(xr.DataArray):
         round_intensities = intensities.sum(Indices.CH.value)
         distance = 1 - (max_intensities / round_intensities).mean(Indices.ROUND.value)
 
-        a = _view_row_as_element(codes.values.reshape(self.shape[0], -1))
-        b = _view_row_as_element(max_channels.values.reshape(intensities.shape[0], -1))
-
-        targets = np.full(intensities.shape[0], fill_value=np.nan, dtype=object)
+        # encode the per-round max channels of each feature and code as a single integer key, and
+        # join the features to the codes with a binary search over the sorted code keys
+        feature_keys, code_keys = self._per_round_max_keys(
+            max_channels.values, codes.values, self.sizes[Indices.CH.value])
+        # a stable sort places duplicate codes in codebook order, so that the last of them matches
+        code_order = np.argsort(code_keys, kind='mergesort')
+        sorted_code_keys = code_keys[code_order]
+        positions = np.searchsorted(sorted_code_keys, feature_keys, side='right') - 1
+        matched = positions >= 0
+        matched[matched] = sorted_code_keys[positions[matched]] == feature_keys[matched]
 
-        # decode the intensities
-        for i in np.arange(codes.shape[0]):
-            targets[np.where(a[i] == b)[0]] = codes[Features.TARGET][i]
+        code_indices = np.full(intensities.shape[0], fill_value=-1, dtype=np.intp)
+        code_indices[matched] = code_order[positions[matched]]
 
         # a code passes filters if it decodes successfully
-        passes_filters = ~pd.isnull(targets)
+        passes_filters = matched
+
+        intensities.set_target_codes(code_indices, self.indexes[Features.TARGET].values)
+        intensities[Features.DISTANCE] = (Features.AXIS, distance)
+        intensities[Features.PASSES_THRESHOLDS] = (Features.AXIS, passes_filters)
+
+        return intensities
+
+    def decode_binary(
+            self, intensities: IntensityTable, threshold: Union[Number, np.ndarray],
+    ) -> IntensityTable:
+        """decode each feature by binarizing its intensities and looking up the binary code that
+        matches them, correcting up to one bit error
+
+        This decoder is intended for binary codebooks, such as those of MERFISH experiments. Each
+        (channel, round) intensity of a feature is a 1 if it is at least threshold, and a 0
+        otherwise. The resulting bits are packed into an integer and looked up in a table of the
+        codes and of every code with one bit flipped.
+
+        Notes
+        -----
+        - If no code is within one bit error of a feature, or if the feature is one bit error away
+          from more than one code, it will be assigned 'nan' instead of a target value
+        - Codes may be at most 63 bits (channels * rounds) long
+
+        Parameters
+        ----------
+        intensities : IntensityTable
+            features to be decoded
+        threshold : Union[Number, np.ndarray]
+            minimum intensity of an "on" bit. Either a single value, or an (n_ch, n_round) array
+            holding the threshold of each channel and round.
+
+        Returns
+        -------
+        IntensityTable :
+            intensity table containing additional data variables for target assignments, the
+            number of bit errors corrected to decode each feature (as its distance), and whether
+            each feature was decoded by error correction.
+
+        """
+        self._validate_decode_intensity_input_matches_codebook_shape(intensities)
+        if not np.all(np.isin(self.values, (0, 1))):
+            raise ValueError('decode_binary requires a codebook whose values are all 0 or 1')
+
+        traces = (Indices.CH.value, Indices.ROUND.value)
+        codes = self.transpose(Features.TARGET, *traces).values
+        bits = intensities.transpose(Features.AXIS, *traces).values >= threshold
+        code_indices, bit_errors = HammingDecoder(codes.reshape(codes.shape[0], -1)).decode(
+            bits.reshape(bits.shape[0], -1))
+
+        passes_filters = code_indices >= 0
+        distance = np.where(passes_filters, bit_errors, np.nan)
 
-        intensities[Features.TARGET] = (Features.AXIS, targets.astype('U'))
+        intensities.set_target_codes(code_indices, self.indexes[Features.TARGET].values)
         intensities[Features.DISTANCE] = (Features.AXIS, distance)
         intensities[Features.PASSES_THRESHOLDS] = (Features.AXIS, passes_filters)
+        intensities[Features.ERROR_CORRECTED] = (Features.AXIS, bit_errors > 0)
 
         return intensities
 
@@ -631,7 +735,7 @@ class Codebook(xr.DataArray):
         # make a codebook from codewords
         if target_names is None:
             # use a reverse-sorted list of integers as codewords
-            target_names = [uuid.uuid4() for _ in range(n_codes)]
+            target_names = [str(uuid.uuid4()) for _ in range(n_codes)]
         assert n_codes == len(target_names)
 
         codebook = [{Features.CODEWORD: w, Features.TARGET: g}
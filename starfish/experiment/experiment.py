@@ -1,7 +1,30 @@
+import collections
+import copy
 import json
 import os
-from typing import Callable, MutableMapping, MutableSequence, Optional, Sequence, Set, Union
-
+import traceback
+from concurrent.futures import (
+    Executor, FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Hashable,
+    Iterator,
+    MutableMapping,
+    MutableSequence,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 from semantic_version import Version
 from slicedimage import Collection, TileSet
 from slicedimage.io import Reader, resolve_path_or_url, resolve_url
@@ -13,6 +36,111 @@ from validate_sptx import validate_sptx
 from .version import MAX_SUPPORTED_VERSION, MIN_SUPPORTED_VERSION
 
 
+class ImageCache:
+    """
+    Holds the ImageStacks materialized from the TileSets of one or more fields of view.
+
+    Policies
+    -------
+    pinned  Every image is kept once it has been materialized, until it is explicitly discarded.
+            Repeated accesses return the same ImageStack, so in-place changes to it persist.
+    lru     Images are kept until the total size of the kept images exceeds max_bytes, at which
+            point the least recently accessed images are dropped.  An image larger than max_bytes
+            is never kept.
+    none    No image is kept.  Every access materializes a new ImageStack, which is released as
+            soon as the caller drops it.
+
+    Parameters
+    ----------
+    policy : str
+        One of "pinned", "lru" or "none" (default = "pinned").
+    max_bytes : Optional[int]
+        The maximum total size of the image tensors kept by the "lru" policy.  Must only be set
+        for that policy.
+    """
+    POLICIES = ("pinned", "lru", "none")
+
+    def __init__(self, policy: str="pinned", max_bytes: Optional[int]=None) -> None:
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, not {policy!r}")
+        if policy == "lru":
+            if max_bytes is None or max_bytes < 0:
+                raise ValueError("the lru policy requires a non-negative max_bytes")
+        elif max_bytes is not None:
+            raise ValueError(f"max_bytes is only used by the lru policy, not {policy!r}")
+        self._policy = policy
+        self._max_bytes = max_bytes
+        self._nbytes = 0
+        self._stacks: MutableMapping[Hashable, Tuple[ImageStack, int]] = collections.OrderedDict()
+
+    def __repr__(self):
+        return (
+            f"<starfish.ImageCache policy={self._policy} images={len(self)} "
+            f"nbytes={self._nbytes}>")
+
+    def __len__(self) -> int:
+        return len(self._stacks)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._stacks
+
+    @property
+    def policy(self) -> str:
+        return self._policy
+
+    @property
+    def max_bytes(self) -> Optional[int]:
+        return self._max_bytes
+
+    @property
+    def nbytes(self) -> int:
+        """The total size of the image tensors currently kept by the cache."""
+        return self._nbytes
+
+    def get(self, key: Hashable, loader: Callable[[], ImageStack]) -> ImageStack:
+        """Return the ImageStack kept for key, calling loader to materialize it if it is not kept"""
+        try:
+            stack, _ = self._stacks[key]
+        except KeyError:
+            stack = loader()
+            self.put(key, stack)
+        else:
+            self._stacks.move_to_end(key)  # type: ignore
+        return stack
+
+    def put(self, key: Hashable, stack: ImageStack) -> None:
+        """Keep stack for key, if the policy allows it"""
+        self.discard(key)
+        if self._policy == "none":
+            return
+        nbytes = int(np.prod(stack.raw_shape)) * np.dtype(np.float32).itemsize
+        if self._policy == "lru":
+            assert self._max_bytes is not None
+            if nbytes > self._max_bytes:
+                return
+            while self._nbytes + nbytes > self._max_bytes:
+                _, (_, evicted_nbytes) = self._stacks.popitem(last=False)  # type: ignore
+                self._nbytes -= evicted_nbytes
+        self._stacks[key] = (stack, nbytes)
+        self._nbytes += nbytes
+
+    def peek(self, key: Hashable) -> Optional[ImageStack]:
+        """Return the ImageStack kept for key, or None, without counting this as an access"""
+        kept = self._stacks.get(key)
+        return kept[0] if kept is not None else None
+
+    def discard(self, key: Hashable) -> None:
+        """Stop keeping the ImageStack for key, if one is kept"""
+        kept = self._stacks.pop(key, None)
+        if kept is not None:
+            self._nbytes -= kept[1]
+
+    def clear(self) -> None:
+        """Stop keeping every ImageStack"""
+        self._stacks.clear()
+        self._nbytes = 0
+
+
 class FieldOfView:
     """
     This encapsulates a field of view.  It contains the primary image and auxiliary images that are
@@ -26,6 +154,12 @@ class FieldOfView:
                            be None.
     primary_image          The primary image for this field of view.
     auxiliary_image_types  A set of all the auxiliary image types.
+    image_cache            The ImageCache holding the images materialized from TileSets.
+
+    Methods
+    -------
+    load_image             Context manager that yields the primary image, or an auxiliary image,
+                           and releases it from the image cache on exit.
     """
     def __init__(
             self,
@@ -34,6 +168,7 @@ class FieldOfView:
             auxiliary_images: Optional[MutableMapping[str, ImageStack]]=None,
             primary_image_tileset: Optional[TileSet]=None,
             auxiliary_image_tilesets: Optional[MutableMapping[str, TileSet]]=None,
+            image_cache: Optional[ImageCache]=None,
     ) -> None:
         """
         Fields of views can obtain their primary image from either an ImageStack or a TileSet (but
@@ -43,9 +178,12 @@ class FieldOfView:
 
         Note that if the source image is from a TileSet, the decoding of TileSet to ImageStack does
         not happen until the image is accessed.  Be prepared to handle errors when images are
-        accessed.
+        accessed.  The decoded ImageStack is kept according to the policy of image_cache, which may
+        be shared with other fields of view.  If image_cache is None, a new ImageCache with the
+        "pinned" policy is used.
         """
         self._name = name
+        self._image_cache = image_cache if image_cache is not None else ImageCache()
         self._primary_image: Union[ImageStack, TileSet]
         self._auxiliary_images: MutableMapping[str, Union[ImageStack, TileSet]]
         if primary_image is not None:
@@ -82,18 +220,110 @@ class FieldOfView:
 
     @property
     def primary_image(self) -> ImageStack:
-        if isinstance(self._primary_image, TileSet):
-            self._primary_image = ImageStack(self._primary_image)
-        return self._primary_image
+        return self._get_image(None, self._primary_image)
 
     @property
     def auxiliary_image_types(self) -> Set[str]:
         return set(self._auxiliary_images.keys())
 
+    @property
+    def image_cache(self) -> ImageCache:
+        return self._image_cache
+
+    @image_cache.setter
+    def image_cache(self, image_cache: ImageCache) -> None:
+        self._image_cache = image_cache
+
     def __getitem__(self, item) -> ImageStack:
-        if isinstance(self._auxiliary_images[item], TileSet):
-            self._auxiliary_images[item] = ImageStack(self._auxiliary_images[item])
-        return self._auxiliary_images[item]
+        return self._get_image(item, self._auxiliary_images[item])
+
+    @contextmanager
+    def load_image(self, item: Optional[str]=None) -> Iterator[ImageStack]:
+        """
+        Context manager that yields the primary image, or the auxiliary image of type item, and
+        releases it from the image cache on exit, unless it was already cached before entering.
+        This keeps the memory used by a sweep over many fields of view flat, whatever the policy
+        of the image cache.
+
+        Parameters
+        ----------
+        item : Optional[str]
+            The auxiliary image type to load.  If None, loads the primary image.
+        """
+        image = self._primary_image if item is None else self._auxiliary_images[item]
+        key = self._cache_key(item)
+        was_cached = key in self._image_cache
+        try:
+            yield self._get_image(item, image)
+        finally:
+            if not was_cached:
+                self._image_cache.discard(key)
+
+    def _cache_key(self, item: Optional[str]) -> Tuple[str, Optional[str]]:
+        """the key of an image of this FOV in the image cache.  The primary image has item None."""
+        return self._name, item
+
+    def _get_image(self, item: Optional[str], image: Union[ImageStack, TileSet]) -> ImageStack:
+        """return an ImageStack for image, materializing it through the cache if it is a TileSet"""
+        if isinstance(image, ImageStack):
+            return image
+        return self._image_cache.get(self._cache_key(item), lambda: ImageStack(image))
+
+    def _detached(self) -> "FieldOfView":
+        """
+        Return a FieldOfView with the same images as this one.  Images that have not yet been
+        accessed are materialized on the returned FieldOfView only, so they are released when it
+        is.
+        """
+        detached = copy.copy(self)
+        detached._image_cache = ImageCache()
+        for item in [None, *self._auxiliary_images.keys()]:
+            key = self._cache_key(item)
+            stack = self._image_cache.peek(key)
+            if stack is not None:
+                detached._image_cache.put(key, stack)
+        return detached
+
+
+class FovResult(NamedTuple):
+    """
+    The outcome of running a pipeline on a single field of view with Experiment.map_fovs.
+
+    Properties
+    -------
+    name       The name of the FOV.
+    result     The value returned by the pipeline, or None if the pipeline failed.
+    error      The exception raised by the pipeline, or None if the pipeline succeeded.
+    traceback  The formatted traceback of error, or None if the pipeline succeeded.
+    """
+    name: str
+    result: Any
+    error: Optional[BaseException]
+    traceback: Optional[str]
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+def _run_pipeline(pipeline_fn: Callable[[FieldOfView], Any], fov: FieldOfView) -> FovResult:
+    """run pipeline_fn on fov, recording rather than raising any exception it raises"""
+    try:
+        return FovResult(fov.name, pipeline_fn(fov), None, None)
+    except Exception as exc:
+        return FovResult(fov.name, None, exc, traceback.format_exc())
+
+
+class _SerialExecutor(Executor):
+    """Executor that runs each submitted call immediately, in the calling thread"""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
 
 
 class Experiment:
@@ -114,12 +344,18 @@ class Experiment:
     fovs          Given a callable that accepts a FOV, return all the FOVs that the callable returns
                   True when passed the FOV.
     fovs_by_name  Given one or more FOV names, return the FOVs that match those names.
+    map_fovs      Given a callable that accepts a FOV, run it on the FOVs in parallel, yielding a
+                  FovResult for each FOV as it completes.
 
     Properties
     -------
     codebook      Returns the codebook associated with this experiment.
     extras        Returns the extras dictionary associated with this experiment.
+    image_cache   Returns the ImageCache shared by the fields of view of this experiment, if any.
+                  Setting it replaces the image cache of every field of view.
     """
+    EXECUTORS = ("process", "thread", "serial")
+
     def __init__(
             self,
             fovs: Sequence[FieldOfView],
@@ -127,11 +363,15 @@ class Experiment:
             extras: dict,
             *,
             src_doc: dict=None,
+            image_cache: Optional[ImageCache]=None,
     ) -> None:
         self._fovs = fovs
         self._codebook = codebook
         self._extras = extras
         self._src_doc = src_doc
+        self._image_cache: Optional[ImageCache] = None
+        if image_cache is not None:
+            self.image_cache = image_cache
 
     def __repr__(self):
 
@@ -153,7 +393,12 @@ class Experiment:
         return object_repr + fov_repr
 
     @classmethod
-    def from_json(cls, json_url: str, strict: bool=None) -> "Experiment":
+    def from_json(
+            cls,
+            json_url: str,
+            strict: bool=None,
+            image_cache: Optional[ImageCache]=None,
+    ) -> "Experiment":
         """
         Construct an `Experiment` from an experiment.json file format specifier
 
@@ -164,6 +409,10 @@ class Experiment:
         strict : bool
             if true, then all JSON loaded by this method will be
             passed to the appropriate validator
+        image_cache : Optional[ImageCache]
+            The cache shared by all the fields of view of the experiment, which holds the
+            ImageStacks materialized when their images are accessed.  If None, a new ImageCache
+            with the "pinned" policy is used, which keeps every image that is accessed.
 
         Returns
         -------
@@ -218,7 +467,10 @@ class Experiment:
             )
             fovs.append(fov)
 
-        return Experiment(fovs, codebook, extras, src_doc=experiment_document)
+        if image_cache is None:
+            image_cache = ImageCache()
+        return Experiment(
+            fovs, codebook, extras, src_doc=experiment_document, image_cache=image_cache)
 
     @classmethod
     def verify_version(cls, semantic_version_str: str) -> None:
@@ -268,6 +520,123 @@ class Experiment:
         """
         return self.fovs(filter_fn=lambda fov: fov.name in names)
 
+    def map_fovs(
+            self,
+            pipeline_fn: Callable[[FieldOfView], Any],
+            n_workers: Optional[int]=None,
+            executor: str="process",
+            max_in_flight: Optional[int]=None,
+            filter_fn: Callable[[FieldOfView], bool]=lambda _: True,
+    ) -> Iterator[FovResult]:
+        """
+        Run pipeline_fn on each FOV that filter_fn allows, yielding a FovResult for each FOV as
+        soon as its pipeline completes.  Results are therefore yielded in order of completion, not
+        in the order of the FOVs.
+
+        An exception raised by pipeline_fn is recorded on the FovResult of its FOV, and does not
+        stop the pipeline from running on the remaining FOVs.
+
+        If a worker process dies, e.g. because it ran out of memory, every FOV in flight in its pool
+        fails, and the pool is replaced.  The FOV that killed the worker cannot be told apart from
+        the others, so each of these FOVs is run once more, alone, before any other FOV is
+        submitted.  Only a FOV that kills its worker again is reported as failed, with a
+        BrokenProcessPool error.
+
+        Parameters
+        ----------
+        pipeline_fn : Callable[[FieldOfView], Any]
+            Function to run on each FOV.  It is responsible for accessing the images it needs,
+            which are materialized on a copy of the FOV and released once pipeline_fn returns.
+            When executor is "process", pipeline_fn, its return value and the exceptions it raises
+            must be picklable.
+        n_workers : Optional[int]
+            The number of processes or threads to use.  If None, uses the output of
+            os.cpu_count().
+        executor : str
+            How the FOVs are processed (default = "process"):
+
+            - "process": in a pool of worker processes.
+            - "thread": in a pool of threads.  This only runs pipelines concurrently while they
+              release the GIL.
+            - "serial": one after the other, in the calling thread.
+        max_in_flight : Optional[int]
+            The maximum number of FOVs that are being processed at any time, and therefore the
+            maximum number of FOVs whose images are held in memory at once.  If None, uses
+            n_workers.
+        filter_fn : Callable[[FieldOfView], bool]
+            Only FOVs for which filter_fn returns True are processed.
+
+        Yields
+        ------
+        FovResult :
+            the name of a FOV, and the result of pipeline_fn or the exception it raised
+        """
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"executor must be one of {self.EXECUTORS}, not {executor!r}")
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        if max_in_flight is None:
+            max_in_flight = n_workers
+        if n_workers < 1 or max_in_flight < 1:
+            raise ValueError("n_workers and max_in_flight must be at least 1")
+
+        def make_pool() -> Executor:
+            if executor == "process":
+                return ProcessPoolExecutor(n_workers)
+            elif executor == "thread":
+                return ThreadPoolExecutor(n_workers)
+            return _SerialExecutor()
+
+        fovs = iter(self.fovs(filter_fn))
+        # the detached FOV of each future, and whether it is being retried after a worker died
+        in_flight: MutableMapping[Future, Tuple[FieldOfView, bool]] = dict()
+        # FOVs that were in flight when a worker died, which are retried one at a time
+        suspects: Deque[FieldOfView] = collections.deque()
+        pool = make_pool()
+
+        def submit(detached: FieldOfView, retry: bool) -> None:
+            nonlocal pool
+            try:
+                future = pool.submit(_run_pipeline, pipeline_fn, detached)
+            except BrokenProcessPool:
+                pool.shutdown(wait=False)
+                pool = make_pool()
+                future = pool.submit(_run_pipeline, pipeline_fn, detached)
+            in_flight[future] = detached, retry
+
+        try:
+            while True:
+                if not suspects:
+                    # FOVs are only submitted as earlier FOVs complete, so that at most
+                    # max_in_flight FOVs have their images materialized at once.
+                    for fov in fovs:
+                        submit(fov._detached(), False)
+                        if len(in_flight) >= max_in_flight:
+                            break
+                elif len(in_flight) == 0:
+                    # every FOV in flight in the broken pool has completed
+                    submit(suspects.popleft(), True)
+                if len(in_flight) == 0:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    detached, retry = in_flight.pop(future)
+                    try:
+                        fov_result = future.result()
+                    except BrokenProcessPool as exc:
+                        if not retry:
+                            suspects.append(detached)
+                            continue
+                        fov_result = FovResult(detached.name, None, exc, traceback.format_exc())
+                    except Exception as exc:
+                        # the FOV or the outcome of its pipeline could not be transferred between
+                        # processes.
+                        fov_result = FovResult(detached.name, None, exc, traceback.format_exc())
+                    yield fov_result
+        finally:
+            pool.shutdown(wait=True)
+
     def __getitem__(self, item):
         fovs = self.fovs_by_name(item)
         if len(fovs) == 0:
@@ -290,3 +659,13 @@ class Experiment:
     @property
     def extras(self):
         return self._extras
+
+    @property
+    def image_cache(self) -> Optional[ImageCache]:
+        return self._image_cache
+
+    @image_cache.setter
+    def image_cache(self, image_cache: ImageCache) -> None:
+        self._image_cache = image_cache
+        for fov in self._fovs:
+            fov.image_cache = image_cache
@@ -1,8 +1,20 @@
+from typing import Optional
+
 from starfish.imagestack.imagestack import ImageStack
 from starfish.pipeline.algorithmbase import AlgorithmBase
 
 
 class FilterAlgorithmBase(AlgorithmBase):
+
+    # the ImageStack.apply executor used by run when none is specified. Filters whose kernels
+    # release the GIL should run on threads, which avoids the cost of starting worker processes.
+    # Separable filters may instead filter batches of tiles at once, with the "batch" executor.
+    _DEFAULT_EXECUTOR: str = "process"
+
     def run(self, stack: ImageStack) -> ImageStack:
         """Performs filtering on an ImageStack."""
         raise NotImplementedError()
+
+    def _get_executor(self, executor: Optional[str]) -> str:
+        """return executor, or the default executor of this filter if executor is None"""
+        return self._DEFAULT_EXECUTOR if executor is None else executor
@@ -38,6 +38,7 @@ class Bandpass(FilterAlgorithmBase):
         self.is_volume = is_volume
 
     _DEFAULT_TESTING_PARAMETERS = {"lshort": 1, "llong": 3, "threshold": 0.01}
+    _DEFAULT_EXECUTOR = "thread"
 
     @classmethod
     def _add_arguments(cls, group_parser) -> None:
@@ -84,7 +85,7 @@ class Bandpass(FilterAlgorithmBase):
 
     def run(
             self, stack: ImageStack, in_place: bool=False, verbose: bool=False,
-            n_processes: Optional[int]=None
+            n_processes: Optional[int]=None, executor: Optional[str]=None
     ) -> ImageStack:
         """Perform filtering of an image stack
 
@@ -98,6 +99,9 @@ class Bandpass(FilterAlgorithmBase):
             if True, report the filtering progress across the tiles or volumes of the ImageStack
         n_processes : Optional[int]
             Number of parallel processes to devote to calculating the filter
+        executor : Optional[str]
+            The ImageStack.apply executor, one of "process", "thread", or "serial". If None, uses
+            the default executor of this filter.
 
         Returns
         -------
@@ -112,6 +116,7 @@ class Bandpass(FilterAlgorithmBase):
         )
         result = stack.apply(
             bandpass_,
-            verbose=verbose, in_place=in_place, is_volume=self.is_volume, n_processes=n_processes
+            verbose=verbose, in_place=in_place, is_volume=self.is_volume, n_processes=n_processes,
+            executor=self._get_executor(executor)
         )
         return result
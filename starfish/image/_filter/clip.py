@@ -28,6 +28,7 @@ class Clip(FilterAlgorithmBase):
         self.is_volume = is_volume
 
     _DEFAULT_TESTING_PARAMETERS = {"p_min": 0, "p_max": 100}
+    _DEFAULT_EXECUTOR = "thread"
 
     @classmethod
     def _add_arguments(cls, group_parser) -> None:
@@ -66,7 +67,7 @@ class Clip(FilterAlgorithmBase):
 
     def run(
             self, stack: ImageStack, in_place: bool=False, verbose: bool=False,
-            n_processes: Optional[int]=None
+            n_processes: Optional[int]=None, executor: Optional[str]=None
     ) -> ImageStack:
         """Perform filtering of an image stack
 
@@ -80,6 +81,9 @@ class Clip(FilterAlgorithmBase):
             If True, report on the percentage completed (default = False) during processing
         n_processes : Optional[int]
             Number of parallel processes to devote to calculating the filter
+        executor : Optional[str]
+            The ImageStack.apply executor, one of "process", "thread", or "serial". If None, uses
+            the default executor of this filter.
 
         Returns
         -------
@@ -91,6 +95,7 @@ class Clip(FilterAlgorithmBase):
         clip = partial(self._clip, p_min=self.p_min, p_max=self.p_max)
         result = stack.apply(
             clip,
-            is_volume=self.is_volume, verbose=verbose, in_place=in_place, n_processes=n_processes
+            is_volume=self.is_volume, verbose=verbose, in_place=in_place, n_processes=n_processes,
+            executor=self._get_executor(executor)
         )
         return result
@@ -39,6 +39,7 @@ class DeconvolvePSF(FilterAlgorithmBase):
         )
 
     _DEFAULT_TESTING_PARAMETERS = {"num_iter": 1, "sigma": 1}
+    _DEFAULT_EXECUTOR = "thread"
 
     @classmethod
     def _add_arguments(cls, group_parser: argparse.ArgumentParser) -> None:
@@ -140,7 +141,7 @@ class DeconvolvePSF(FilterAlgorithmBase):
 
     def run(
             self, stack: ImageStack, in_place: bool=False, verbose=False,
-            n_processes: Optional[int]=None
+            n_processes: Optional[int]=None, executor: Optional[str]=None
     ) -> ImageStack:
         """Perform filtering of an image stack
 
@@ -154,6 +155,9 @@ class DeconvolvePSF(FilterAlgorithmBase):
             if True, report on the percentage completed during processing (default = False)
         n_processes : Optional[int]
             Number of parallel processes to devote to calculating the filter
+        executor : Optional[str]
+            The ImageStack.apply executor, one of "process", "thread", or "serial". If None, uses
+            the default executor of this filter.
 
         Returns
         -------
@@ -168,6 +172,7 @@ class DeconvolvePSF(FilterAlgorithmBase):
         )
         result = stack.apply(
             func,
-            in_place=in_place, verbose=verbose, n_processes=n_processes
+            in_place=in_place, verbose=verbose, n_processes=n_processes,
+            executor=self._get_executor(executor)
         )
         return result
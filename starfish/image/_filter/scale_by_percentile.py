@@ -26,6 +26,7 @@ class ScaleByPercentile(FilterAlgorithmBase):
         self.is_volume = is_volume
 
     _DEFAULT_TESTING_PARAMETERS = {"p": 0}
+    _DEFAULT_EXECUTOR = "thread"
 
     @classmethod
     def _add_arguments(cls, group_parser) -> None:
@@ -64,7 +65,7 @@ class ScaleByPercentile(FilterAlgorithmBase):
 
     def run(
             self, stack: ImageStack, in_place: bool=False, verbose: bool=False,
-            n_processes: Optional[int]=None
+            n_processes: Optional[int]=None, executor: Optional[str]=None
     ) -> ImageStack:
         """Perform filtering of an image stack
 
@@ -78,6 +79,9 @@ class ScaleByPercentile(FilterAlgorithmBase):
             If True, report on the percentage completed (default = False) during processing
         n_processes : Optional[int]
             Number of parallel processes to devote to calculating the filter
+        executor : Optional[str]
+            The ImageStack.apply executor, one of "process", "thread", or "serial". If None, uses
+            the default executor of this filter.
 
         Returns
         -------
@@ -89,6 +93,7 @@ class ScaleByPercentile(FilterAlgorithmBase):
         clip = partial(self._scale, p=self.p)
         result = stack.apply(
             clip,
-            is_volume=self.is_volume, verbose=verbose, in_place=in_place, n_processes=n_processes
+            is_volume=self.is_volume, verbose=verbose, in_place=in_place, n_processes=n_processes,
+            executor=self._get_executor(executor)
         )
         return result
@@ -35,6 +35,7 @@ class WhiteTophat(FilterAlgorithmBase):
         self.is_volume = is_volume
 
     _DEFAULT_TESTING_PARAMETERS = {"masking_radius": 3}
+    _DEFAULT_EXECUTOR = "thread"
 
     @classmethod
     def _add_arguments(cls, group_parser) -> None:
@@ -51,7 +52,7 @@ class WhiteTophat(FilterAlgorithmBase):
 
     def run(
             self, stack: ImageStack, in_place: bool=False, verbose: bool=False,
-            n_processes: Optional[int]=None
+            n_processes: Optional[int]=None, executor: Optional[str]=None
     ) -> ImageStack:
         """Perform filtering of an image stack
 
@@ -65,6 +66,9 @@ class WhiteTophat(FilterAlgorithmBase):
             If True, report on the percentage completed (default = False) during processing
         n_processes : Optional[int]
             Number of parallel processes to devote to calculating the filter
+        executor : Optional[str]
+            The ImageStack.apply executor, one of "process", "thread", or "serial". If None, uses
+            the default executor of this filter.
 
         Returns
         -------
@@ -75,6 +79,7 @@ class WhiteTophat(FilterAlgorithmBase):
         """
         result = stack.apply(
             self._white_tophat,
-            is_volume=self.is_volume, verbose=verbose, in_place=in_place, n_processes=n_processes
+            is_volume=self.is_volume, verbose=verbose, in_place=in_place, n_processes=n_processes,
+            executor=self._get_executor(executor)
         )
         return result
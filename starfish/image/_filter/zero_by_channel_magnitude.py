@@ -1,5 +1,4 @@
 import argparse
-from copy import deepcopy
 from typing import Optional
 
 import numpy as np
@@ -42,7 +41,8 @@ class ZeroByChannelMagnitude(FilterAlgorithmBase):
 
     def run(
             self, stack: ImageStack,
-            in_place: bool=False, verbose=False, n_processes: Optional[int]=None
+            in_place: bool=False, verbose=False, n_processes: Optional[int]=None,
+            executor: Optional[str]=None
     ) -> ImageStack:
         """Perform filtering of an image stack
 
@@ -56,6 +56,8 @@ class ZeroByChannelMagnitude(FilterAlgorithmBase):
             if True, report on the percentage completed during processing (default = False)
         n_processes : Optional[int]: None
             Not implemented. Number of processes to use when applying filter.
+        executor : Optional[str]
+            Not implemented. The ImageStack.apply executor to use when applying filter.
 
         Returns
         -------
@@ -67,9 +69,8 @@ class ZeroByChannelMagnitude(FilterAlgorithmBase):
         channels_per_round = stack._data.groupby(Indices.ROUND.value)
         channels_per_round = tqdm(channels_per_round) if verbose else channels_per_round
 
-        if not in_place:
-            new_stack = deepcopy(stack)
-            return self.run(new_stack, in_place=True)
+        # the results are written to a new stack that shares the metadata of the input
+        output = stack if in_place else stack._empty_like()
 
         # compute channel magnitude mask
         for r, dat in channels_per_round:
@@ -86,11 +87,11 @@ class ZeroByChannelMagnitude(FilterAlgorithmBase):
             # apply mask and optionally, normalize by channel magnitude
             for c in range(stack.num_chs):
                 ind = {Indices.ROUND.value: r, Indices.CH.value: c}
-                stack._data[ind] = stack._data[ind] * magnitude_mask
+                output._data[ind] = stack._data[ind] * magnitude_mask
 
                 if self.normalize:
-                    stack._data[ind] = np.divide(stack._data[ind],
-                                                 ch_magnitude,
-                                                 where=magnitude_mask
-                                                 )
-        return stack
+                    output._data[ind] = np.divide(output._data[ind],
+                                                  ch_magnitude,
+                                                  where=magnitude_mask
+                                                  )
+        return output
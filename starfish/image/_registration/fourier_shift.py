@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Optional, Tuple, Union
 
 import numpy as np
@@ -65,8 +64,8 @@ class FourierShiftRegistration(RegistrationAlgorithmBase):
 
         """
 
-        if not in_place:
-            image = deepcopy(image)
+        # the registered tiles are written to a new stack that shares the metadata of the input
+        output = image if in_place else image._empty_like()
 
         # TODO: (ambrosejcarr) is this the appropriate way of dealing with Z in registration?
         mp = image.max_proj(Indices.CH, Indices.Z)
@@ -88,10 +87,10 @@ class FourierShiftRegistration(RegistrationAlgorithmBase):
                     result = shift_im(data, shift)
                     result = preserve_float_range(result)
 
-                    image.set_slice(indices=indices, data=result)
+                    output.set_slice(indices=indices, data=result)
 
         if not in_place:
-            return image
+            return output
         return None
 
 
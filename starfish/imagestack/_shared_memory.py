@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+Region = Tuple[Union[int, slice], ...]
+
+_SHARED_MEMORY_DIRECTORY = "/dev/shm"
+"""Scratch arrays are placed on this memory-backed filesystem, if it exists."""
+
+# state of each worker process, set by _initialize_worker
+_worker_array: Optional[np.ndarray] = None
+_worker_func: Optional[Callable] = None
+
+
+class SharedArray:
+    """A numpy array backed by a memory-mapped scratch file, which worker processes can open by
+    path instead of receiving the data through pickling.
+
+    The scratch file is created on a memory-backed filesystem when one with enough free space is
+    available, and is removed when the context manager exits. Views of the array remain valid after
+    the context manager exits.
+
+    Parameters
+    ----------
+    shape : Sequence[int]
+        shape of the array
+    dtype : np.dtype
+        data type of the array
+    """
+
+    def __init__(self, shape: Sequence[int], dtype) -> None:
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        # the scratch file and the array mapping it are created when the context manager is entered
+        self.path: str
+        self.array: np.ndarray
+
+    def __enter__(self) -> "SharedArray":
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        directory: Optional[str] = None
+        if _has_free_space(_SHARED_MEMORY_DIRECTORY, nbytes):
+            directory = _SHARED_MEMORY_DIRECTORY
+        fd, self.path = tempfile.mkstemp(prefix="starfish-", suffix=".dat", dir=directory)
+        os.close(fd)
+        self.array = np.memmap(self.path, dtype=self.dtype, mode='w+', shape=self.shape)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        del self.array
+        os.remove(self.path)
+
+
+def _has_free_space(directory: str, nbytes: int) -> bool:
+    """return True if directory exists and its filesystem can hold nbytes more data"""
+    if not os.path.isdir(directory):
+        return False
+    stats = os.statvfs(directory)
+    return stats.f_bavail * stats.f_frsize >= nbytes
+
+
+def _initialize_worker(path: str, shape: Tuple[int, ...], dtype, func: Callable) -> None:
+    """open the shared array in a worker process"""
+    global _worker_array, _worker_func
+    _worker_array = np.memmap(path, dtype=dtype, mode='r+', shape=shape)
+    _worker_func = func
+
+
+def _apply_to_region(region: Region) -> Region:
+    """apply the worker's function to a region of the shared array, writing the result in place"""
+    _worker_array[region] = _worker_func(_worker_array[region])  # type: ignore
+    return region
+
+
+def apply_in_place(
+        shared: SharedArray,
+        func: Callable,
+        regions: Iterable[Region],
+        n_processes: Optional[int]=None,
+        progress_func: Callable=lambda f: f,
+) -> None:
+    """Apply func to each region of a shared array across a pool of worker processes.
+
+    Only the region indices are sent to the workers. Each worker reads its regions directly from
+    the shared array and writes the results back in place, so neither the input nor the output
+    data is pickled.
+
+    Parameters
+    ----------
+    shared : SharedArray
+        an open SharedArray holding the data to transform
+    func : Callable
+        function to apply to each region. Must return an array of the same shape as the region.
+    regions : Iterable[Region]
+        non-overlapping indexers into the shared array
+    n_processes : Optional[int]
+        The number of processes to use. If None, uses the output of os.cpu_count().
+    progress_func : Callable
+        wraps the iterator of completed regions, e.g. tqdm to report progress
+    """
+    regions = list(regions)
+    initargs = (shared.path, shared.shape, shared.dtype, func)
+    with multiprocessing.Pool(n_processes, _initialize_worker, initargs) as pool:
+        for _ in progress_func(pool.imap_unordered(_apply_to_region, regions)):
+            pass
+
+
+def _map_region(region: Region) -> Any:
+    """return the output of the worker's function for a region of the shared array"""
+    return _worker_func(_worker_array[region])  # type: ignore
+
+
+def map_in_processes(
+        shared: SharedArray,
+        func: Callable,
+        regions: Iterable[Region],
+        n_processes: Optional[int]=None,
+        progress_func: Callable=lambda f: f,
+) -> List[Any]:
+    """Apply func to each region of a shared array across a pool of worker processes, and return
+    the outputs.
+
+    As with apply_in_place, only the region indices are sent to the workers, which read their
+    regions directly from the shared array. Regions may overlap.
+
+    Parameters
+    ----------
+    shared : SharedArray
+        an open SharedArray holding the data to process
+    func : Callable
+        function to apply to each region. Its output is pickled and returned to the caller.
+    regions : Iterable[Region]
+        indexers into the shared array
+    n_processes : Optional[int]
+        The number of processes to use. If None, uses the output of os.cpu_count().
+    progress_func : Callable
+        wraps the iterator of completed regions, e.g. tqdm to report progress
+
+    Returns
+    -------
+    List[Any] :
+        the output of func for each region, in the order of regions
+    """
+    regions = list(regions)
+    initargs = (shared.path, shared.shape, shared.dtype, func)
+    with multiprocessing.Pool(n_processes, _initialize_worker, initargs) as pool:
+        return list(progress_func(pool.imap(_map_region, regions)))
+
+
+def apply_in_threads(
+        array: np.ndarray,
+        func: Callable,
+        regions: Iterable[Region],
+        n_threads: Optional[int]=None,
+        progress_func: Callable=lambda f: f,
+) -> None:
+    """Apply func to each region of an array across a pool of threads, writing the results in
+    place.
+
+    Threads share the array without any copying, but only run concurrently while func releases the
+    GIL, as most scipy.ndimage, scipy.signal and skimage kernels do.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        the data to transform
+    func : Callable
+        function to apply to each region. Must return an array of the same shape as the region.
+    regions : Iterable[Region]
+        non-overlapping indexers into array
+    n_threads : Optional[int]
+        The number of threads to use. If None, uses the output of os.cpu_count().
+    progress_func : Callable
+        wraps the iterator of completed regions, e.g. tqdm to report progress
+    """
+    def apply_to_region(region: Region) -> Region:
+        array[region] = func(array[region])
+        return region
+
+    with ThreadPoolExecutor(n_threads or os.cpu_count()) as pool:
+        for _ in progress_func(pool.map(apply_to_region, regions)):
+            pass
@@ -0,0 +1,146 @@
+import collections
+from typing import Callable, Hashable, MutableMapping, Optional
+
+import numpy as np
+from slicedimage import ImageFormat, Tile
+
+
+def read_tile_data(tile: Tile) -> np.ndarray:
+    """Read the pixel data of a tile without caching it on the tile
+
+    ``Tile.numpy_array`` decodes the tile and keeps the decoded data on the tile for the lifetime
+    of the TileSet. This function reads the data from the tile's source instead, so that the caller
+    decides how long the decoded data is retained. Uncompressed tiles stored on a local disk are
+    served through ``np.memmap`` instead of being read into memory.
+
+    Parameters
+    ----------
+    tile : Tile
+        slicedimage Tile whose data should be read
+
+    Returns
+    -------
+    np.ndarray :
+        2-d array containing the tile's data. May be a read-only memory map.
+
+    """
+    source = tile._source_fh_contextmanager
+    if source is None:
+        # the data has already been decoded, or was set in memory
+        return tile.numpy_array
+
+    read_array: Optional[Callable[[], np.ndarray]] = getattr(source, 'read_array', None)
+    if read_array is not None:
+        # the source decodes the tile itself, e.g. a chunk of a zarr store
+        return read_array()
+
+    path: Optional[str] = getattr(source, 'path', None)
+    if path is not None:
+        memmapped = _memmap_tile(path, tile.tile_format, source)
+        if memmapped is not None:
+            return memmapped
+
+    with source as fh:
+        return tile.tile_format.reader_func(fh)
+
+
+def read_tile_dtype(tile: Tile) -> Optional[np.dtype]:
+    """Determine the data type of a tile from its header, without decoding its pixels
+
+    Parameters
+    ----------
+    tile : Tile
+        slicedimage Tile whose data type should be determined
+
+    Returns
+    -------
+    Optional[np.dtype] :
+        The data type of the tile, or None if it cannot be determined without decoding the tile.
+
+    """
+    source = tile._source_fh_contextmanager
+    if source is None:
+        return tile.numpy_array.dtype
+
+    dtype = getattr(source, 'dtype', None)
+    if dtype is not None:
+        # the source describes the tile itself, e.g. a chunk of a zarr store
+        return np.dtype(dtype)
+
+    path: Optional[str] = getattr(source, 'path', None)
+    if path is None:
+        return None
+
+    if tile.tile_format == ImageFormat.NUMPY:
+        return np.load(path, mmap_mode='r').dtype
+
+    if tile.tile_format == ImageFormat.TIFF:
+        from skimage.external.tifffile import TiffFile
+        with TiffFile(path) as tiff:
+            if len(tiff.series) > 0:
+                return tiff.series[0].dtype
+
+    return None
+
+
+def _memmap_tile(path: str, tile_format: ImageFormat, source) -> Optional[np.ndarray]:
+    """memory map an uncompressed tile stored at path, returning None if this is not possible"""
+    # entering the source verifies the checksum of the file, if one was provided
+    with source:
+        pass
+
+    if tile_format == ImageFormat.NUMPY:
+        return np.load(path, mmap_mode='r')
+
+    if tile_format == ImageFormat.TIFF:
+        from skimage.external.tifffile import TiffFile
+        with TiffFile(path) as tiff:
+            if len(tiff.series) == 0 or tiff.series[0].offset is None:
+                # compressed or non-contiguous data cannot be memory mapped
+                return None
+            return tiff.asarray(memmap=True)
+
+    return None
+
+
+class TileCache:
+    """Bounded least-recently-used cache of decoded tile data
+
+    Parameters
+    ----------
+    max_tiles : int
+        The maximum number of tiles held by the cache. When a tile is added to a full cache, the
+        least recently accessed tile is evicted.
+    """
+
+    def __init__(self, max_tiles: int) -> None:
+        if max_tiles < 1:
+            raise ValueError(f"max_tiles must be at least 1, not {max_tiles}")
+        self._max_tiles = max_tiles
+        self._tiles: MutableMapping[Hashable, np.ndarray] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tiles
+
+    @property
+    def max_tiles(self) -> int:
+        return self._max_tiles
+
+    def get(self, key: Hashable, loader: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the data cached for key, calling loader to produce it if it is not cached"""
+        try:
+            data = self._tiles[key]
+        except KeyError:
+            data = loader()
+            self._tiles[key] = data
+            while len(self._tiles) > self._max_tiles:
+                self._tiles.popitem(last=False)  # type: ignore
+        else:
+            self._tiles.move_to_end(key)  # type: ignore
+        return data
+
+    def clear(self) -> None:
+        self._tiles.clear()
@@ -0,0 +1,223 @@
+"""
+Read and write ImageStacks as Zarr (version 2) directory stores.
+
+The image tensor is stored as a float32 array of shape (n_round, n_ch, n_z, y, x) with one
+zlib-compressed chunk per tile, so that individual tiles can be read (and decompressed) on their
+own, and many tiles can be read or written concurrently. The tile metadata needed to reconstruct
+the ImageStack's TileSet is stored in the array attributes. The stores can be opened with the zarr
+library, but are read and written here with numpy and zlib alone.
+
+See https://zarr.readthedocs.io/en/stable/spec/v2.html
+"""
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Mapping, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+from slicedimage import ImageFormat, Tile, TileSet
+
+from starfish.types import Indices
+
+ZARR_EXTENSION = ".zarr"
+ZARR_FORMAT = 2
+ARRAY_METADATA = ".zarray"
+ATTRIBUTES = ".zattrs"
+DEFAULT_COMPRESSION_LEVEL = 1
+
+
+def is_zarr_store(url_or_path: str) -> bool:
+    """return True if url_or_path refers to a local Zarr array directory"""
+    path = _local_path(url_or_path)
+    return path is not None and os.path.isfile(os.path.join(path, ARRAY_METADATA))
+
+
+def _local_path(url_or_path: str) -> Optional[str]:
+    """return the filesystem path of a path or file:// url, or None if it is any other url"""
+    parsed = urlparse(url_or_path)
+    if parsed.scheme == "file":
+        return parsed.path
+    if parsed.scheme == "" or len(parsed.scheme) == 1:
+        # a single-letter scheme is a windows drive
+        return url_or_path
+    return None
+
+
+def _chunk_key(round_: int, ch: int, zlayer: int) -> str:
+    """the name of the chunk holding a tile, for an array chunked as (1, 1, 1, y, x)"""
+    return f"{round_}.{ch}.{zlayer}.0.0"
+
+
+class ChunkSource:
+    """Reads the data of one tile from a chunk of a Zarr store
+
+    Tiles read from a Zarr store use this in place of the file handle context managers provided by
+    slicedimage. Entering the context manager yields the tile as a .npy file, which slicedimage can
+    decode with ImageFormat.NUMPY, and read_array returns the tile without that conversion.
+    """
+
+    def __init__(
+            self, path: str, dtype: np.dtype, shape: Tuple[int, ...],
+            compressor: Optional[Mapping[str, Any]]
+    ) -> None:
+        self.path = path
+        self.dtype = dtype
+        self.shape = shape
+        self.compressor = compressor
+
+    def read_array(self) -> np.ndarray:
+        """read and decompress the tile"""
+        with open(self.path, "rb") as fh:
+            buffer = fh.read()
+        if self.compressor is not None:
+            buffer = zlib.decompress(buffer)
+        return np.frombuffer(buffer, dtype=self.dtype).reshape(self.shape)
+
+    def __enter__(self):
+        self._fh = BytesIO()
+        np.save(self._fh, self.read_array())
+        self._fh.seek(0)
+        return self._fh
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._fh.close()
+
+
+def write_zarr_store(
+        path: str,
+        data: np.ndarray,
+        image_partition: TileSet,
+        compression_level: int=DEFAULT_COMPRESSION_LEVEL,
+        n_workers: Optional[int]=None,
+) -> None:
+    """Write an image tensor and the metadata of its tiles to a Zarr directory store
+
+    Parameters
+    ----------
+    path : str
+        directory to write the store to. It is created if it does not exist.
+    data : np.ndarray
+        5-d float32 image tensor of shape (n_round, n_ch, n_z, y, x)
+    image_partition : TileSet
+        TileSet describing the tiles of data. A chunk is written for each of its tiles.
+    compression_level : int
+        zlib compression level, from 0 (no compression) to 9 (default = 1)
+    n_workers : Optional[int]
+        The number of threads used to compress and write the chunks. If None, uses the output of
+        os.cpu_count().
+    """
+    os.makedirs(path, exist_ok=True)
+
+    tile_shape = data.shape[-2:]
+    array_metadata = {
+        "zarr_format": ZARR_FORMAT,
+        "shape": list(data.shape),
+        "chunks": [1, 1, 1, *tile_shape],
+        "dtype": data.dtype.str,
+        "compressor": {"id": "zlib", "level": compression_level},
+        "fill_value": 0.0,
+        "order": "C",
+        "filters": None,
+    }
+    tiles = [
+        {
+            "indices": dict(tile.indices),
+            "coordinates": {key: list(value) for key, value in tile.coordinates.items()},
+            "extras": tile.extras,
+        }
+        for tile in image_partition.tiles()
+    ]
+    attributes = {
+        "starfish": {
+            "dimensions": sorted(image_partition.dimensions),
+            "shape": dict(image_partition.shape),
+            "extras": image_partition.extras,
+            "tiles": tiles,
+        }
+    }
+    with open(os.path.join(path, ARRAY_METADATA), "w") as fh:
+        json.dump(array_metadata, fh, indent=4)
+    with open(os.path.join(path, ATTRIBUTES), "w") as fh:
+        json.dump(attributes, fh, indent=4)
+
+    def write_chunk(tile: Tile) -> None:
+        round_ = tile.indices[Indices.ROUND]
+        ch = tile.indices[Indices.CH]
+        zlayer = tile.indices.get(Indices.Z, 0)
+        buffer = np.ascontiguousarray(data[round_, ch, zlayer]).tobytes()
+        with open(os.path.join(path, _chunk_key(round_, ch, zlayer)), "wb") as fh:
+            fh.write(zlib.compress(buffer, compression_level))
+
+    # zlib releases the GIL, so the chunks are compressed and written concurrently
+    with ThreadPoolExecutor(n_workers or os.cpu_count()) as pool:
+        for _ in pool.map(write_chunk, image_partition.tiles()):
+            pass
+
+
+def read_zarr_store(url_or_path: str) -> TileSet:
+    """Read the TileSet stored in a Zarr directory store written by write_zarr_store
+
+    Parameters
+    ----------
+    url_or_path : str
+        path (or file:// url) of the store
+
+    Returns
+    -------
+    TileSet :
+        TileSet whose tiles read their data from the chunks of the store when it is accessed
+    """
+    path = _local_path(url_or_path)
+    if path is None:
+        raise ValueError(f"{url_or_path} is not a local path")
+
+    with open(os.path.join(path, ARRAY_METADATA)) as fh:
+        array_metadata = json.load(fh)
+    with open(os.path.join(path, ATTRIBUTES)) as fh:
+        attributes = json.load(fh)
+
+    if array_metadata["zarr_format"] != ZARR_FORMAT:
+        raise ValueError(f"unsupported zarr format {array_metadata['zarr_format']}")
+    shape: Sequence[int] = array_metadata["shape"]
+    chunks: Sequence[int] = array_metadata["chunks"]
+    compressor = array_metadata["compressor"]
+    if len(shape) != 5 or list(chunks) != [1, 1, 1, *shape[-2:]]:
+        raise ValueError(
+            f"ImageStacks must be stored as 5-d arrays with one chunk per tile, not arrays of "
+            f"shape {shape} with chunks {chunks}")
+    if array_metadata["order"] != "C" or array_metadata["filters"]:
+        raise ValueError("only C-ordered arrays without filters are supported")
+    if compressor is not None and compressor["id"] != "zlib":
+        raise ValueError(f"unsupported compressor {compressor['id']}")
+    if "starfish" not in attributes:
+        raise ValueError(f"{url_or_path} does not contain the metadata of an ImageStack")
+    dtype = np.dtype(array_metadata["dtype"])
+    tile_shape = tuple(shape[-2:])
+
+    metadata = attributes["starfish"]
+    image_partition = TileSet(
+        dimensions=metadata["dimensions"],
+        shape=metadata["shape"],
+        default_tile_shape=tile_shape,
+        default_tile_format=ImageFormat.NUMPY,
+        extras=metadata["extras"],
+    )
+    for tile_metadata in metadata["tiles"]:
+        tile = Tile(
+            tile_metadata["coordinates"],
+            tile_metadata["indices"],
+            tile_shape=tile_shape,
+            extras=tile_metadata["extras"],
+        )
+        indices = tile.indices
+        chunk_path = os.path.join(
+            path,
+            _chunk_key(indices[Indices.ROUND], indices[Indices.CH], indices.get(Indices.Z, 0)))
+        tile.set_source_fh_contextmanager(
+            ChunkSource(chunk_path, dtype, tile_shape, compressor), ImageFormat.NUMPY)
+        image_partition.add_tile(tile)
+
+    return image_partition
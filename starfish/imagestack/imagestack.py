@@ -1,13 +1,13 @@
 import collections
-import multiprocessing
 import os
+import threading
 import warnings
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from itertools import product
 from typing import (
-    Any, Callable, Iterable, Iterator, List, Mapping, MutableSequence, Optional, Sequence, Tuple,
-    Union
+    Any, Callable, Iterable, Iterator, List, Mapping, MutableMapping, MutableSequence, Optional,
+    Sequence, Tuple, Union
 )
 
 import matplotlib.pyplot as plt
@@ -19,7 +19,7 @@ from scipy.ndimage.filters import gaussian_filter
 from scipy.stats import scoreatpercentile
 from skimage import exposure
 from skimage import img_as_float32, img_as_uint
-from slicedimage import Reader, TileSet, Writer
+from slicedimage import Reader, Tile, TileSet, Writer
 from slicedimage.io import resolve_path_or_url
 from tqdm import tqdm
 
@@ -33,9 +33,16 @@ from starfish.types import (
     PHYSICAL_COORDINATE_DIMENSION,
     PhysicalCoordinateTypes,
 )
+from ._shared_memory import apply_in_place, apply_in_threads, SharedArray
+from ._tile_io import read_tile_data, read_tile_dtype, TileCache
+from ._zarr_store import is_zarr_store, read_zarr_store, write_zarr_store, ZARR_EXTENSION
 
 _DimensionMetadata = collections.namedtuple("_DimensionMetadata", ['order', 'required'])
 
+_PROGRESS_BAR_LOCK = threading.Lock()
+"""tqdm does not register and remove progress bars atomically, so ImageStacks that are constructed
+concurrently, e.g. by Experiment.map_fovs, create and close their progress bars under this lock."""
+
 
 class ImageStack:
     """
@@ -62,7 +69,8 @@ class ImageStack:
         retrieve a slice of the image tensor
     set_slice(indices, data, axes=None)
         set a slice of the image tensor
-    apply(func, is_volume=False, in_place=False, verbose=False, n_processes=None)
+    apply(func, is_volume=False, in_place=False, verbose=False, n_processes=None, \
+            executor="process")
         apply a 2d or 3d function across all Tiles in the image tensor
     max_proj(*dims)
         return a max projection over one or more axis of the image tensor
@@ -70,7 +78,7 @@ class ImageStack:
             p_max=None)
         show an interactive, pageable view of the image tensor, or a slice of the image tensor
     write(filepath, tile_opener=None)
-        save the (potentially modified) image tensor to disk
+        save the (potentially modified) image tensor to disk, in spaceTx format or as a zarr store
     """
 
     AXES_DATA: Mapping[Indices, _DimensionMetadata] = {
@@ -79,30 +87,78 @@ class ImageStack:
         Indices.Z: _DimensionMetadata(2, False),
     }
     N_AXES = max(data.order for data in AXES_DATA.values()) + 1
+    DEFAULT_MAX_CACHED_TILES = 64
+    EXECUTORS = ("process", "thread", "serial")
 
-    def __init__(self, image_partition: TileSet) -> None:
+    def __init__(
+            self,
+            image_partition: TileSet,
+            lazy: bool=False,
+            max_cached_tiles: Optional[int]=None,
+            n_io_workers: Optional[int]=None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        image_partition : TileSet
+            TileSet containing the tiles of the field of view
+        lazy : bool
+            If True, tile data is not read when the ImageStack is constructed. Instead, each tile
+            is read and converted to float32 the first time it is accessed (e.g. by get_slice,
+            apply, or max_proj), and held in a bounded least-recently-used cache. Operations that
+            require the complete image tensor (e.g. numpy_array, set_slice) load all the tiles.
+            (default False)
+        max_cached_tiles : Optional[int]
+            The maximum number of decoded tiles held in memory by a lazy ImageStack. If None,
+            uses ImageStack.DEFAULT_MAX_CACHED_TILES. Ignored if lazy is False.
+        n_io_workers : Optional[int]
+            The number of threads used to read and decode tiles concurrently, when the stack is
+            constructed or (if lazy) when all its tiles are loaded. If None, uses the output of
+            os.cpu_count().
+        """
         self._image_partition = image_partition
         self._tile_shape = image_partition.default_tile_shape
+        self._data_array: Optional[xr.DataArray] = None
+        self._tiles_by_index: MutableMapping[Tuple[int, int, int], Tile] = dict()
+        self._tile_cache = TileCache(
+            max_cached_tiles if max_cached_tiles is not None else self.DEFAULT_MAX_CACHED_TILES)
+        self._dtype_kind: Optional[str] = None
+        self._n_io_workers = n_io_workers
 
         # Examine the tiles to figure out the right kind (int, float, etc.) and size.  We require
         # that all the tiles have the same kind of data type, but we do not require that they all
         # have the same size of data type. The # allocated array is the highest size we encounter.
-        kind = None
+        # The data types are read from the tile headers where possible, so that the tiles are
+        # only decoded once, concurrently, when they are placed into the image tensor.
+        # Lazy stacks defer the data type checks until each tile is read.
         max_size = 0
-        for tile in tqdm(self._image_partition.tiles()):
-            dtype = tile.numpy_array.dtype
-            if kind is None:
-                kind = dtype.kind
-            else:
-                if kind != dtype.kind:
-                    raise TypeError("All tiles should have the same kind of dtype")
-            if dtype.itemsize > max_size:
-                max_size = dtype.itemsize
+        tile_dtypes: MutableMapping[Tile, np.dtype] = dict()
+        decoded_tiles: MutableMapping[Tile, np.ndarray] = dict()
+        for tile in self._image_partition.tiles():
+            if not lazy:
+                dtype = read_tile_dtype(tile)
+                if dtype is None:
+                    # the data type can only be determined by decoding the tile
+                    decoded_tiles[tile] = read_tile_data(tile)
+                    dtype = decoded_tiles[tile].dtype
+                tile_dtypes[tile] = dtype
+                if self._dtype_kind is None:
+                    self._dtype_kind = dtype.kind
+                else:
+                    if self._dtype_kind != dtype.kind:
+                        raise TypeError("All tiles should have the same kind of dtype")
+                if dtype.itemsize > max_size:
+                    max_size = dtype.itemsize
             if self._tile_shape is None:
                 self._tile_shape = tile.tile_shape
             elif tile.tile_shape is not None and self._tile_shape != tile.tile_shape:
                 raise ValueError("Starfish does not support tiles that are not identical in shape")
 
+        if self._tile_shape is None:
+            # the tile shape is not recorded in the metadata, so we have to read one of the tiles.
+            first_tile = next(iter(self._image_partition.tiles()))
+            self._tile_shape = read_tile_data(first_tile).shape
+
         shape: MutableSequence[int] = []
         dims: MutableSequence[str] = []
         coordinates_shape: MutableSequence[int] = []
@@ -130,14 +186,17 @@ class ImageStack:
         dims.extend([Indices.Y.value, Indices.X.value])
         coordinates_dimensions.append(PHYSICAL_COORDINATE_DIMENSION)
         coordinates_shape.append(6)
-        # now that we know the tile data type (kind and size), we can allocate the data array.
-        self._data = xr.DataArray(
-            np.zeros(
-                shape=shape,
-                dtype=np.float32,
-            ),
-            dims=dims,
-        )
+        self._raw_shape: Tuple[int, ...] = tuple(shape)
+        self._dims = tuple(dims)
+        if not lazy:
+            # now that we know the tile data type (kind and size), we can allocate the data array.
+            self._data = xr.DataArray(
+                np.zeros(
+                    shape=shape,
+                    dtype=np.float32,
+                ),
+                dims=dims,
+            )
         self._coordinates = xr.DataArray(
             np.empty(
                 shape=coordinates_shape,
@@ -156,24 +215,22 @@ class ImageStack:
             },
         )
 
-        # iterate through the tiles and set the data.
+        # iterate through the tiles and set the coordinates.
         for tile in self._image_partition.tiles():
             h = tile.indices[Indices.ROUND]
             c = tile.indices[Indices.CH]
             zlayer = tile.indices.get(Indices.Z, 0)
-            data = tile.numpy_array
+            self._tiles_by_index[h, c, zlayer] = tile
 
-            if max_size != data.dtype.itemsize:
+            if not lazy and max_size != tile_dtypes[tile].itemsize:
                 warnings.warn(
                     f"Tile "
                     f"(R: {tile.indices[Indices.ROUND]} C: {tile.indices[Indices.CH]} "
                     f"Z: {tile.indices[Indices.Z]}) has "
-                    f"dtype {data.dtype}.  One or more tiles is of a larger dtype "
+                    f"dtype {tile_dtypes[tile]}.  One or more tiles is of a larger dtype "
                     f"{self._data.dtype}.",
                     DataFormatWarning)
 
-            data = img_as_float32(data)
-            self.set_slice(indices={Indices.ROUND: h, Indices.CH: c, Indices.Z: zlayer}, data=data)
             coordinate_selector = {
                 Indices.ROUND.value: h,
                 Indices.CH.value: c,
@@ -192,6 +249,150 @@ class ImageStack:
 
             self._coordinates.loc[coordinate_selector] = np.array(coordinates_values)
 
+        if not lazy:
+            # decode the tiles and place them into the image tensor.
+            self._read_tiles_into(self._data.values, decoded_tiles, verbose=True)
+
+    @property
+    def _data(self) -> xr.DataArray:
+        """The 5-d image tensor. If this is a lazy ImageStack, accessing it loads all the tiles."""
+        if self._data_array is None:
+            self._load_all_tiles()
+        return self._data_array
+
+    @_data.setter
+    def _data(self, data: xr.DataArray) -> None:
+        self._data_array = data
+
+    @property
+    def is_loaded(self) -> bool:
+        """True if the complete image tensor has been read into memory."""
+        return self._data_array is not None
+
+    def _get_tile_data(self, round_: int, ch: int, zlayer: int) -> np.ndarray:
+        """Return the float32 data of a single tile of a lazy ImageStack, reading it through the
+        tile cache. Tiles absent from the TileSet are returned as zeros."""
+        key = (int(round_), int(ch), int(zlayer))
+        tile = self._tiles_by_index.get(key, None)
+        if tile is None:
+            return np.zeros(self._tile_shape, dtype=np.float32)
+
+        return self._tile_cache.get(key, lambda: self._decode_tile(tile))
+
+    def _decode_tile(self, tile: Tile, data: Optional[np.ndarray]=None) -> np.ndarray:
+        """Read a tile (unless its data is provided), verify that its data type and shape match
+        the other tiles, and convert it to float32."""
+        if data is None:
+            data = read_tile_data(tile)
+        if self._dtype_kind is None:
+            self._dtype_kind = data.dtype.kind
+        elif self._dtype_kind != data.dtype.kind:
+            raise TypeError("All tiles should have the same kind of dtype")
+        if data.shape != self._tile_shape:
+            raise ValueError("Starfish does not support tiles that are not identical in shape")
+        return img_as_float32(data)
+
+    def _read_tiles_into(
+            self,
+            array: np.ndarray,
+            decoded_tiles: Optional[Mapping[Tile, np.ndarray]]=None,
+            verbose: bool=False,
+    ) -> None:
+        """Decode every tile of the TileSet concurrently, and place it into array. Tiles absent
+        from the TileSet are set to zero.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            5-d float32 array of shape self.raw_shape
+        decoded_tiles : Optional[Mapping[Tile, np.ndarray]]
+            data of tiles which have already been read
+        verbose : bool
+            If True, report on the number of tiles that have been read (default = False)
+        """
+        if len(self._tiles_by_index) < np.prod(self._raw_shape[:ImageStack.N_AXES]):
+            array[...] = 0
+        decoded: Mapping[Tile, np.ndarray] = decoded_tiles or dict()
+
+        def read_tile(index_and_tile: Tuple[Tuple[int, int, int], Tile]) -> None:
+            (round_, ch, zlayer), tile = index_and_tile
+            array[round_, ch, zlayer] = self._decode_tile(tile, decoded.get(tile, None))
+
+        # decompression and conversion release the GIL, so the tiles are decoded by threads.
+        with ThreadPoolExecutor(self._n_io_workers or os.cpu_count()) as pool:
+            results = pool.map(read_tile, self._tiles_by_index.items())
+            with _PROGRESS_BAR_LOCK:
+                progress = tqdm(total=len(self._tiles_by_index), disable=not verbose)
+            try:
+                for _ in results:
+                    progress.update()
+            finally:
+                with _PROGRESS_BAR_LOCK:
+                    progress.close()
+
+    def _load_all_tiles(self) -> None:
+        """Read every tile of a lazy ImageStack into the 5-d image tensor."""
+        data = np.empty(self._raw_shape, dtype=np.float32)
+        self._read_tiles_into(data)
+        self._data_array = xr.DataArray(data, dims=self._dims)
+        self._tile_cache.clear()
+
+    def _empty_like(self, data: Optional[np.ndarray]=None) -> "ImageStack":
+        """Return a new ImageStack with the same shape and tile metadata as this stack, without
+        copying the image tensor.
+
+        The new stack receives its own tiles, so that writing it to disk does not alter this
+        stack, but the tile coordinates, indices, and extras are shared rather than copied.
+
+        Parameters
+        ----------
+        data : Optional[np.ndarray]
+            float32 array of shape self.raw_shape used as the image tensor of the new stack. If
+            None, an uninitialized array is allocated, and the caller is responsible for filling
+            it.
+
+        Returns
+        -------
+        ImageStack :
+            stack sharing the metadata of this stack
+        """
+        if data is None:
+            data = np.empty(self._raw_shape, dtype=np.float32)
+        elif data.shape != self._raw_shape:
+            raise ValueError(
+                f"data of shape {data.shape} does not match the shape of the ImageStack "
+                f"{self._raw_shape}")
+
+        partition = self._image_partition
+        image_partition = TileSet(
+            dimensions=partition.dimensions,
+            shape=partition.shape,
+            default_tile_shape=self._tile_shape,
+            default_tile_format=partition.default_tile_format,
+            extras=partition.extras,
+        )
+        tiles_by_index: MutableMapping[Tuple[int, int, int], Tile] = dict()
+        for index, tile in self._tiles_by_index.items():
+            new_tile = Tile(
+                tile.coordinates, tile.indices, tile_shape=self._tile_shape, extras=tile.extras)
+            image_partition.add_tile(new_tile)
+            tiles_by_index[index] = new_tile
+
+        # the constructor would decode every tile, so populate the new stack directly.
+        stack = ImageStack.__new__(type(self))
+        stack._image_partition = image_partition
+        stack._tile_shape = self._tile_shape
+        stack._data_array = xr.DataArray(data, dims=self._dims)
+        stack._tiles_by_index = tiles_by_index
+        stack._tile_cache = TileCache(self._tile_cache.max_tiles)
+        stack._dtype_kind = self._dtype_kind
+        stack._n_io_workers = self._n_io_workers
+        stack._raw_shape = self._raw_shape
+        stack._dims = self._dims
+        # the physical coordinates are never modified after construction, so they can be shared.
+        stack._coordinates = self._coordinates
+        return stack
+
     @staticmethod
     def _validate_data_dtype_and_range(data: Union[np.ndarray, xr.DataArray]) -> None:
         """verify that data is of dtype float32 and in range [0, 1]"""
@@ -207,11 +408,13 @@ class ImageStack:
             )
 
     def __repr__(self):
-        shape = ', '.join(f'{k}: {v}' for k, v in self._data.sizes.items())
+        shape = ', '.join(f'{k}: {v}' for k, v in zip(self._dims, self.raw_shape))
         return f"<starfish.ImageStack ({shape})>"
 
     @classmethod
-    def from_url(cls, url: str, baseurl: Optional[str]):
+    def from_url(
+            cls, url: str, baseurl: Optional[str], lazy: bool=False,
+            n_io_workers: Optional[int]=None):
         """
         Constructs an ImageStack object from a URL and a base URL.
 
@@ -228,13 +431,20 @@ class ImageStack:
         baseurl : Optional[str]
             If url is a relative URL, then this must be provided.  If url is an absolute URL, then
             this parameter is ignored.
+        lazy : bool
+            If True, defer reading tile data until it is accessed (default False). See
+            ImageStack.__init__.
+        n_io_workers : Optional[int]
+            The number of threads used to read and decode tiles. See ImageStack.__init__.
         """
         image_partition = Reader.parse_doc(url, baseurl)
 
-        return cls(image_partition)
+        return cls(image_partition, lazy=lazy, n_io_workers=n_io_workers)
 
     @classmethod
-    def from_path_or_url(cls, url_or_path: str) -> "ImageStack":
+    def from_path_or_url(
+            cls, url_or_path: str, lazy: bool=False, n_io_workers: Optional[int]=None
+    ) -> "ImageStack":
         """
         Constructs an ImageStack object from an absolute URL or a filesystem path.
 
@@ -242,13 +452,24 @@ class ImageStack:
           1. url_or_path: file:///Users/starfish-user/images/hybridization.json
           2. url_or_path: /Users/starfish-user/images/hybridization.json
 
+        ImageStacks written as zarr stores (see ImageStack.write) are recognized automatically:
+          3. url_or_path: /Users/starfish-user/images/hybridization.zarr
+
         Parameters
         ----------
         url_or_path : str
             Either an absolute URL or a filesystem path to an imagestack.
+        lazy : bool
+            If True, defer reading tile data until it is accessed (default False). See
+            ImageStack.__init__.
+        n_io_workers : Optional[int]
+            The number of threads used to read and decode tiles. See ImageStack.__init__.
         """
+        if is_zarr_store(url_or_path):
+            return cls(read_zarr_store(url_or_path), lazy=lazy, n_io_workers=n_io_workers)
+
         _, relativeurl, baseurl = resolve_path_or_url(url_or_path)
-        return cls.from_url(relativeurl, baseurl)
+        return cls.from_url(relativeurl, baseurl, lazy=lazy, n_io_workers=n_io_workers)
 
     @classmethod
     def from_numpy_array(cls, array: np.ndarray) -> "ImageStack":
@@ -319,7 +540,10 @@ class ImageStack:
 
         """
         slice_list, axes = self._build_slice_list(indices)
-        result = self._data.values[slice_list]
+        if self._data_array is None:
+            result = self._get_lazy_slice(slice_list)
+        else:
+            result = self._data.values[slice_list]
 
         if result.dtype != np.float32:
             warnings.warn(
@@ -330,6 +554,24 @@ class ImageStack:
 
         return result, axes
 
+    def _get_lazy_slice(self, slice_list: Tuple[Union[int, slice], ...]) -> np.ndarray:
+        """Assemble a slice of a lazy ImageStack from its tiles without loading the other tiles."""
+        selected = [
+            np.arange(size)[selector]
+            for size, selector in zip(self._raw_shape[:ImageStack.N_AXES], slice_list)
+        ]
+        result = np.empty(
+            tuple(np.size(values) for values in selected) + self._tile_shape, dtype=np.float32)
+        for tile_index in product(*(range(np.size(values)) for values in selected)):
+            round_, ch, zlayer = (
+                np.atleast_1d(values)[ix] for values, ix in zip(selected, tile_index))
+            result[tile_index] = self._get_tile_data(round_, ch, zlayer)
+
+        # axes selected with an integer are removed from the result
+        removed_axes = tuple(
+            ix for ix, selector in enumerate(slice_list) if not isinstance(selector, slice))
+        return np.squeeze(result, axis=removed_axes)
+
     def set_slice(
             self,
             indices: Mapping[Indices, Union[int, slice]],
@@ -628,10 +870,21 @@ class ImageStack:
             in_place=False,
             verbose: bool=False,
             n_processes: Optional[int]=None,
+            executor: str="process",
             **kwargs
     ) -> "ImageStack":
         """Apply func over all tiles or volumes in self
 
+        With the process executor, the image tensor is placed in a shared, memory-mapped scratch
+        array. Worker processes receive only the indices of the tiles or volumes they should
+        process, read them directly from the scratch array, and write their results back in place.
+        The thread and serial executors operate on the image tensor directly, and avoid the cost of
+        starting processes, which dominates the runtime of fast functions on small tiles. Threads
+        only run concurrently while func releases the GIL.
+
+        If in_place is False, the results are written to a new ImageStack which shares the tile
+        metadata of this stack, so the image tensor is never copied more than once.
+
         Parameters
         ----------
         func : Callable
@@ -641,14 +894,16 @@ class ImageStack:
         is_volume : bool
             (default False) If True, pass 3d volumes (x, y, z) to func
         in_place : bool
-            (default False) If True, function is executed in place. If n_proc is not 1, the tile or
-            volume will be copied once during execution. If false, a new ImageStack object will be
-            produced.
+            (default False) If True, function is executed in place. If false, a new ImageStack
+            object will be produced.
         verbose : bool
             If True, report on the percentage completed (default = False) during processing
         n_processes : Optional[int]
-            The number of processes to use for apply. If None, uses the output of os.cpu_count()
-            (default = None).
+            The number of processes (or threads) to use for apply. If None, uses the output of
+            os.cpu_count() (default = None).
+        executor : str
+            One of "process", "thread", or "serial": run func in a pool of processes, in a pool of
+            threads, or sequentially in the calling thread (default = "process").
         kwargs : dict
             Additional arguments to pass to func
 
@@ -658,22 +913,9 @@ class ImageStack:
             If inplace is False, return a new ImageStack, otherwise return a reference to the
             original stack with data modified by application of func
         """
-        if not in_place:
-            image_stack = deepcopy(self)
-            return image_stack.apply(
-                func,
-                is_volume=is_volume, in_place=True, verbose=verbose, n_processes=n_processes,
-                **kwargs
-            )
-
-        if is_volume:
-            self._data = self._data.stack(tiles=[Indices.ROUND.value,
-                                                 Indices.CH.value])
-        else:
-            self._data = self._data.stack(tiles=[Indices.ROUND.value,
-                                                 Indices.CH.value,
-                                                 Indices.Z.value])
-        tile_indices = self._data.tiles
+        if executor not in ImageStack.EXECUTORS:
+            raise ValueError(
+                f"executor must be one of {', '.join(ImageStack.EXECUTORS)}, not {executor}")
 
         # set the keyword arguments in the apply function
         applyfunc: Callable = partial(func, **kwargs)
@@ -681,31 +923,50 @@ class ImageStack:
         # set the progress bar function depending on the verbosity request
         progress_func = tqdm if verbose else lambda f: f  # pass-through lambda
 
-        # define the iterable to be mapped
-        tiles = (self._data.sel(tiles=t) for t in tile_indices)
+        # each tile or volume is identified by its position in the image tensor
+        regions = [
+            self._build_slice_list(indices)[0]
+            for indices in self._iter_indices(is_volume=is_volume)
+        ]
 
-        with multiprocessing.Pool(n_processes) as pool:
-            # string all the iterators together
-            results = zip(
-                progress_func(pool.imap(applyfunc, tiles)),
-                tile_indices
-            )
+        if executor == "process":
+            with SharedArray(self.raw_shape, np.float32) as shared:
+                self._read_into(shared.array)
+                apply_in_place(shared, applyfunc, regions, n_processes, progress_func)
 
-            # execute the combined iterator
-            for result, t in results:
-                self._data.loc[{'tiles': t}] = result
-
-        # unstack the data
-        self._data = self._data.unstack('tiles').transpose(
-            Indices.ROUND.value,
-            Indices.CH.value,
-            Indices.Z.value,
-            'y',
-            'x'
-        )
+                # the mapping of the scratch array remains valid after its file is removed
+                result = shared.array.view(np.ndarray)
+        else:
+            if in_place and self._data_array is not None:
+                result = self._data.values
+            else:
+                result = np.empty(self.raw_shape, dtype=np.float32)
+                self._read_into(result)
+
+            if executor == "thread":
+                apply_in_threads(result, applyfunc, regions, n_processes, progress_func)
+            else:
+                for region in progress_func(regions):
+                    result[region] = applyfunc(result[region])
 
+        if not in_place:
+            return self._empty_like(result)
+        if self._data_array is None:
+            self._data = xr.DataArray(result, dims=self._dims)
+        elif result is not self._data.values:
+            self._data.values[...] = result
         return self
 
+    def _read_into(self, array: np.ndarray) -> None:
+        """Copy the image tensor into array. Tiles of a lazy stack are read directly into array,
+        without loading the rest of the stack."""
+        if self._data_array is not None:
+            array[...] = self._data.values
+            return
+
+        self._read_tiles_into(array)
+        self._tile_cache.clear()
+
     def transform(self, func, is_volume=False, verbose=False, **kwargs) -> List[Any]:
         """Apply func over all tiles or volumes in self
 
@@ -794,6 +1055,8 @@ class ImageStack:
         Tuple[int, int, int, int, int] :
             The size of the image tensor
         """
+        if self._data_array is None:
+            return self._raw_shape  # type: ignore
         return self._data.shape
 
     @property
@@ -811,11 +1074,11 @@ class ImageStack:
         # has a bug where this # breaks horribly.  Can't find a bug id to link to, but see
         # https://stackoverflow.com/questions/41207128/how-do-i-specify-ordereddict-k-v-types-for-\
         # mypy-type-annotation
-        result: collections.OrderedDict[Any, str] = collections.OrderedDict()
+        result: collections.OrderedDict[Any, int] = collections.OrderedDict()
         for name, data in ImageStack.AXES_DATA.items():
-            result[name] = self._data.shape[data.order]
-        result['y'] = self._data.shape[-2]
-        result['x'] = self._data.shape[-1]
+            result[name] = self.raw_shape[data.order]
+        result['y'] = self.raw_shape[-2]
+        result['x'] = self.raw_shape[-1]
 
         return result
 
@@ -872,13 +1135,23 @@ class ImageStack:
     def write(self, filepath: str, tile_opener=None) -> None:
         """write the image tensor to disk in spaceTx format
 
+        If filepath ends in .zarr, the image tensor is instead written as a zarr directory store
+        with one compressed chunk per tile. The store is smaller on disk than a file per tile, and
+        a lazy ImageStack reads individual tiles from it quickly, but it is slower to write because
+        every tile is compressed.
+
         Parameters
         ----------
         filepath : str
-            Path + prefix for the images and primary_images.json written by this function
+            Path + prefix for the images and primary_images.json written by this function, or the
+            path of the zarr store
         tile_opener : TODO ttung: doc me.
 
         """
+        if filepath.endswith(ZARR_EXTENSION):
+            write_zarr_store(filepath, self.numpy_array, self._image_partition)
+            return
+
         for tile in self._image_partition.tiles():
             h = tile.indices[Indices.ROUND]
             c = tile.indices[Indices.CH]
@@ -952,9 +1225,25 @@ class ImageStack:
             max projection
 
         """
+        if self._data_array is None and all(dim in ImageStack.AXES_DATA for dim in dims):
+            return self._lazy_max_proj(*dims)
         max_projection = self._data.max([dim.value for dim in dims]).values
         return max_projection
 
+    def _lazy_max_proj(self, *dims: Indices) -> np.ndarray:
+        """Compute a max projection over the categorical axes of a lazy ImageStack one tile at a
+        time."""
+        projected_axes = {ImageStack.AXES_DATA[dim].order for dim in dims}
+        kept_axes = [ix for ix in range(ImageStack.N_AXES) if ix not in projected_axes]
+
+        # ImageStack data is in the range [0, 1], so zero is the identity for the maximum
+        max_projection = np.zeros(
+            tuple(self._raw_shape[ix] for ix in kept_axes) + self._tile_shape, dtype=np.float32)
+        for tile_index in product(*(range(size) for size in self._raw_shape[:ImageStack.N_AXES])):
+            projection_view = max_projection[tuple(tile_index[ix] for ix in kept_axes)]
+            np.maximum(projection_view, self._get_tile_data(*tile_index), out=projection_view)
+        return max_projection
+
     @classmethod
     def synthetic_stack(
             cls,
@@ -1054,7 +1343,8 @@ class ImageStack:
         # make sure requested dimensions are large enough to support intensity values
         indices = zip((Indices.Z.value, Indices.Y.value, Indices.X.value), (num_z, height, width))
         for index, requested_size in indices:
-            required_size = intensities.coords[index].values.max()
+            # coordinates are zero-based, so the dimension must be larger than the maximum
+            required_size = intensities.coords[index].values.max() + 1
             if required_size > requested_size:
                 raise ValueError(
                     f'locations of intensities contained in table exceed the size of requested '
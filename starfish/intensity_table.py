@@ -1,5 +1,5 @@
-from itertools import product
-from typing import Dict, Union
+import json
+from typing import Dict, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -8,6 +8,10 @@ import xarray as xr
 from starfish.image._filter.util import preserve_float_range
 from starfish.types import Features, Indices, SpotAttributes
 
+TARGET_NAMES_ATTRIBUTE = 'target_names'
+"""The names of the targets that the Features.TARGET_CODE coordinate of an IntensityTable indexes
+are stored in this attribute of the IntensityTable."""
+
 
 class IntensityTable(xr.DataArray):
     """Container for spot/pixel features extracted from image data
@@ -59,7 +63,10 @@ class IntensityTable(xr.DataArray):
         - r          (features) float64 nan nan
         * c          (c) int64 0 1 2
         * h          (h) int64 0 1 2 3
+          target_code  (features) int64 1 0
           target     (features) object 08b1a822-a1b4-4e06-81ea-8a4bd2b004a9 ...
+        Attributes:
+            target_names:  ['08b1a822-a1b4-4e06-81ea-8a4bd2b004a9' ...
 
     """
 
@@ -161,16 +168,90 @@ class IntensityTable(xr.DataArray):
         intensities = cls(intensities, coords, dims, *args, **kwargs)
         return intensities
 
+    @staticmethod
+    def target_names(codes: np.ndarray, names: np.ndarray) -> np.ndarray:
+        """Return the names of the targets that integer target codes refer to
+
+        Parameters
+        ----------
+        codes : np.ndarray[int]
+            index of the target of each feature in names, or -1 if the feature did not decode
+        names : np.ndarray
+            names of the targets, e.g. the targets of a codebook in codebook order
+
+        Returns
+        -------
+        np.ndarray :
+            name of the target of each feature, or 'nan' if the feature did not decode. Features
+            with the same target share one name object.
+
+        """
+        # the extra last name decodes code -1
+        return np.append(np.asarray(names, dtype=object), 'nan')[codes]
+
+    def set_target_codes(self, codes: np.ndarray, names: np.ndarray) -> None:
+        """Assign the targets of the features as integer codes into a table of target names
+
+        The codes are stored in the Features.TARGET_CODE coordinate, and the names in the
+        TARGET_NAMES_ATTRIBUTE attribute of the IntensityTable. The names of the targets of the
+        features are stored in the Features.TARGET coordinate.
+
+        Parameters
+        ----------
+        codes : np.ndarray[int]
+            index of the target of each feature in names, or -1 if the feature did not decode
+        names : np.ndarray
+            names of the targets, e.g. the targets of a codebook in codebook order
+
+        """
+        codes = np.asarray(codes)
+        names = np.asarray(names, dtype=object)
+        self[Features.TARGET_CODE] = (Features.AXIS, codes)
+        self[Features.TARGET] = (Features.AXIS, self.target_names(codes, names))
+        self.attrs[TARGET_NAMES_ATTRIBUTE] = names
+
+    def target_codes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the targets of the features as integer codes into a table of target names
+
+        Targets assigned by the decoders are stored as codes (see set_target_codes), and are
+        returned without reading the target name of each feature. Otherwise, the Features.TARGET
+        coordinate is factorized.
+
+        Returns
+        -------
+        np.ndarray[int] :
+            index of the target of each feature in the names, or -1 if the feature did not decode
+        np.ndarray :
+            names of the targets
+
+        """
+        if Features.TARGET_CODE in self.coords and TARGET_NAMES_ATTRIBUTE in self.attrs:
+            return self[Features.TARGET_CODE].values, self.attrs[TARGET_NAMES_ATTRIBUTE]
+
+        codes, names = pd.factorize(self[Features.TARGET].values)
+        names = np.asarray(names)
+        codes = np.where(names[codes] == 'nan', -1, codes) if len(names) else codes
+        return codes, names
+
     def save(self, filename: str) -> None:
         """Save an IntensityTable as a Netcdf File
 
+        If the targets are stored as codes, only the codes are saved, and the target names are
+        saved once, as a json array in the TARGET_NAMES_ATTRIBUTE attribute.
+
         Parameters
         ----------
         filename : str
             Name of Netcdf file
 
         """
-        self.to_netcdf(filename)
+        intensity_table = self
+        if TARGET_NAMES_ATTRIBUTE in self.attrs:
+            intensity_table = self.drop(Features.TARGET).assign_attrs(**{
+                TARGET_NAMES_ATTRIBUTE: json.dumps(
+                    [str(target) for target in self.attrs[TARGET_NAMES_ATTRIBUTE]]),
+            })
+        intensity_table.to_netcdf(filename)
 
     @classmethod
     def load(cls, filename: str) -> "IntensityTable":
@@ -192,6 +273,11 @@ class IntensityTable(xr.DataArray):
             loaded.coords,
             loaded.dims
         )
+        if TARGET_NAMES_ATTRIBUTE in loaded.attrs:
+            intensity_table.set_target_codes(
+                loaded[Features.TARGET_CODE].values,
+                np.array(json.loads(loaded.attrs[TARGET_NAMES_ATTRIBUTE]), dtype=object),
+            )
         return intensity_table
 
     def show(self, background_image: np.ndarray) -> None:
@@ -246,9 +332,9 @@ class IntensityTable(xr.DataArray):
         # empty data tensor
         data = np.zeros(shape=(n_spots, *codebook.shape[1:]))
 
-        targets = np.random.choice(
-            codebook.coords[Features.TARGET], size=n_spots, replace=True)
-        expected_bright_locations = np.where(codebook.loc[targets])
+        target_names = codebook.indexes[Features.TARGET].values
+        codes = np.random.choice(len(target_names), size=n_spots, replace=True)
+        expected_bright_locations = np.where(codebook[codes])
 
         # create a binary matrix where "on" spots are 1
         data[expected_bright_locations] = 1
@@ -262,7 +348,7 @@ class IntensityTable(xr.DataArray):
         assert 0 < data.max() <= 1
 
         intensities = cls.from_spot_data(data, spot_attributes)
-        intensities[Features.TARGET] = (Features.AXIS, targets)
+        intensities.set_target_codes(codes, target_names)
 
         return intensities
 
@@ -274,6 +360,10 @@ class IntensityTable(xr.DataArray):
     ) -> "IntensityTable":
         """Generate an IntensityTable from all the pixels in the ImageStack
 
+        The IntensityTable is backed by the ImageStack's raster: its intensities are a view of the
+        ImageStack's data whenever y and x are not cropped. The z, y and x coordinates of its pixels
+        are computed from the shape and crop of the raster as int32 arrays.
+
         Parameters
         ----------
         crop_x : int
@@ -305,27 +395,30 @@ class IntensityTable(xr.DataArray):
         xmax = image_stack.shape['x'] - crop_x
         data = image_stack.numpy_array.transpose(2, 3, 4, 1, 0)  # (z, y, x, ch, round)
 
-        # crop and reshape imagestack to create IntensityTable data
+        # crop and reshape imagestack to create IntensityTable data. This is a view of the
+        # ImageStack's data unless the pixels of the cropped image are not contiguous, i.e. if y or
+        # x are cropped.
         cropped_data = data[zmin:zmax, ymin:ymax, xmin:xmax, :, :]
         # (pixels, ch, round)
         intensity_data = cropped_data.reshape(-1, image_stack.num_chs, image_stack.num_rounds)
 
-        # IntensityTable pixel coordinates
-        z = np.arange(zmin, zmax)
-        y = np.arange(ymin, ymax)
-        x = np.arange(xmin, xmax)
-
-        feature_attribute_data = pd.DataFrame(
-            data=np.array(list(product(z, y, x))),
-            columns=['z', 'y', 'x']
-        )
-        feature_attribute_data[Features.SPOT_RADIUS] = np.full(
-            feature_attribute_data.shape[0], fill_value=0.5
-        )
-
-        pixel_coordinates = SpotAttributes(feature_attribute_data)
+        # the pixel coordinates are implied by the raster order of the features
+        n_pixels = intensity_data.shape[0]
+        pixel_coordinates = np.indices(
+            (zmax - zmin, ymax - ymin, xmax - xmin), dtype=np.int32).reshape(3, n_pixels)
+        pixel_coordinates += np.array([[zmin], [ymin], [xmin]], dtype=np.int32)
+        coords = {
+            Features.AXIS: pd.RangeIndex(n_pixels),
+            Indices.CH.value: np.arange(image_stack.num_chs),
+            Indices.ROUND.value: np.arange(image_stack.num_rounds),
+            Indices.Z.value: (Features.AXIS, pixel_coordinates[0]),
+            Indices.Y.value: (Features.AXIS, pixel_coordinates[1]),
+            Indices.X.value: (Features.AXIS, pixel_coordinates[2]),
+            Features.SPOT_RADIUS: (Features.AXIS, np.full(n_pixels, 0.5, dtype=np.float32)),
+        }
+        dims = (Features.AXIS, Indices.CH.value, Indices.ROUND.value)
 
-        return IntensityTable.from_spot_data(intensity_data, pixel_coordinates)
+        return cls(intensity_data, coords, dims)
 
     def to_features_dataframe(self) -> pd.DataFrame:
         """Generates a dataframe of the underlying features multi-index.
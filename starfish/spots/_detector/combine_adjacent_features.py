@@ -1,12 +1,10 @@
 from functools import partial
-from multiprocessing import Pool
-from typing import Dict, List, NamedTuple, Optional, Tuple
+from typing import Callable, List, NamedTuple, Tuple
 
 import numpy as np
 import pandas as pd
+import xarray as xr
 from skimage.measure import label, regionprops
-from skimage.measure._regionprops import _RegionProperties
-from tqdm import tqdm
 
 from starfish.intensity_table import IntensityTable
 from starfish.types import Features, Indices, Number, SpotAttributes
@@ -25,21 +23,108 @@ class TargetsMap:
         Creates an invertible mapping between string names of Codebook targets and integer IDs
         that can be interpreted by skimage.measure to decode an image.
 
+        Targets are numbered by their sorted order, starting at 1; 'nan' is always mapped to 0.
+
         Parameters
         ----------
         targets : np.ndarray
             array of string target IDs
 
         """
-        unique_targets = set(targets) - {'nan'}
-        sorted_targets = sorted(unique_targets)
-        self._int_to_target = dict(zip(range(1, np.iinfo(np.int).max), sorted_targets))
-        self._int_to_target[0] = 'nan'
-        self._target_to_int = {v: k for (k, v) in self._int_to_target.items()}
+        targets = np.ravel(targets)
+        # pandas returns the unique values as objects; keep string targets as strings
+        unique_targets = np.sort(pd.unique(targets)).astype(targets.dtype)
+        sorted_targets = unique_targets[unique_targets != 'nan']
+        # concatenation promotes the dtype of string targets to hold 'nan'
+        self._int_to_target = np.concatenate([np.array(['nan']), sorted_targets])
+        self._target_to_int = {v: k for (k, v) in enumerate(self._int_to_target)}
+
+    @classmethod
+    def from_code_indices(
+            cls, code_targets: np.ndarray, code_indices: np.ndarray
+    ) -> Tuple["TargetsMap", np.ndarray]:
+        """Create a TargetsMap of the targets that features decoded to, and map the codebook
+        indices of the features directly onto integer target IDs, without creating the target
+        name of each feature.
+
+        Parameters
+        ----------
+        code_targets : np.ndarray
+            the target of each code, in codebook order
+        code_indices : np.ndarray[int]
+            array of the index of the code each feature decoded to, or -1 if the feature did not
+            decode
+
+        Returns
+        -------
+        TargetsMap :
+            mapping between the names of the decoded targets and their integer IDs
+        np.ndarray[int] :
+            array of the same shape as code_indices, holding the integer ID of the target of each
+            feature. Features that did not decode are mapped to 0.
+
+        """
+        target_map = cls(code_targets[cls._decoded_codes(code_indices, len(code_targets))])
+        return target_map, target_map.codes_as_int(code_indices, code_targets)
+
+    @staticmethod
+    def _decoded_codes(code_indices: np.ndarray, n_codes: int) -> np.ndarray:
+        """the sorted indices of the codes that at least one feature decoded to"""
+        return np.flatnonzero(np.bincount(code_indices[code_indices >= 0], minlength=n_codes))
+
+    def codes_as_int(self, code_indices: np.ndarray, code_targets: np.ndarray) -> np.ndarray:
+        """Transform the codebook indices that features decoded to into the integer IDs of their
+        targets. Only the targets of the decoded codes are looked up.
+
+        Parameters
+        ----------
+        code_indices : np.ndarray[int]
+            array of the index of the code each feature decoded to, or -1 if the feature did not
+            decode
+        code_targets : np.ndarray
+            the target of each code, in codebook order
+
+        Returns
+        -------
+        np.ndarray[int] :
+            array of the same shape as code_indices, holding the integer ID of the target of each
+            feature. Features that did not decode are mapped to 0.
+
+        """
+        decoded_codes = self._decoded_codes(code_indices, len(code_targets))
+
+        # the extra last entry maps code index -1 to 0
+        code_to_target_id = np.zeros(len(code_targets) + 1, dtype=int)
+        code_to_target_id[decoded_codes] = self.targets_as_int(code_targets[decoded_codes])
+        return code_to_target_id[code_indices]
+
+    def targets_as_codes(self, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Transform integer target IDs into codes into the target names of this map, as
+        IntensityTable.set_target_codes stores them
+
+        Parameters
+        ----------
+        targets : np.ndarray[int]
+            array of int targets to be transformed into codes
+
+        Returns
+        -------
+        np.ndarray[int] :
+            index of each target in the names, or -1 for 'nan'
+        np.ndarray :
+            names of the targets, excluding 'nan'
+
+        """
+        # ID 0 ('nan') becomes code -1, which IntensityTable target codes decode to 'nan'
+        return targets - 1, self._int_to_target[1:]
 
     def targets_as_int(self, targets: np.ndarray) -> np.ndarray:
         """Transform an array of targets into their integer representation.
 
+        The targets are factorized into categorical codes with a hash table, so only the unique
+        targets are looked up; each target is then mapped to its integer ID by indexing with its
+        code.
+
         Parameters
         ----------
         targets : np.ndarray['U']
@@ -51,7 +136,9 @@ class TargetsMap:
             array of targets represented by their integer IDs
 
         """
-        return np.array([self._target_to_int[v] for v in targets])
+        codes, unique_targets = pd.factorize(np.ravel(targets))
+        unique_ids = np.array([self._target_to_int[v] for v in unique_targets], dtype=int)
+        return unique_ids[codes].reshape(np.shape(targets))
 
     def targets_as_str(self, targets: np.ndarray) -> np.ndarray:
         """Transform an array of integer IDs into their corresponding string target names.
@@ -67,12 +154,52 @@ class TargetsMap:
             array of unicode-encoded target names
 
         """
-        return np.array([self._int_to_target[v] for v in targets])
+        return self._int_to_target[np.asarray(targets, dtype=int)]
 
     def target_as_str(self, integer_target: int) -> np.ndarray:
         return self._int_to_target[integer_target]
 
 
+def mean_traces_from_sums(
+        trace_sums: np.ndarray, distance_sums: np.ndarray, counts: np.ndarray,
+) -> xr.DataArray:
+    """
+    Build the mean pixel traces of connected components from the sums of the traces and
+    distances of their pixels, and their numbers of pixels
+
+    Parameters
+    ----------
+    trace_sums : np.ndarray
+        (n_labels + 1, n_ch, n_round) sums of the traces of the pixels with each label
+    distance_sums : np.ndarray
+        (n_labels + 1,) sums of the distances of the pixels with each label
+    counts : np.ndarray
+        (n_labels + 1,) number of pixels with each label
+
+    Returns
+    -------
+    xr.DataArray :
+        (spot_id, ch, round) mean trace of each label, with the mean distance of each label as
+        a coordinate. The 0th label corresponds to background, and is dropped, as are labels
+        without pixels.
+
+    """
+    spot_ids = np.flatnonzero(counts[1:]) + 1
+    n_ch, n_round = trace_sums.shape[1:]
+    mean_pixel_traces = xr.DataArray(
+        trace_sums[spot_ids] / counts[spot_ids, None, None],
+        dims=('spot_id', Indices.CH.value, Indices.ROUND.value),
+        coords={
+            'spot_id': spot_ids,
+            Indices.CH.value: np.arange(n_ch),
+            Indices.ROUND.value: np.arange(n_round),
+        },
+    )
+    mean_pixel_traces[Features.DISTANCE] = (
+        'spot_id', distance_sums[spot_ids] / counts[spot_ids])
+    return mean_pixel_traces
+
+
 class CombineAdjacentFeatures:
 
     def __init__(
@@ -136,7 +263,8 @@ class CombineAdjacentFeatures:
         max_y = intensities[Indices.Y.value].values.max() + 1
         max_z = intensities[Indices.Z.value].values.max() + 1
 
-        int_targets = target_map.targets_as_int(intensities[Features.TARGET].values)
+        codes, code_targets = intensities.target_codes()
+        int_targets = target_map.codes_as_int(codes, code_targets)
         if mask_filtered_features:
             fails_filters = np.where(~intensities[Features.PASSES_THRESHOLDS])[0]
             int_targets[fails_filters] = 0
@@ -153,6 +281,9 @@ class CombineAdjacentFeatures:
         For all pixels that contribute to a connected component, calculate the mean value for
         each (ch, round), producing an average "trace" of a feature across the imaging experiment
 
+        The traces, distances and pixel counts of all components are summed with bincount
+        reductions over the pixel labels. The intensities are not modified.
+
         Parameters
         ----------
         label_image : np.ndarray
@@ -168,101 +299,48 @@ class CombineAdjacentFeatures:
 
         """
         pixel_labels = label_image.reshape(-1)
-        intensities['spot_id'] = (Features.AXIS, pixel_labels)
-        mean_pixel_traces = intensities.groupby('spot_id').mean(Features.AXIS)
-        mean_distances = intensities[Features.DISTANCE].groupby('spot_id').mean(Features.AXIS)
-        mean_pixel_traces[Features.DISTANCE] = (
-            'spot_id',
-            np.ravel(mean_distances)
-        )
-
-        # the 0th pixel trace corresponds to background. If present, drop it.
-        try:
-            mean_pixel_traces = mean_pixel_traces.drop(0, dim='spot_id')
-        except KeyError:
-            pass
-
-        return mean_pixel_traces
-
-    @staticmethod
-    def _single_spot_attributes(
-            spot_property: _RegionProperties,
-            decoded_image: np.ndarray,
-            target_map: TargetsMap,
-            min_area: Number,
-            max_area: Number,
-    ) -> Tuple[Dict[str, int], int]:
-        """
-        Calculate starfish SpotAttributes from the RegionProperties of a connected component
-        feature.
-
-        Parameters
-        ----------
-        spot_property: _RegionProperties
-            Properties of the connected component. Output of skimage.measure.regionprops
-        decoded_image : np.ndarray
-            Image whose pixels correspond to the targets that the given position in the ImageStack
-            decodes to.
-        target_map : TargetsMap
-            Unique mapping between string target names and int target IDs.
-        min_area :
-            Combined features with area below this value are marked as failing filters
-        max_area : Number
-            Combined features with area above this value are marked as failing filters
-
-        Returns
-        -------
-        Dict[str, Number] :
-            spot attribute dictionary for this connected component, containing the x, y, z position,
-            target name (str) and feature radius.
-        int :
-            1 if spot passes size filters, zero otherwise.
-
-        """
-        # because of the above skimage issue, we need to support both 2d and 3d properties
-        if len(spot_property.centroid) == 3:
-            spot_attrs = {
-                'z': int(spot_property.centroid[0]),
-                'y': int(spot_property.centroid[1]),
-                'x': int(spot_property.centroid[2])
-            }
-        else:  # data is 2d
-            spot_attrs = {
-                'z': 0,
-                'y': int(spot_property.centroid[0]),
-                'x': int(spot_property.centroid[1])
-            }
-
-        # we're back to 3d or fake-3d here
-        target_index = decoded_image[spot_attrs['z'], spot_attrs['y'], spot_attrs['x']]
-        spot_attrs[Features.TARGET] = target_map.target_as_str(target_index)
-        spot_attrs[Features.SPOT_RADIUS] = spot_property.equivalent_diameter / 2
-
-        # filter intensities for which radius is too small
-        passes_area_filter = 1 if min_area <= spot_property.area < max_area else 0
-        return spot_attrs, passes_area_filter
+        n_labels = int(pixel_labels.max()) if pixel_labels.size else 0
+        n_ch, n_round = intensities.sizes[Indices.CH.value], intensities.sizes[Indices.ROUND.value]
+        traces = intensities.transpose(
+            Features.AXIS, Indices.CH.value, Indices.ROUND.value).values.reshape(-1, n_ch * n_round)
+
+        # sum the traces, distances and pixels of each label with one bincount per trace entry
+        trace_sums = np.column_stack([
+            np.bincount(pixel_labels, weights=traces[:, i], minlength=n_labels + 1)
+            for i in range(traces.shape[1])
+        ]).reshape(n_labels + 1, n_ch, n_round)
+        distance_sums = np.bincount(
+            pixel_labels, weights=intensities[Features.DISTANCE].values, minlength=n_labels + 1)
+        counts = np.bincount(pixel_labels, minlength=n_labels + 1)
+
+        mean_pixel_traces = mean_traces_from_sums(trace_sums, distance_sums, counts)
+        return mean_pixel_traces.astype(intensities.dtype)
 
     def _create_spot_attributes(
             self,
-            region_properties: List[_RegionProperties],
+            label_image: np.ndarray,
             decoded_image: np.ndarray,
             target_map: TargetsMap,
-            n_processes: Optional[int]=None
     ) -> Tuple[SpotAttributes, np.ndarray]:
         """
+        Calculate starfish SpotAttributes for every connected component of a label image at once,
+        with bincount reductions over the labeled pixels.
+
+        Each feature is localized to the integer part of its centroid, and is assigned the target
+        that decoded_image holds at that position. Its radius is half of the diameter of the circle
+        (or, if the label image has three non-singleton dimensions, the sphere) with the same area
+        as the feature.
 
         Parameters
         ----------
-        region_properties : List[_RegionProperties]
-            Properties of the each connected component. Output of skimage.measure.regionprops
+        label_image : np.ndarray
+            (z, y, x) image where all pixels of a connected component share the same integer ID,
+            numbered consecutively from 1. Output of skimage.measure.label
         decoded_image : np.ndarray
             Image whose pixels correspond to the targets that the given position in the ImageStack
             decodes to.
         target_map : TargetsMap
             Unique mapping between string target names and int target IDs.
-        n_processes : Optional[int]=None
-            number of processes to devote to measuring spot properties. If None, defaults to the
-            result of os.nproc()
 
         Returns
         -------
@@ -273,24 +351,35 @@ class CombineAdjacentFeatures:
             An array with length equal to the number of features. If zero, indicates that a feature
             has failed area filters.
         """
-        pool = Pool(n_processes)
-        mapfunc = pool.map
-        applyfunc = partial(
-            self._single_spot_attributes,
-            decoded_image=decoded_image,
-            target_map=target_map,
-            min_area=self._min_area,
-            max_area=self._max_area
-        )
-
-        iterable = tqdm(region_properties)
-        results = mapfunc(applyfunc, iterable)
-        spot_attrs, passes_area_filter = zip(*results)
-
-        # update passes filter
-        passes_filter = np.array(passes_area_filter, dtype=np.bool)
-
-        spot_attributes = SpotAttributes(pd.DataFrame.from_records(spot_attrs))
+        labels = label_image.ravel()
+        n_labels = int(labels.max()) if labels.size else 0
+
+        # the coordinates of the labeled pixels, summed per label
+        pixels = np.flatnonzero(labels)
+        pixel_labels = labels[pixels]
+        area = np.bincount(pixel_labels, minlength=n_labels + 1)[1:]
+        centroid = [
+            np.bincount(pixel_labels, weights=coordinates, minlength=n_labels + 1)[1:] / area
+            for coordinates in np.unravel_index(pixels, label_image.shape)
+        ]
+        z, y, x = (coordinates.astype(int) for coordinates in centroid)
+
+        # match skimage.measure.regionprops, which measures the squeezed label image
+        if sum(size > 1 for size in label_image.shape) == 3:
+            radius = (6 * area / np.pi) ** (1 / 3) / 2
+        else:
+            radius = np.sqrt(4 * area / np.pi) / 2
+
+        spot_attributes = SpotAttributes(pd.DataFrame({
+            Indices.Z.value: z,
+            Indices.Y.value: y,
+            Indices.X.value: x,
+            Features.TARGET: target_map.targets_as_str(decoded_image[z, y, x]),
+            Features.SPOT_RADIUS: radius,
+        }))
+
+        # filter features whose area is too small or too large
+        passes_filter = (self._min_area <= area) & (area < self._max_area)
         return spot_attributes, passes_filter
 
     def run(
@@ -325,8 +414,8 @@ class CombineAdjacentFeatures:
         # map target molecules to integers so they can be reshaped into an image that can
         # be subjected to a connected-component algorithm to find adjacent pixels with the
         # same targets
-        targets = intensities[Features.TARGET].values
-        target_map = TargetsMap(targets)
+        codes, code_targets = intensities.target_codes()
+        target_map, _ = TargetsMap.from_code_indices(code_targets, codes)
 
         # create the decoded_image
         decoded_image = self._intensities_to_decoded_image(
@@ -335,6 +424,45 @@ class CombineAdjacentFeatures:
             self._mask_filtered,
         )
 
+        return self.combine_decoded_image(
+            decoded_image,
+            target_map,
+            partial(self._calculate_mean_pixel_traces, intensities=intensities),
+        )
+
+    def combine_decoded_image(
+            self,
+            decoded_image: np.ndarray,
+            target_map: TargetsMap,
+            mean_pixel_traces_func: Callable[[np.ndarray], xr.DataArray],
+            origin: Tuple[int, int, int]=(0, 0, 0),
+    ) -> Tuple[IntensityTable, ConnectedComponentDecodingResult]:
+        """
+        Combine the adjacent pixels of a decoded image that decoded to the same target into
+        features
+
+        Parameters
+        ----------
+        decoded_image : np.ndarray
+            (z, y, x) image whose pixels are the integer IDs of the targets they decoded to, or
+            zero for background
+        target_map : TargetsMap
+            Mapping between string target names and the integer target IDs of decoded_image
+        mean_pixel_traces_func : Callable[[np.ndarray], xr.DataArray]
+            Given the label image of the connected components, returns their mean pixel traces and
+            distances, e.g. with mean_traces_from_sums
+        origin : Tuple[int, int, int]
+            (z, y, x) position of the first pixel of decoded_image in the ImageStack, which is added
+            to the coordinates of the features (default = (0, 0, 0))
+
+        Returns
+        -------
+        IntensityTable :
+            Table whose features comprise sets of adjacent pixels that decoded to the same target
+        ConnectedComponentDecodingResult :
+            see run
+
+        """
         # label the decoded image to extract connected component features
         label_image: np.ndarray = label(decoded_image, connectivity=self._connectivity)
 
@@ -342,17 +470,16 @@ class CombineAdjacentFeatures:
         props: List = regionprops(np.squeeze(label_image))
 
         # calculate mean intensities across the pixels of each feature
-        mean_pixel_traces = self._calculate_mean_pixel_traces(
-            label_image,
-            intensities,
-        )
+        mean_pixel_traces = mean_pixel_traces_func(label_image)
 
         # Create SpotAttributes and determine feature filtering outcomes
         spot_attributes, passes_filter = self._create_spot_attributes(
-            props,
+            label_image,
             decoded_image,
             target_map,
         )
+        for axis, offset in zip(('z', 'y', 'x'), origin):
+            spot_attributes.data[axis] += offset
 
         # augment the SpotAttributes with filtering results and distances from nearest codes
         spot_attributes.data[Features.DISTANCE] = mean_pixel_traces[Features.DISTANCE]
@@ -368,6 +495,8 @@ class CombineAdjacentFeatures:
         intensity_table = IntensityTable(
             data=mean_pixel_traces, coords=coords, dims=dims
         )
+        intensity_table.set_target_codes(*target_map.targets_as_codes(
+            target_map.targets_as_int(spot_attributes.data[Features.TARGET].values)))
 
         # combine the various non-IntensityTable results into a NamedTuple before returning
         ccdr = ConnectedComponentDecodingResult(props, label_image, decoded_image)
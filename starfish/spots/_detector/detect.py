@@ -1,5 +1,4 @@
 from functools import partial
-from itertools import product
 from typing import Callable, Dict, Sequence, Tuple, Union
 
 import numpy as np
@@ -11,6 +10,108 @@ from starfish.intensity_table import IntensityTable
 from starfish.types import Features, Indices, Number, SpotAttributes
 
 
+DEFAULT_MAX_GATHER_BYTES = 64 * 1024 * 1024
+"""Bounds the size of the arrays of box pixels that are gathered to measure spot intensities."""
+
+_BOX_REDUCTIONS = {np.amax, np.amin, np.sum, np.mean, np.median}
+"""Measurement functions that accept an axis argument, and so are applied to many boxes at once."""
+
+
+def _spot_bounding_boxes(
+        spots: SpotAttributes,
+        shape: Sequence[int],
+        radius_is_gyration: bool=False,
+) -> np.ndarray:
+    """Compute the bounding box of each spot, clipped to a volume of the given (z, y, x) shape.
+
+    The bounds are also stored in the z_min, z_max, y_min, y_max, x_min and x_max columns of
+    spots.
+
+    Returns
+    -------
+    np.ndarray :
+        (n_spots, 6) integer array of the z_min, z_max, y_min, y_max, x_min and x_max of each
+        spot's box. Maxima are exclusive.
+    """
+    if radius_is_gyration:
+        radius = np.ceil(spots.data[Features.SPOT_RADIUS]).astype(int) + 1  # round up
+    else:
+        radius = spots.data[Features.SPOT_RADIUS].astype(int)  # truncate down to nearest integer
+    for v, max_size in zip(['z', 'y', 'x'], shape):
+        # numpy does exclusive max indexing, so need to subtract 1 from min to get centered box
+        spots.data[f'{v}_min'] = np.clip(spots.data[v] - (radius - 1), 0, None)
+        spots.data[f'{v}_max'] = np.clip(spots.data[v] + radius, None, max_size)
+    bounds = ['z_min', 'z_max', 'y_min', 'y_max', 'x_min', 'x_max']
+    return spots.data[bounds].values.astype(int).reshape(-1, 6)
+
+
+def _measure_boxes(
+        image: np.ndarray,
+        boxes: np.ndarray,
+        measurement_function: Callable[[Sequence], Number],
+        max_gather_bytes: int=DEFAULT_MAX_GATHER_BYTES,
+) -> np.ndarray:
+    """Apply measurement_function to the pixels of each box in each volume of image.
+
+    Boxes with the same shape are gathered into a single array with one fancy-indexing operation,
+    across all the volumes at once, and reduced along their box axes. Measurement functions other
+    than the numpy reductions in _BOX_REDUCTIONS are instead called once per box and volume.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        array of shape (..., z, y, x), i.e., one or more volumes
+    boxes : np.ndarray
+        (n_boxes, 6) bounds of each box, as returned by _spot_bounding_boxes
+    measurement_function : Callable[[Sequence], Number]
+        Function to apply over the box volumes to identify the intensity (e.g. max, mean, ...)
+    max_gather_bytes : int
+        Upper bound on the size of each array of gathered box pixels
+
+    Returns
+    -------
+    np.ndarray :
+        float array of shape (n_boxes, ...). The measurement of empty boxes is nan.
+    """
+    image = np.asarray(image)
+    leading_shape = image.shape[:-3]
+    measurements = np.full((len(boxes), *leading_shape), np.nan)
+
+    extents = boxes[:, 1::2] - boxes[:, ::2]
+    is_empty = np.any(extents <= 0, axis=1)
+    if np.all(is_empty):
+        return measurements
+
+    if measurement_function not in _BOX_REDUCTIONS:
+        for i in np.flatnonzero(~is_empty):
+            z_min, z_max, y_min, y_max, x_min, x_max = boxes[i]
+            for index in np.ndindex(*leading_shape):
+                measurements[(i, *index)] = measurement_function(
+                    image[index][z_min:z_max, y_min:y_max, x_min:x_max])
+        return measurements
+
+    unique_extents, box_groups = np.unique(extents[~is_empty], axis=0, return_inverse=True)
+    box_indices = np.flatnonzero(~is_empty)
+    bytes_per_box = image.itemsize * int(np.prod(leading_shape, dtype=int))
+    for group, extent in enumerate(unique_extents):
+        members = box_indices[box_groups == group]
+        batch_size = max(1, max_gather_bytes // (bytes_per_box * int(np.prod(extent))))
+        z_range, y_range, x_range = (np.arange(size) for size in extent)
+        for start in range(0, len(members), batch_size):
+            batch = members[start:start + batch_size]
+            z_min, y_min, x_min = boxes[batch, 0], boxes[batch, 2], boxes[batch, 4]
+            pixels = image[
+                ...,
+                (z_min[:, None] + z_range)[:, :, None, None],
+                (y_min[:, None] + y_range)[:, None, :, None],
+                (x_min[:, None] + x_range)[:, None, None, :],
+            ]
+            # pixels has shape (..., batch, z, y, x); move the batch axis to the front
+            measured = measurement_function(pixels, axis=(-3, -2, -1))  # type: ignore
+            measurements[batch] = np.moveaxis(measured, -1, 0)
+    return measurements
+
+
 def measure_spot_intensity(
         image: Union[np.ndarray, xr.DataArray],
         spots: SpotAttributes,
@@ -39,27 +140,9 @@ def measure_spot_intensity(
         Intensities for each spot in SpotAttributes
 
     """
-
-    def fn(row: pd.Series) -> Number:
-        data = image[
-            row['z_min']:row['z_max'],
-            row['y_min']:row['y_max'],
-            row['x_min']:row['x_max']
-        ]
-        return measurement_function(data)
-
-    if radius_is_gyration:
-        radius = np.ceil(spots.data[Features.SPOT_RADIUS]).astype(int) + 1  # round up
-    else:
-        radius = spots.data[Features.SPOT_RADIUS].astype(int)  # truncate down to nearest integer
-    for v, max_size in zip(['z', 'y', 'x'], image.shape):
-        # numpy does exclusive max indexing, so need to subtract 1 from min to get centered box
-        spots.data[f'{v}_min'] = np.clip(spots.data[v] - (radius - 1), 0, None)
-        spots.data[f'{v}_max'] = np.clip(spots.data[v] + radius, None, max_size)
-    return spots.data[['z_min', 'z_max', 'y_min', 'y_max', 'x_min', 'x_max']].astype(int).apply(
-        fn,
-        axis=1
-    )
+    boxes = _spot_bounding_boxes(spots, image.shape, radius_is_gyration)
+    return pd.Series(
+        _measure_boxes(image, boxes, measurement_function), index=spots.data.index)
 
 
 def measure_spot_intensities(
@@ -70,6 +153,9 @@ def measure_spot_intensities(
 ) -> IntensityTable:
     """given spots found from a reference image, find those spots across a data_image
 
+    The intensities of all the spots are measured across all the channels and imaging rounds at
+    once, and written directly into the data of the returned IntensityTable.
+
     Parameters
     ----------
     data_image : ImageStack
@@ -102,17 +188,11 @@ def measure_spot_intensities(
         n_round=n_round,
     )
 
-    # fill the intensity table
-    indices = product(range(n_ch), range(n_round))
-    for c, r in indices:
-        image, _ = data_image.get_slice({Indices.CH: c, Indices.ROUND: r})
-        blob_intensities: pd.Series = measure_spot_intensity(
-            image,
-            spot_attributes,
-            measurement_function,
-            radius_is_gyration=radius_is_gyration
-        )
-        intensity_table[:, c, r] = blob_intensities
+    # fill the intensity table, whose data is (spot, ch, round), from the (round, ch, z, y, x) image
+    image = data_image.numpy_array
+    boxes = _spot_bounding_boxes(spot_attributes, image.shape[-3:], radius_is_gyration)
+    intensities = _measure_boxes(image, boxes, measurement_function)
+    intensity_table.values[...] = intensities.transpose(0, 2, 1)
 
     return intensity_table
 
@@ -147,11 +227,13 @@ def concatenate_spot_attributes_to_intensities(
         SpotAttributes(features_coordinates), n_ch, n_round,
     )
 
-    i = 0
-    for attrs, inds in spot_attributes:
-        for _, row in attrs.data.iterrows():
-            intensity_table[i, inds[Indices.CH], inds[Indices.ROUND]] = row['intensity']
-            i += 1
+    # each spot has an intensity in the (ch, round) of the SpotAttributes it came from; set them
+    # all with a single assignment to the data of the intensity table
+    n_spots = [attrs.data.shape[0] for attrs, _ in spot_attributes]
+    channels = np.repeat([inds[Indices.CH] for _, inds in spot_attributes], n_spots)
+    rounds = np.repeat([inds[Indices.ROUND] for _, inds in spot_attributes], n_spots)
+    spot_indices = np.arange(all_spots.shape[0])
+    intensity_table.values[spot_indices, channels, rounds] = all_spots['intensity'].values
 
     return intensity_table
 
@@ -1,16 +1,59 @@
-from typing import Optional, Union
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import pandas as pd
 import xarray as xr
 from skimage.feature import blob_log
 
+from starfish.imagestack._shared_memory import map_in_processes, SharedArray
 from starfish.imagestack.imagestack import ImageStack
 from starfish.intensity_table import IntensityTable
 from starfish.types import Features, Indices, Number, SpotAttributes
 from ._base import SpotFinderAlgorithmBase
 from .detect import detect_spots, measure_spot_intensity
 
+Region = Tuple[slice, ...]
+
+LAPLACE_TRUNCATE = 4.0
+"""scipy.ndimage.gaussian_laplace, which blob_log applies at each sigma, truncates its kernel at
+this many standard deviations."""
+
+
+def _tile_halo(max_sigma: Number) -> int:
+    """the number of pixels by which tiles must overlap for blob_log to find the same blobs in the
+    core of a tile as in the whole volume: the radius of the largest laplace of gaussian kernel,
+    plus the one pixel neighborhood in which scale space maxima are found"""
+    return int(LAPLACE_TRUNCATE * max_sigma + 0.5) + 1
+
+
+def _tiles(shape: Sequence[int], tile_size: int, halo: int) -> Iterator[Tuple[Region, Region]]:
+    """split a volume into tiles of at most tile_size pixels along each axis
+
+    Yields
+    ------
+    Region :
+        the core of the tile, which the tiles partition
+    Region :
+        the core of the tile extended by halo pixels along each axis, clipped to the volume
+    """
+    for starts in itertools.product(*(range(0, size, tile_size) for size in shape)):
+        stops = [min(start + tile_size, size) for start, size in zip(starts, shape)]
+        core = tuple(slice(start, stop) for start, stop in zip(starts, stops))
+        block = tuple(
+            slice(max(start - halo, 0), min(stop + halo, size))
+            for start, stop, size in zip(starts, stops, shape))
+        yield core, block
+
+
+def _blob_log(blob_log_args: Tuple, image: np.ndarray) -> np.ndarray:
+    """call blob_log, returning an (n_blobs, image.ndim + 1) array even if no blobs are found"""
+    # blob_log returns a (0, 3) array regardless of the dimensions of the image if it finds no blobs
+    return blob_log(image, *blob_log_args).reshape(-1, image.ndim + 1)
+
 
 class GaussianSpotDetector(SpotFinderAlgorithmBase):
 
@@ -22,7 +65,11 @@ class GaussianSpotDetector(SpotFinderAlgorithmBase):
             threshold: Number,
             overlap: float=0.5,
             measurement_type='max',
-            is_volume: bool=True, **kwargs
+            is_volume: bool=True,
+            tile_size: Optional[int]=None,
+            n_processes: Optional[int]=None,
+            executor: str="process",
+            **kwargs
     ) -> None:
         """Multi-dimensional gaussian spot detector
 
@@ -48,6 +95,21 @@ class GaussianSpotDetector(SpotFinderAlgorithmBase):
             (default = 0.5)
         measurement_type : str ['max', 'mean']
             name of the function used to calculate the intensity for each identified spot area
+        tile_size : Optional[int]
+            If provided, blobs are detected in tiles of at most this many pixels along each axis,
+            which are processed in parallel. Each tile is extended by a halo of
+            round(4 * max_sigma) + 1 pixels, the reach of the largest laplace of gaussian kernel,
+            so that the scale space of the tile's core is that of the whole volume, and overlapping
+            blobs in neighboring tiles are pruned as they would be in the whole volume. Each blob is
+            only reported by the tile that contains its center. Memory use is then bounded by the
+            size of the tiles, rather than by num_sigma times the size of the volume. If None, the
+            whole volume is processed at once (default = None).
+        n_processes : Optional[int]
+            The number of processes (or threads) used to detect blobs in tiles. If None, uses the
+            output of os.cpu_count() (default = None).
+        executor : str
+            One of "process", "thread", or "serial": detect blobs in the tiles in a pool of
+            processes, in a pool of threads, or sequentially (default = "process").
 
         Notes
         -----
@@ -69,6 +131,53 @@ class GaussianSpotDetector(SpotFinderAlgorithmBase):
         self.is_volume = is_volume
         self.measurement_function = self._get_measurement_function(measurement_type)
 
+        if tile_size is not None and tile_size < 1:
+            raise ValueError(f'tile_size must be a positive number of pixels, not {tile_size}')
+        if executor not in ImageStack.EXECUTORS:
+            raise ValueError(
+                f"executor must be one of {', '.join(ImageStack.EXECUTORS)}, not {executor}")
+        self.tile_size = tile_size
+        self.n_processes = n_processes
+        self.executor = executor
+
+    def _detect_blobs(self, image: np.ndarray) -> np.ndarray:
+        """detect the blobs of an image, tile by tile if a tile size was set
+
+        Returns
+        -------
+        np.ndarray :
+            (n_blobs, image.ndim + 1) array of the coordinates and sigma of each blob
+        """
+        blob_log_args = (
+            self.min_sigma, self.max_sigma, self.num_sigma, self.threshold, self.overlap)
+        if self.tile_size is None:
+            return _blob_log(blob_log_args, image)
+
+        tiles = list(_tiles(image.shape, self.tile_size, _tile_halo(self.max_sigma)))
+        blocks = [block for _, block in tiles]
+        detect = partial(_blob_log, blob_log_args)
+        tile_blobs: List[np.ndarray]
+        if self.executor == "process":
+            with SharedArray(image.shape, image.dtype) as shared:
+                shared.array[...] = image
+                tile_blobs = map_in_processes(shared, detect, blocks, self.n_processes)
+        elif self.executor == "thread":
+            with ThreadPoolExecutor(self.n_processes or os.cpu_count()) as pool:
+                tile_blobs = list(pool.map(lambda block: detect(image[block]), blocks))
+        else:
+            tile_blobs = [detect(image[block]) for block in blocks]
+
+        # keep the blobs centered in the core of each tile, so that the blobs found in the halo of
+        # a tile, which are also found in the core of a neighboring tile, are reported only once
+        kept = []
+        for (core, block), blobs in zip(tiles, tile_blobs):
+            blobs[:, :-1] += [axis.start for axis in block]
+            in_core = np.ones(len(blobs), dtype=bool)
+            for position, axis in zip(blobs[:, :-1].T, core):
+                in_core &= (axis.start <= position) & (position < axis.stop)
+            kept.append(blobs[in_core])
+        return np.concatenate(kept)
+
     def image_to_spots(self, data_image: Union[np.ndarray, xr.DataArray]) -> SpotAttributes:
         """
         Find spots using a gaussian blob finding algorithm
@@ -85,14 +194,7 @@ class GaussianSpotDetector(SpotFinderAlgorithmBase):
 
         """
 
-        fitted_blobs_array: np.ndarray = blob_log(
-            data_image,
-            self.min_sigma,
-            self.max_sigma,
-            self.num_sigma,
-            self.threshold,
-            self.overlap
-        )
+        fitted_blobs_array: np.ndarray = self._detect_blobs(np.asarray(data_image))
 
         # create the SpotAttributes Table
         columns = [Indices.Z.value, Indices.Y.value, Indices.X.value, Features.SPOT_RADIUS]
@@ -158,5 +260,11 @@ class GaussianSpotDetector(SpotFinderAlgorithmBase):
         group_parser.add_argument(
             "--overlap", default=0.5, type=float,
             help="dots with overlap of greater than this fraction are combined")
+        group_parser.add_argument(
+            "--tile-size", default=None, type=int,
+            help="detect spots in parallel in tiles of at most this many pixels along each axis")
+        group_parser.add_argument(
+            "--n-processes", default=None, type=int,
+            help="number of processes used to detect spots in tiles")
         group_parser.add_argument(
             "--show", default=False, action='store_true', help="display results visually")
@@ -1,19 +1,25 @@
-from typing import Tuple
+from typing import Iterator, Optional, Sequence, Tuple
 
 import numpy as np
+import xarray as xr
 
+from starfish.codebook._decoder import normalize_traces
 from starfish.codebook.codebook import Codebook
 from starfish.imagestack.imagestack import ImageStack
 from starfish.intensity_table import IntensityTable
+from starfish.types import Features, Indices
 from ._base import SpotFinderAlgorithmBase
-from .combine_adjacent_features import CombineAdjacentFeatures, ConnectedComponentDecodingResult
+from .combine_adjacent_features import (
+    CombineAdjacentFeatures, ConnectedComponentDecodingResult, mean_traces_from_sums, TargetsMap
+)
 
 
 class PixelSpotDetector(SpotFinderAlgorithmBase):
     def __init__(
             self, codebook: Codebook, metric: str, distance_threshold: float,
             magnitude_threshold: int, min_area: int, max_area: int, norm_order: int=2,
-            crop_x: int=0, crop_y: int=0, crop_z: int=0, **kwargs) -> None:
+            crop_x: int=0, crop_y: int=0, crop_z: int=0,
+            chunk_shape: Optional[Sequence[int]]=None, **kwargs) -> None:
         """Decode an image by first coding each pixel, then combining the results into spots
 
         Parameters
@@ -37,6 +43,12 @@ class PixelSpotDetector(SpotFinderAlgorithmBase):
         crop_x, crop_y, crop_z : int
             number of pixels to crop from the top and bottom of each of the x, y, and z axes of
             an ImageStack (default = 0)
+        chunk_shape : Optional[Sequence[int]]
+            If provided, the (z, y) size of the chunks in which pixels are decoded. Instead of an
+            IntensityTable of every pixel, only a decoded image and the distance and magnitude of
+            each pixel are then held in memory, and adjacent pixels are combined into spots once
+            every chunk is decoded. A lazy ImageStack is read one chunk at a time, and is not
+            loaded. If None, all the pixels are decoded at once (default = None).
 
         """
         self.codebook = codebook
@@ -49,6 +61,7 @@ class PixelSpotDetector(SpotFinderAlgorithmBase):
         self.crop_x = crop_x
         self.crop_y = crop_y
         self.crop_z = crop_z
+        self.chunk_shape = tuple(chunk_shape) if chunk_shape is not None else None
 
     def run(
         self, stack: ImageStack,
@@ -68,6 +81,9 @@ class PixelSpotDetector(SpotFinderAlgorithmBase):
             Results of connected component labeling
 
         """
+        if self.chunk_shape is not None:
+            return self._run_in_chunks(stack)
+
         pixel_intensities = IntensityTable.from_image_stack(
             stack, crop_x=self.crop_x, crop_y=self.crop_y, crop_z=self.crop_z)
         decoded_intensities = self.codebook.metric_decode(
@@ -86,6 +102,102 @@ class PixelSpotDetector(SpotFinderAlgorithmBase):
 
         return decoded_spots, image_decoding_results
 
+    def _chunks(self, shape: Tuple[int, int, int]) -> Iterator[Tuple[slice, slice]]:
+        """yield the (z, y) slices of each chunk of a (z, y, x) volume"""
+        assert self.chunk_shape is not None
+        chunk_z, chunk_y = self.chunk_shape
+        for z in range(0, shape[0], chunk_z):
+            for y in range(0, shape[1], chunk_y):
+                yield slice(z, min(z + chunk_z, shape[0])), slice(y, min(y + chunk_y, shape[1]))
+
+    def _chunk_traces(self, stack: ImageStack, z: slice, y: slice) -> np.ndarray:
+        """(pixels, ch, round) traces of a (z, y) chunk of the cropped volume of stack, ordered as
+        IntensityTable.from_image_stack orders them
+
+        The chunk is read with get_slice, so a lazy stack only reads the tiles of its z-planes,
+        through its tile cache.
+        """
+        n_z, n_y, n_x = stack.raw_shape[2:]
+        z_start, z_stop, _ = z.indices(n_z - 2 * self.crop_z)
+        y_start, y_stop, _ = y.indices(n_y - 2 * self.crop_y)
+        chunk, _ = stack.get_slice(
+            {Indices.Z: slice(z_start + self.crop_z, z_stop + self.crop_z)})
+        chunk = chunk[
+            :, :, :,
+            y_start + self.crop_y:y_stop + self.crop_y,
+            self.crop_x:n_x - self.crop_x,
+        ].transpose(2, 3, 4, 1, 0)
+        return chunk.reshape(-1, chunk.shape[3], chunk.shape[4])
+
+    def _run_in_chunks(
+            self, stack: ImageStack,
+    ) -> Tuple[IntensityTable, ConnectedComponentDecodingResult]:
+        """decode the pixels of stack chunk by chunk, then combine them into spots
+
+        Each pixel is decoded on its own, so the chunks need not overlap. The connected components
+        are only labeled once the decoded image of the whole volume has been assembled, so spots
+        that span chunks are found whole. The pixels of a lazy stack are read one chunk at a time,
+        so only the decoding results of each pixel are held for the whole volume.
+        """
+        n_round, n_ch = stack.raw_shape[:2]
+        crop = (self.crop_z, self.crop_y, self.crop_x)
+        for size, axis_crop in zip(stack.raw_shape[2:], crop):
+            if axis_crop * 2 >= size:
+                raise ValueError(f"cannot crop {axis_crop} pixels from each end of an axis of size "
+                                 f"{size}")
+        n_z, n_y, n_x = stack.raw_shape[2:]
+        shape = (n_z - 2 * self.crop_z, n_y - 2 * self.crop_y, n_x - 2 * self.crop_x)
+
+        # decode each chunk, keeping only the decoding results of each pixel
+        code_indices = np.empty(shape, dtype=np.int32)
+        distances = np.empty(shape, dtype=np.float32)
+        magnitudes = np.empty(shape, dtype=np.float32)
+        passes_filters = np.empty(shape, dtype=np.bool)
+        for z, y in self._chunks(shape):
+            _, chunk_norms, chunk_distances, chunk_indices = self.codebook._decode_traces(
+                self._chunk_traces(stack, z, y), norm_order=self.norm_order, metric=self.metric)
+            chunk_shape = code_indices[z, y].shape
+            code_indices[z, y] = chunk_indices.reshape(chunk_shape)
+            distances[z, y] = chunk_distances.reshape(chunk_shape)
+            magnitudes[z, y] = chunk_norms.reshape(chunk_shape)
+            passes_filters[z, y] = np.logical_and(
+                chunk_norms >= self.magnitude_threshold,
+                chunk_distances <= self.distance_threshold,
+            ).reshape(chunk_shape)
+
+        # map the decoded targets to the integer IDs used to label the decoded image
+        target_map, target_ids = TargetsMap.from_code_indices(
+            self.codebook.indexes[Features.TARGET].values, code_indices)
+        decoded_image = np.where(passes_filters, target_ids, 0)
+
+        def mean_pixel_traces(label_image: np.ndarray) -> xr.DataArray:
+            """average the normalized traces and distances of the pixels of each spot, normalizing
+            the traces again one chunk at a time"""
+            labels = label_image.reshape(shape)
+            n_labels = int(labels.max())
+            sums = np.zeros((n_labels + 1, n_ch * n_round))
+            for z, y in self._chunks(shape):
+                normalized, _ = normalize_traces(
+                    self._chunk_traces(stack, z, y), self.norm_order)
+                normalized = normalized.reshape(normalized.shape[0], -1)
+                chunk_labels = labels[z, y].ravel()
+                for trace in range(normalized.shape[1]):
+                    sums[:, trace] += np.bincount(
+                        chunk_labels, weights=normalized[:, trace], minlength=n_labels + 1)
+            counts = np.bincount(labels.ravel(), minlength=n_labels + 1)
+            distance_sums = np.bincount(
+                labels.ravel(), weights=distances.ravel(), minlength=n_labels + 1)
+            return mean_traces_from_sums(
+                sums.reshape(n_labels + 1, n_ch, n_round), distance_sums, counts)
+
+        caf = CombineAdjacentFeatures(
+            min_area=self.min_area,
+            max_area=self.max_area,
+            mask_filtered_features=True
+        )
+        return caf.combine_decoded_image(
+            decoded_image, target_map, mean_pixel_traces, origin=crop)
+
     @classmethod
     def _add_arguments(cls, group_parser):
         group_parser.add_argument("--metric", type=str, default='euclidean')
@@ -113,3 +225,7 @@ class PixelSpotDetector(SpotFinderAlgorithmBase):
         group_parser.add_argument('--crop-x', type=int, default=0)
         group_parser.add_argument('--crop-y', type=int, default=0)
         group_parser.add_argument('--crop-z', type=int, default=0)
+        group_parser.add_argument(
+            "--chunk-shape", type=int, nargs=2, default=None, metavar=("Z", "Y"),
+            help="decode the pixels in chunks of this many z-planes and y-rows, to bound memory"
+        )
@@ -1,13 +1,18 @@
 """
-Tests for codebook._approximate_nearest_code method
+Tests for the ball tree search of codebook._decoder.CodebookDecoder, which finds the nearest codes
+for the metrics that are not searched exactly
 """
 
 import numpy as np
+import pytest
 
+from starfish.codebook._decoder import CodebookDecoder
+from starfish.types import Features, Indices
 from .test_metric_decode import codebook_factory, intensity_table_factory
 
 
-def test_simple_intensities_find_correct_nearest_code():
+@pytest.mark.parametrize("metric", ["minkowski", "manhattan"])
+def test_simple_intensities_find_correct_nearest_code(metric):
     """
     Test four simple examples for correct decoding. Here the first example should decode to GENE_A,
     the second to GENE_B. The third is closer to GENE_A. The fourth is equidistant to GENE_A and
@@ -25,10 +30,12 @@ def test_simple_intensities_find_correct_nearest_code():
     )
     intensities = intensity_table_factory(data=data)
     codebook = codebook_factory()
-    distances, gene_ids = codebook._approximate_nearest_code(
-        codebook,
-        intensities,
-        metric='euclidean'
-    )
+    traces = (Indices.CH.value, Indices.ROUND.value)
+    codes = codebook.transpose(Features.TARGET, *traces).values
+    decoder = CodebookDecoder(codes, codebook.target.values, norm_order=2, metric=metric)
+
+    features = intensities.transpose(Features.AXIS, *traces).values
+    _, indices = decoder.nearest_codes(features.reshape(features.shape[0], -1))
+    gene_ids = codebook.target.values[indices[:, 0]]
 
     assert np.array_equal(gene_ids, ['GENE_A', 'GENE_B', 'GENE_A', 'GENE_A'])
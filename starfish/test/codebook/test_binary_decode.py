@@ -0,0 +1,104 @@
+"""
+Tests for codebook.decode_binary method
+"""
+from itertools import combinations
+from typing import List
+
+import numpy as np
+import pytest
+
+from starfish import Codebook
+from starfish.types import Features, Indices
+from .test_metric_decode import intensity_table_factory
+
+
+def binary_codebook(codes: np.ndarray) -> Codebook:
+    """Codebook of (n_codes, n_ch, n_round) binary codes named GENE_0, GENE_1, ..."""
+    code_array = [
+        {
+            Features.CODEWORD: [
+                {Indices.CH.value: int(c), Indices.ROUND.value: int(r), Features.CODE_VALUE: 1}
+                for c, r in zip(*np.nonzero(code))
+            ],
+            Features.TARGET: f'GENE_{i}',
+        }
+        for i, code in enumerate(codes)
+    ]
+    return Codebook.from_code_array(code_array, n_ch=codes.shape[1], n_round=codes.shape[2])
+
+
+def hamming_distance_4_codes(n_ch: int=4, n_round: int=4, weight: int=4) -> np.ndarray:
+    """greedily select codes of a fixed weight that are at least 4 bit flips from each other"""
+    codes: List[np.ndarray] = []
+    for on_bits in combinations(range(n_ch * n_round), weight):
+        code = np.zeros(n_ch * n_round, dtype=bool)
+        code[list(on_bits)] = True
+        if all(np.sum(code != other) >= 4 for other in codes):
+            codes.append(code)
+    return np.array(codes).reshape(-1, n_ch, n_round)
+
+
+def test_decode_binary_decodes_exact_and_single_bit_error_features():
+    codes = hamming_distance_4_codes()
+    codebook = binary_codebook(codes)
+    np.random.seed(3)
+
+    n = len(codes)
+    exact = codes.astype(float)
+    one_error = exact.copy()
+    flipped_bits = np.random.randint(0, one_error[0].size, size=n)
+    one_error.reshape(n, -1)[np.arange(n), flipped_bits] = 1 - one_error.reshape(n, -1)[
+        np.arange(n), flipped_bits]
+    data = np.concatenate([exact, one_error]) * np.random.uniform(0.6, 1, size=(2 * n, 4, 4))
+    intensities = intensity_table_factory(data)
+
+    decoded = codebook.decode_binary(intensities, threshold=0.5)
+
+    expected_targets = np.tile(codebook[Features.TARGET].values, 2)
+    assert np.array_equal(decoded[Features.TARGET].values, expected_targets)
+    assert np.all(decoded[Features.PASSES_THRESHOLDS].values)
+    assert np.array_equal(decoded[Features.ERROR_CORRECTED].values, np.repeat([False, True], n))
+    assert np.array_equal(decoded[Features.DISTANCE].values, np.repeat([0, 1], n))
+
+
+def test_decode_binary_does_not_decode_two_bit_errors_or_ambiguous_corrections():
+    codes = np.zeros((2, 2, 2), dtype=int)
+    codes[0, :, 0] = 1  # GENE_0 is on in round 0
+    codes[1, 0, :] = 1  # GENE_1 is on in channel 0
+    codebook = binary_codebook(codes)
+
+    data = np.array(
+        [[[0, 0],  # two bit errors from GENE_0 and GENE_1
+          [0, 0]],
+         [[1, 0],  # one bit error from both GENE_0 and GENE_1
+          [0, 0]],
+         [[0, 1],  # one bit error from GENE_1, and three from GENE_0
+          [0, 0]]]
+    )
+    decoded = codebook.decode_binary(intensity_table_factory(data), threshold=0.5)
+
+    assert np.array_equal(decoded[Features.TARGET].values, ['nan', 'nan', 'GENE_1'])
+    assert np.array_equal(decoded[Features.PASSES_THRESHOLDS].values, [False, False, True])
+    assert np.array_equal(decoded[Features.ERROR_CORRECTED].values, [False, False, True])
+    assert np.isnan(decoded[Features.DISTANCE].values[:2]).all()
+
+
+def test_decode_binary_applies_per_channel_and_round_thresholds():
+    codes = np.zeros((1, 2, 2), dtype=int)
+    codes[0, 0, 0] = codes[0, 1, 1] = 1
+    codebook = binary_codebook(codes)
+    data = np.array([[[0.3, 0.2], [0.1, 0.8]]])
+
+    threshold = np.array([[0.25, 0.5], [0.5, 0.5]])
+    decoded = codebook.decode_binary(intensity_table_factory(data), threshold=threshold)
+    assert np.array_equal(decoded[Features.ERROR_CORRECTED].values, [False])
+
+    decoded = codebook.decode_binary(intensity_table_factory(data), threshold=0.5)
+    assert np.array_equal(decoded[Features.ERROR_CORRECTED].values, [True])
+
+
+def test_decode_binary_rejects_non_binary_codebooks():
+    codebook = binary_codebook(np.ones((1, 2, 2), dtype=int))
+    codebook.values[0, 0, 0] = 2
+    with pytest.raises(ValueError):
+        codebook.decode_binary(intensity_table_factory(), threshold=0.5)
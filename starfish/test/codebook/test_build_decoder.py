@@ -0,0 +1,60 @@
+"""
+Tests for codebook.build_decoder method
+"""
+import pickle
+
+import numpy as np
+import pytest
+
+from starfish import Codebook
+from .test_metric_decode import intensity_table_factory
+
+
+@pytest.fixture
+def codebook_and_intensities():
+    np.random.seed(1)
+    codebook = Codebook.synthetic_one_hot_codebook(n_round=4, n_channel=3, n_codes=10)
+    intensities = intensity_table_factory(np.random.random_sample((50, 3, 4)))
+    return codebook, intensities
+
+
+def test_build_decoder_is_memoized_by_norm_order_and_metric(codebook_and_intensities):
+    codebook, _ = codebook_and_intensities
+    decoder = codebook.build_decoder(norm_order=2, metric="euclidean")
+    assert codebook.build_decoder(norm_order=2, metric="euclidean") is decoder
+    assert codebook.build_decoder(norm_order=1, metric="euclidean") is not decoder
+    assert codebook.build_decoder(norm_order=2, metric="manhattan") is not decoder
+
+
+def test_build_decoder_rebuilds_decoders_of_modified_codebooks(codebook_and_intensities):
+    codebook, _ = codebook_and_intensities
+    decoder = codebook.build_decoder(norm_order=2, metric="euclidean")
+    codebook.values[0] = codebook.values[1]
+    assert codebook.build_decoder(norm_order=2, metric="euclidean") is not decoder
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "manhattan"])
+def test_decoder_matches_metric_decode(codebook_and_intensities, metric):
+    codebook, intensities = codebook_and_intensities
+    decoded = codebook.metric_decode(
+        intensities.copy(), max_distance=1, min_intensity=0, norm_order=2, metric=metric)
+
+    decoder = codebook.build_decoder(norm_order=2, metric=metric)
+    _, norms, distances, indices = decoder.decode_traces(intensities.values)
+    assert np.array_equal(decoder.targets[indices], decoded.target.values)
+    assert np.allclose(distances, decoded.distance.values)
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "manhattan"])
+def test_decoders_are_pickled_with_their_codebook(codebook_and_intensities, metric):
+    codebook, intensities = codebook_and_intensities
+    decoder = codebook.build_decoder(norm_order=2, metric=metric)
+
+    unpickled_codebook = pickle.loads(pickle.dumps(codebook))
+    unpickled_decoder = unpickled_codebook._decoders[(2, metric)][1]
+    assert unpickled_codebook.build_decoder(norm_order=2, metric=metric) is unpickled_decoder
+
+    for expected, observed in zip(
+            decoder.decode_traces(intensities.values),
+            unpickled_decoder.decode_traces(intensities.values)):
+        assert np.array_equal(expected, observed)
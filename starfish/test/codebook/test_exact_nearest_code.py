@@ -0,0 +1,101 @@
+"""
+Tests for codebook._decoder.exact_nearest_codes
+"""
+
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+from starfish import Codebook
+from starfish.codebook._decoder import (
+    CodebookDecoder,
+    DEFAULT_MAX_DECODE_BATCH_BYTES,
+    exact_nearest_codes,
+    prepare_exact_codes,
+)
+from starfish.types import Features, Indices
+from .test_metric_decode import codebook_factory, intensity_table_factory
+
+
+def random_intensities_and_codebook():
+    codebook = Codebook.synthetic_one_hot_codebook(n_round=4, n_channel=3, n_codes=20)
+    data = np.random.RandomState(0).random_sample((500, 3, 4))
+    intensities = intensity_table_factory(data=data)
+    norm_codes, _ = Codebook._normalize_features(codebook, norm_order=2)
+    norm_intensities, _ = Codebook._normalize_features(intensities, norm_order=2)
+    return norm_codes, norm_intensities
+
+
+def linear(array) -> np.ndarray:
+    return array.stack(traces=(Indices.CH.value, Indices.ROUND.value)).values
+
+
+def exact_nearest_code(codes, intensities, metric, max_batch_bytes=DEFAULT_MAX_DECODE_BATCH_BYTES):
+    """return the distance of each feature to its nearest code, and the target of that code"""
+    linear_codes = linear(codes)
+    distances, indices = exact_nearest_codes(
+        *prepare_exact_codes(linear_codes, metric),
+        linear(intensities),
+        metric,
+        max_batch_bytes=max_batch_bytes,
+    )
+    return distances[:, 0], codes.target.values[indices[:, 0]]
+
+
+def test_exact_nearest_code_matches_ball_tree():
+    norm_codes, norm_intensities = random_intensities_and_codebook()
+    # the minkowski metric (with p=2) is the euclidean distance, but is searched with a ball tree
+    ball_tree = CodebookDecoder(
+        norm_codes.transpose(Features.TARGET, Indices.CH.value, Indices.ROUND.value).values,
+        norm_codes.target.values,
+        norm_order=2,
+        metric="minkowski",
+    )
+    expected_distances, expected_indices = ball_tree.nearest_codes(linear(norm_intensities))
+    expected_distances = expected_distances[:, 0]
+    expected_targets = norm_codes.target.values[expected_indices[:, 0]]
+
+    # use a small batch size so that the features are decoded in several batches
+    distances, targets = exact_nearest_code(
+        norm_codes, norm_intensities, metric="euclidean", max_batch_bytes=1024)
+    assert np.array_equal(targets, expected_targets)
+    assert np.allclose(distances, expected_distances)
+
+
+def test_exact_nearest_code_cosine():
+    norm_codes, norm_intensities = random_intensities_and_codebook()
+    all_distances = cdist(linear(norm_intensities), linear(norm_codes), metric="cosine")
+
+    distances, targets = exact_nearest_code(norm_codes, norm_intensities, metric="cosine")
+    assert np.array_equal(targets, norm_codes.target.values[np.argmin(all_distances, axis=1)])
+    assert np.allclose(distances, np.min(all_distances, axis=1))
+
+
+def test_exact_nearest_code_rejects_other_metrics():
+    norm_codes, norm_intensities = random_intensities_and_codebook()
+    with pytest.raises(ValueError):
+        exact_nearest_code(norm_codes, norm_intensities, metric="manhattan")
+
+
+def test_exact_nearest_code_breaks_ties_like_the_ball_tree():
+    """
+    The second feature is equidistant to GENE_A and GENE_B, and should decode to GENE_A because
+    GENE_A comes first in the codebook.
+    """
+    data = np.array(
+        [[[0, 0.5],
+          [0.5, 0]],
+         [[0, 0],
+          [0.5, 0.5]]]
+    )
+    intensities = intensity_table_factory(data=data)
+    codebook = codebook_factory()
+    for metric in ("euclidean", "cosine"):
+        _, targets = exact_nearest_code(codebook, intensities, metric=metric)
+        assert np.array_equal(targets, ['GENE_A', 'GENE_A'])
+
+        # the decoder built by the codebook finds the same codes for the normalized features
+        norm_intensities, _ = Codebook._normalize_features(intensities, norm_order=2)
+        _, indices = codebook.build_decoder(norm_order=2, metric=metric).nearest_codes(
+            linear(norm_intensities))
+        assert np.array_equal(codebook.target.values[indices[:, 0]], ['GENE_A', 'GENE_A'])
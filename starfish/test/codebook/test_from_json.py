@@ -7,8 +7,13 @@ import os
 import tempfile
 from typing import Any, Dict, List
 
+from pkg_resources import resource_filename
+
 from starfish import Codebook
+from starfish.codebook import codebook as codebook_module
+from starfish.codebook._sparse import SIDECAR_EXTENSION
 from starfish.types import Features, Indices
+from validate_sptx.util import SpaceTxValidator
 
 
 def codebook_json_data_factory() -> List[Dict[str, Any]]:
@@ -72,3 +77,38 @@ def test_codebook_serialization():
         # Retrieve it and test that the data it contains has not changed
         codebook_reloaded = Codebook.from_json(json_codebook)
         assert codebook_reloaded.equals(codebook)
+
+
+def test_codebook_json_is_valid_against_the_codebook_schema():
+    codebook = Codebook.synthetic_one_hot_codebook(n_round=4, n_channel=3, n_codes=20)
+    validator = SpaceTxValidator(
+        resource_filename("validate_sptx", "schema/codebook/codebook.json"))
+    with tempfile.TemporaryDirectory() as directory:
+        json_codebook = os.path.join(directory, 'codebook.json')
+        codebook.to_json(json_codebook)
+        assert validator.validate_file(json_codebook)
+
+
+def test_codebook_loads_from_binary_sidecar(monkeypatch):
+    codebook = Codebook.from_code_array(codebook_json_data_factory())
+    with tempfile.TemporaryDirectory() as directory:
+        json_codebook = os.path.join(directory, 'codebook.json')
+        codebook.to_json(json_codebook, binary_sidecar=True)
+        assert os.path.isfile(json_codebook + SIDECAR_EXTENSION)
+
+        # the sidecar is read without parsing the code array
+        with monkeypatch.context() as patch:
+            patch.setattr(Codebook, 'from_code_array', None)
+            assert Codebook.from_json(json_codebook).equals(codebook)
+            assert Codebook.from_json(json_codebook, n_ch=5).sizes[Indices.CH] == 5
+
+        # the sidecar is not read if it is disabled, or if the json file has changed
+        with monkeypatch.context() as patch:
+            patch.setattr(codebook_module, 'read_sidecar', None)
+            assert Codebook.from_json(json_codebook, use_binary_sidecar=False).equals(codebook)
+
+        code_array = codebook_json_data_factory()
+        code_array[0][Features.TARGET] = 'GENE_C'
+        with open(json_codebook, 'w') as f:
+            json.dump(code_array, f)
+        assert Codebook.from_json(json_codebook).equals(Codebook.from_code_array(code_array))
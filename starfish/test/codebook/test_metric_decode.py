@@ -5,6 +5,7 @@ Tests for codebook.metric_decode method
 import numpy as np
 import pandas as pd
 import pytest
+from scipy.spatial.distance import cdist
 
 from starfish import Codebook, IntensityTable
 from starfish.types import Features, Indices, SpotAttributes
@@ -114,3 +115,56 @@ def test_unmatched_intensities_and_codebook_table_sizes_throws_value_error():
     intensities = intensity_table_factory()
     with pytest.raises(ValueError):
         codebook.metric_decode(intensities, max_distance=0.5, min_intensity=1, norm_order=1)
+
+
+@pytest.mark.parametrize('metric', ['euclidean', 'cosine', 'manhattan'])
+def test_metric_decode_ranks_the_nearest_codes(metric):
+    """
+    With n_neighbors=3, the runner-up targets and distances should be the second and third nearest
+    codes of each feature, and the margin the difference between the two smallest distances. The
+    closest target and distance should not depend on n_neighbors.
+    """
+    np.random.seed(0)
+    codebook = Codebook.synthetic_one_hot_codebook(n_round=4, n_channel=3, n_codes=10)
+    data = np.random.random_sample((200, 3, 4))
+    intensities = intensity_table_factory(data)
+
+    decoded = codebook.metric_decode(
+        intensities.copy(), max_distance=1, min_intensity=0, norm_order=2, metric=metric,
+        n_neighbors=3)
+    nearest = codebook.metric_decode(
+        intensities.copy(), max_distance=1, min_intensity=0, norm_order=2, metric=metric)
+
+    norm_codes, _ = Codebook._normalize_features(codebook, norm_order=2)
+    traces = (Indices.CH.value, Indices.ROUND.value)
+    all_distances = cdist(
+        decoded.transpose(Features.AXIS, *traces).values.reshape(200, -1),
+        norm_codes.transpose(Features.TARGET, *traces).values.reshape(10, -1),
+        metric='cityblock' if metric == 'manhattan' else metric,
+    )
+    expected_distances = np.sort(all_distances, axis=1)
+    expected_targets = codebook[Features.TARGET].values[np.argsort(all_distances, axis=1)]
+
+    assert np.array_equal(decoded[Features.TARGET].values, nearest[Features.TARGET].values)
+    assert np.allclose(decoded[Features.DISTANCE].values, nearest[Features.DISTANCE].values)
+    for rank in (2, 3):
+        assert np.allclose(
+            decoded[Features.RANKED_DISTANCE.format(rank)].values,
+            expected_distances[:, rank - 1])
+        # codes that are equally distant from a feature may be ranked in either order
+        neighbors = expected_distances[:, [rank - 2, rank]]
+        untied = np.all(~np.isclose(expected_distances[:, rank - 1, None], neighbors), axis=1)
+        assert np.array_equal(
+            decoded[Features.RANKED_TARGET.format(rank)].values[untied],
+            expected_targets[untied, rank - 1])
+    assert np.allclose(
+        decoded[Features.MARGIN].values, expected_distances[:, 1] - expected_distances[:, 0])
+    assert Features.MARGIN not in nearest.coords
+
+
+def test_metric_decode_rejects_more_neighbors_than_codes():
+    intensities = intensity_table_factory()
+    codebook = codebook_factory()
+    with pytest.raises(ValueError):
+        codebook.metric_decode(
+            intensities, max_distance=1, min_intensity=0, norm_order=2, n_neighbors=3)
@@ -147,3 +147,34 @@ def test_argmax_selects_the_last_equal_intensity_channel_and_decodes_consistentl
 
     decoded_intensities = codebook.decode_per_round_max(intensities)
     assert np.array_equal(decoded_intensities[Features.TARGET].values, ['nan', 'GENE_A'])
+
+
+def _reference_per_round_max_targets(codebook: Codebook, intensities: IntensityTable):
+    """decode by comparing each feature to every code"""
+    max_channels = intensities.argmax(Indices.CH.value).values
+    codes = codebook.argmax(Indices.CH.value).values
+    targets = np.full(intensities.sizes[Features.AXIS], fill_value='nan', dtype=object)
+    for code, target in zip(codes, codebook[Features.TARGET].values):
+        targets[np.all(max_channels == code, axis=1)] = target
+    return targets.astype('U')
+
+
+@pytest.mark.parametrize('n_round, n_channel', [(4, 3), (40, 4)])
+def test_per_round_max_decode_matches_exhaustive_comparison(n_round, n_channel):
+    """
+    Decode features that exactly match, or are one round away from, the codes of a larger codebook.
+    40 rounds of 4 channels do not fit in an integer key, which exercises the fallback encoding.
+    """
+    np.random.seed(7)
+    codebook = Codebook.synthetic_one_hot_codebook(n_round, n_channel, n_codes=20)
+    codes = codebook.values[np.random.randint(0, 20, size=100)]
+    data = codes * np.random.uniform(0.5, 1, size=codes.shape)
+    # move the max of half the features to another channel in the first round
+    data[::2, :, 0] = np.roll(data[::2, :, 0], 1, axis=1)
+    intensities = intensity_table_factory(data)
+
+    decoded_intensities = codebook.decode_per_round_max(intensities)
+    expected = _reference_per_round_max_targets(codebook, intensities)
+    assert np.array_equal(decoded_intensities[Features.TARGET].values, expected)
+    assert np.array_equal(decoded_intensities[Features.PASSES_THRESHOLDS].values, expected != 'nan')
+    assert np.all(expected[1::2] != 'nan')
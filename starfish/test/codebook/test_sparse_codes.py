@@ -0,0 +1,53 @@
+"""
+Tests for the sparse (COO) codebook representation used to read and write code arrays
+"""
+import numpy as np
+
+from starfish import Codebook
+from starfish.codebook._sparse import SparseCodes
+from starfish.types import Features, Indices
+from .test_from_json import codebook_json_data_factory
+
+
+def random_codebook(n_codes: int=200, n_ch: int=4, n_round: int=16) -> Codebook:
+    np.random.seed(5)
+    data = (np.random.random_sample((n_codes, n_ch, n_round)) < 0.2).astype(np.uint8)
+    codebook = Codebook._empty_codebook([f'GENE_{i}' for i in range(n_codes)], n_ch, n_round)
+    codebook.values[:] = data
+    return codebook
+
+
+def test_code_array_round_trips_through_sparse_codes():
+    code_array = codebook_json_data_factory()
+    sparse = SparseCodes.from_code_array(code_array)
+    assert (sparse.n_ch, sparse.n_round) == (3, 2)
+    assert len(sparse.value) == 4
+
+    # the entries of each codeword are written in (ch, round) order
+    for code in code_array:
+        code[Features.CODEWORD].sort(key=lambda e: (e[Indices.CH.value], e[Indices.ROUND.value]))
+    assert sparse.to_code_array() == code_array
+
+
+def test_to_code_array_lists_the_nonzero_values_of_each_target():
+    codebook = random_codebook()
+    code_array = codebook._to_sparse().to_code_array()
+
+    assert [code[Features.TARGET] for code in code_array] == list(codebook.target.values)
+    for code, values in zip(code_array, codebook.values):
+        ch, round_ = np.nonzero(values)
+        assert code[Features.CODEWORD] == [
+            {Indices.CH.value: c, Indices.ROUND.value: r, Features.CODE_VALUE: 1.0}
+            for c, r in zip(ch.tolist(), round_.tolist())
+        ]
+    assert Codebook.from_code_array(code_array).equals(codebook)
+
+
+def test_codebooks_with_codes_that_are_all_zero_round_trip():
+    codebook = random_codebook(n_codes=3)
+    codebook.values[1] = 0
+    code_array = codebook._to_sparse().to_code_array()
+    assert code_array[1][Features.CODEWORD] == []
+    assert Codebook.from_code_array(
+        code_array, n_ch=codebook.sizes[Indices.CH], n_round=codebook.sizes[Indices.ROUND]
+    ).equals(codebook)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from starfish.experiment.builder import write_experiment_json
+from starfish.experiment.builder.defaultproviders import OnesTile, tile_fetcher_factory
+from starfish.experiment.experiment import Experiment, ImageCache
+from starfish.imagestack.imagestack import ImageStack
+from starfish.types import Indices
+
+TILE_SHAPE = (10, 15)
+# each primary image is 2 rounds x 2 channels x 1 z-layer of float32 tiles
+PRIMARY_IMAGE_NBYTES = 2 * 2 * 1 * TILE_SHAPE[0] * TILE_SHAPE[1] * 4
+
+
+@pytest.fixture(scope="module")
+def experiment_path():
+    with tempfile.TemporaryDirectory() as directory:
+        write_experiment_json(
+            directory,
+            3,
+            {Indices.ROUND: 2, Indices.CH: 2, Indices.Z: 1},
+            {"nuclei": {Indices.ROUND: 1, Indices.CH: 1, Indices.Z: 1}},
+            primary_tile_fetcher=tile_fetcher_factory(OnesTile, False, TILE_SHAPE),
+            aux_tile_fetcher={"nuclei": tile_fetcher_factory(OnesTile, False, TILE_SHAPE)},
+            default_shape=TILE_SHAPE,
+        )
+        yield os.path.join(directory, "experiment.json")
+
+
+def test_pinned_policy_keeps_images(experiment_path):
+    experiment = Experiment.from_json(experiment_path)
+    assert experiment.image_cache.policy == "pinned"
+    for fov in experiment.fovs():
+        assert fov.primary_image is fov.primary_image
+        assert fov["nuclei"] is fov["nuclei"]
+    assert len(experiment.image_cache) == 6
+
+
+def test_no_cache_policy_keeps_nothing(experiment_path):
+    experiment = Experiment.from_json(experiment_path, image_cache=ImageCache("none"))
+    for fov in experiment.fovs():
+        assert fov.primary_image is not fov.primary_image
+    assert len(experiment.image_cache) == 0
+    assert experiment.image_cache.nbytes == 0
+
+
+def test_lru_policy_bounds_bytes(experiment_path):
+    image_cache = ImageCache("lru", max_bytes=2 * PRIMARY_IMAGE_NBYTES)
+    experiment = Experiment.from_json(experiment_path, image_cache=image_cache)
+    fov0, fov1, fov2 = sorted(experiment.fovs(), key=lambda fov: fov.name)
+
+    stack0 = fov0.primary_image
+    fov1.primary_image
+    assert image_cache.nbytes == 2 * PRIMARY_IMAGE_NBYTES
+
+    # accessing fov0 again makes fov1 the least recently used image, which is evicted
+    assert fov0.primary_image is stack0
+    fov2.primary_image
+    assert image_cache.nbytes == 2 * PRIMARY_IMAGE_NBYTES
+    assert fov0.primary_image is stack0
+    assert fov1._cache_key(None) not in image_cache
+
+    # an image larger than the cache is never kept
+    small_cache = ImageCache("lru", max_bytes=PRIMARY_IMAGE_NBYTES - 1)
+    fov0.image_cache = small_cache
+    fov0.primary_image
+    assert len(small_cache) == 0
+
+
+def test_load_image_releases_image(experiment_path):
+    experiment = Experiment.from_json(experiment_path)
+    for fov in experiment.fovs():
+        with fov.load_image() as primary, fov.load_image("nuclei") as nuclei:
+            assert isinstance(primary, ImageStack)
+            assert np.all(primary.numpy_array == 1)
+            assert nuclei.raw_shape == (1, 1, 1, *TILE_SHAPE)
+            assert len(experiment.image_cache) == 2
+        assert len(experiment.image_cache) == 0
+
+    # images that were cached before entering the context manager stay cached
+    fov = experiment.fovs()[0]
+    stack = fov.primary_image
+    with fov.load_image() as primary:
+        assert primary is stack
+    assert fov.primary_image is stack
+
+
+@pytest.mark.parametrize("policy, max_bytes", [("lru", None), ("pinned", 10), ("sometimes", None)])
+def test_invalid_policy(policy, max_bytes):
+    with pytest.raises(ValueError):
+        ImageCache(policy, max_bytes=max_bytes)
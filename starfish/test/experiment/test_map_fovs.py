@@ -0,0 +1,144 @@
+import os
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+from slicedimage import TileSet
+
+from starfish.experiment.builder import write_experiment_json
+from starfish.experiment.builder.defaultproviders import OnesTile, tile_fetcher_factory
+from starfish.experiment.experiment import Experiment
+from starfish.types import Indices
+
+N_FOVS = 5
+
+
+class FovValuedTile(OnesTile):
+    """A tile whose pixels are all equal to the index of its FOV, scaled into [0, 1]"""
+
+    def __init__(self, fov: int, round_: int, ch: int, z: int) -> None:
+        super().__init__((10, 15))
+        self._fov = fov
+
+    @property
+    def tile_data(self) -> np.ndarray:
+        return np.full(shape=self.shape, fill_value=self._fov / 10, dtype=np.float32)
+
+
+def fov_value(fov):
+    """recover the index of a FOV from the pixels of its primary image"""
+    return int(np.round(fov.primary_image.numpy_array.max() * 10))
+
+
+def fail_on_odd_fovs(fov):
+    value = fov_value(fov)
+    if value % 2 == 1:
+        raise ValueError(f"odd fov {fov.name}")
+    return value
+
+
+def kill_worker_on_fov_one(fov):
+    value = fov_value(fov)
+    if value == 1:
+        # exit without cleanup, as a worker killed by the operating system would
+        os._exit(1)
+    return value
+
+
+@pytest.fixture(scope="module")
+def experiment_path():
+    with tempfile.TemporaryDirectory() as directory:
+        write_experiment_json(
+            directory,
+            N_FOVS,
+            {Indices.ROUND: 2, Indices.CH: 2, Indices.Z: 1},
+            {},
+            primary_tile_fetcher=tile_fetcher_factory(FovValuedTile, True),
+            default_shape=(10, 15),
+        )
+        yield os.path.join(directory, "experiment.json")
+
+
+@pytest.mark.parametrize("executor", Experiment.EXECUTORS)
+def test_map_fovs_yields_a_result_per_fov(experiment_path, executor):
+    experiment = Experiment.from_json(experiment_path)
+    results = list(experiment.map_fovs(fov_value, n_workers=2, executor=executor))
+
+    assert sorted(result.name for result in results) == sorted(experiment.keys())
+    for result in results:
+        assert not result.failed
+        assert result.result == int(result.name[-3:])
+
+    # the images materialized by the pipeline are not retained by the experiment
+    for fov in experiment.fovs():
+        assert isinstance(fov._primary_image, TileSet)
+
+
+@pytest.mark.parametrize("executor", Experiment.EXECUTORS)
+def test_map_fovs_records_failures_without_aborting(experiment_path, executor):
+    experiment = Experiment.from_json(experiment_path)
+    results = {
+        result.name: result
+        for result in experiment.map_fovs(fail_on_odd_fovs, n_workers=2, executor=executor)
+    }
+
+    assert len(results) == N_FOVS
+    for name, result in results.items():
+        if int(name[-3:]) % 2 == 1:
+            assert result.failed
+            assert isinstance(result.error, ValueError)
+            assert "odd fov" in result.traceback
+            assert result.result is None
+        else:
+            assert not result.failed
+            assert result.traceback is None
+
+
+def test_map_fovs_retries_the_fovs_in_flight_when_a_worker_dies(experiment_path):
+    experiment = Experiment.from_json(experiment_path)
+    results = {
+        result.name: result
+        for result in experiment.map_fovs(
+            kill_worker_on_fov_one, n_workers=2, executor="process", max_in_flight=3)
+    }
+
+    assert len(results) == N_FOVS
+    for name, result in results.items():
+        if int(name[-3:]) == 1:
+            assert result.failed
+            assert isinstance(result.error, BrokenProcessPool)
+        else:
+            assert not result.failed
+            assert result.result == int(name[-3:])
+
+
+def test_map_fovs_bounds_fovs_in_flight(experiment_path):
+    experiment = Experiment.from_json(experiment_path)
+    in_flight = []
+    max_in_flight = []
+
+    def track(fov):
+        in_flight.append(fov.name)
+        max_in_flight.append(len(in_flight))
+        value = fov_value(fov)
+        in_flight.remove(fov.name)
+        return value
+
+    results = list(
+        experiment.map_fovs(track, n_workers=4, executor="thread", max_in_flight=2))
+    assert len(results) == N_FOVS
+    assert max(max_in_flight) <= 2
+
+
+def test_map_fovs_filters_fovs(experiment_path):
+    experiment = Experiment.from_json(experiment_path)
+    results = list(experiment.map_fovs(
+        fov_value, executor="serial", filter_fn=lambda fov: fov.name.endswith("2")))
+    assert [result.name for result in results] == ["fov_002"]
+
+
+def test_map_fovs_rejects_unknown_executor(experiment_path):
+    experiment = Experiment.from_json(experiment_path)
+    with pytest.raises(ValueError):
+        list(experiment.map_fovs(fov_value, executor="cluster"))
@@ -10,6 +10,7 @@ Contract
 - run accepts an in-place parameter which defaults to True
 - run always returns an ImageStack (if in-place, returns a reference to the modified input data)
 - run accepts an `n_processes` parameter which determines
+- run accepts an `executor` parameter which selects the ImageStack.apply backend
 - run accepts a `verbose` parameter, which triggers tqdm to print progress
 
 To add a new filter, simply add default
@@ -76,6 +77,17 @@ def test_all_methods_adhere_to_contract(filter_class):
     except TypeError as e:
         raise AssertionError(f'{filter_class} must accept n_processes parameter')
 
+    # accepts executor, and produces the same result with each executor
+    data = generate_default_data()
+    expected = instance.run(data, in_place=False, executor="serial")
+    for executor in ("thread", "process"):
+        try:
+            observed = instance.run(data, in_place=False, executor=executor)
+        except TypeError:
+            raise AssertionError(f'{filter_class} must accept executor parameter')
+        assert np.allclose(observed.numpy_array, expected.numpy_array), \
+            f'{filter_class} should produce the same result with the {executor} executor'
+
     # accepts verbose, and if passed, prints progress
     data = generate_default_data()
     try:
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from starfish import ImageStack
+from starfish.image._filter._batch import apply_in_batches
+from starfish.image._filter.gaussian_high_pass import GaussianHighPass
+from starfish.image._filter.gaussian_low_pass import GaussianLowPass
+from starfish.image._filter.mean_high_pass import MeanHighPass
+
+
+def generate_data():
+    data = np.random.rand(2, 3, 4, 30, 40).astype(np.float32)
+    return ImageStack.from_numpy_array(data)
+
+
+@pytest.mark.parametrize("filter_", [
+    GaussianLowPass(sigma=2),
+    GaussianLowPass(sigma=(1, 2, 3), is_volume=True),
+    GaussianHighPass(sigma=3),
+    GaussianHighPass(sigma=(1, 2, 2), is_volume=True),
+    MeanHighPass(size=5),
+    MeanHighPass(size=(3, 5, 5), is_volume=True),
+])
+def test_batched_filter_matches_per_tile_filter(filter_):
+    stack = generate_data()
+    per_tile = filter_.run(stack, in_place=False, executor="serial")
+    batched = filter_.run(stack, in_place=False, executor="batch")
+    assert np.array_equal(batched.numpy_array, per_tile.numpy_array)
+
+
+def test_apply_in_batches_respects_batch_size():
+    stack = generate_data()
+    batch_sizes = []
+
+    def record_batch_size(batch):
+        batch_sizes.append(batch.shape[0])
+        return batch / 2
+
+    tile_bytes = 30 * 40 * 4
+    output = apply_in_batches(
+        stack, record_batch_size, is_volume=False, in_place=True, max_batch_bytes=tile_bytes * 5)
+    assert output is stack
+    assert batch_sizes == [5, 5, 5, 5, 4]
+
+    batch_sizes.clear()
+    expected = stack.numpy_array / 2
+    output = apply_in_batches(stack, record_batch_size, is_volume=True)
+    assert batch_sizes == [6]
+    assert np.array_equal(output.numpy_array, expected)
@@ -19,3 +19,15 @@ def test_zero_by_channel_magnitude_produces_accurate_results():
     zcm = ZeroByChannelMagnitude(thresh=np.inf, normalize=False, is_volume=False)
     filtered = zcm.run(imagestack, in_place=False, n_processes=1)
     assert np.all(filtered.numpy_array == 0)
+
+
+def test_zero_by_channel_magnitude_does_not_modify_input():
+    imagestack = create_imagestack_with_magnitude_scale()
+    original = imagestack.numpy_array.copy()
+
+    zcm = ZeroByChannelMagnitude(thresh=0.5, normalize=False)
+    filtered = zcm.run(imagestack, in_place=False)
+    assert np.array_equal(imagestack.numpy_array, original)
+
+    magnitude = np.linalg.norm(original, axis=1, keepdims=True)
+    assert np.array_equal(filtered.numpy_array, original * (magnitude >= 0.5))
@@ -1,7 +1,11 @@
 import copy
+import os
+from functools import partial
 
 import numpy as np
+import pytest
 
+from starfish.imagestack._shared_memory import apply_in_place, SharedArray
 from starfish.imagestack.imagestack import ImageStack
 from starfish.util.synthesize import SyntheticData
 
@@ -44,3 +48,63 @@ def test_apply_in_place():
     original = copy.deepcopy(image)
     image.apply(divide, value=2, in_place=True)
     assert np.all(image.numpy_array == original.numpy_array / 2)
+
+
+def test_apply_in_place_on_shared_array():
+    """
+    test that the shared memory engine applies a function to each region of a shared array in
+    place, and removes its scratch file on exit
+    """
+    data = np.random.random((2, 3, 4, 5)).astype(np.float32)
+    regions = [(r, c) for r in range(2) for c in range(3)]
+    with SharedArray(data.shape, np.float32) as shared:
+        shared.array[...] = data
+        apply_in_place(shared, partial(divide, value=2), regions, n_processes=2)
+        result = np.array(shared.array)
+        path = shared.path
+        assert os.path.exists(path)
+
+    assert not os.path.exists(path)
+    assert np.allclose(result, data / 2)
+
+
+def test_apply_not_in_place_shares_metadata():
+    """
+    test that apply returns a new stack that shares the tile metadata of the original stack
+    without modifying the original data
+    """
+    image = SyntheticData().spots()
+    original_data = image.numpy_array.copy()
+    output = image.apply(divide, value=2)
+
+    assert np.all(image.numpy_array == original_data)
+    assert np.all(output.numpy_array == original_data / 2)
+    assert output._coordinates is image._coordinates
+    assert output.tile_metadata.equals(image.tile_metadata)
+
+    # each stack has its own tiles, so that writing one stack does not alter the other
+    output_tiles = output._image_partition.tiles()
+    for original_tile, output_tile in zip(image._image_partition.tiles(), output_tiles):
+        assert output_tile is not original_tile
+        assert output_tile.extras is original_tile.extras
+
+
+@pytest.mark.parametrize("executor", ["process", "thread", "serial"])
+def test_apply_executors(executor):
+    """test that each executor produces the same result, both in place and out of place"""
+    image = SyntheticData().spots()
+    original_data = image.numpy_array.copy()
+
+    output = image.apply(divide, value=2, executor=executor, n_processes=2)
+    assert np.all(output.numpy_array == original_data / 2)
+    assert np.all(image.numpy_array == original_data)
+
+    output = image.apply(divide, value=4, is_volume=True, in_place=True, executor=executor)
+    assert output is image
+    assert np.all(image.numpy_array == original_data / 4)
+
+
+def test_apply_rejects_unknown_executor():
+    stack = ImageStack.synthetic_stack()
+    with pytest.raises(ValueError):
+        stack.apply(divide, value=2, executor="cluster")
@@ -0,0 +1,123 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+from skimage import img_as_float32
+
+from starfish.imagestack._tile_io import read_tile_data, read_tile_dtype, TileCache
+from starfish.imagestack.imagestack import ImageStack
+from starfish.types import Indices
+
+
+def divide(array, value):
+    return array / value
+
+
+@pytest.fixture(scope="module")
+def written_stack():
+    """write a random (2, 3, 4, 20, 30) ImageStack to disk, and yield it with its json path"""
+    array = img_as_float32(np.random.randint(0, 2 ** 16, size=(2, 3, 4, 20, 30), dtype=np.uint16))
+    stack = ImageStack.from_numpy_array(array)
+
+    # the synthetic tiles share physical coordinates, so name the tile files by their indices
+    def tile_opener(tileset_path, tile, ext):
+        tile_basename = os.path.splitext(tileset_path)[0]
+        return open(
+            f"{tile_basename}-H{tile.indices[Indices.ROUND]}-C{tile.indices[Indices.CH]}"
+            f"-Z{tile.indices[Indices.Z]}.{ext}",
+            "wb")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "hybridization.json")
+        stack.write(path, tile_opener=tile_opener)
+        yield stack, path
+
+
+def test_lazy_stack_does_not_read_tiles_on_construction(written_stack):
+    _, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    assert not lazy.is_loaded
+    assert len(lazy._tile_cache) == 0
+    assert lazy.raw_shape == (2, 3, 4, 20, 30)
+    assert lazy.shape[Indices.Z] == 4
+
+
+def test_lazy_get_slice_matches_eager(written_stack):
+    stack, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    for indices in (
+            {Indices.ROUND: 1},
+            {Indices.CH: 2, Indices.Z: slice(1, 3)},
+            {Indices.ROUND: 0, Indices.CH: 1, Indices.Z: 3},
+    ):
+        expected, expected_axes = stack.get_slice(indices)
+        observed, observed_axes = lazy.get_slice(indices)
+        assert observed_axes == expected_axes
+        assert np.array_equal(observed, expected)
+    assert not lazy.is_loaded
+
+
+def test_lazy_max_proj_matches_eager(written_stack):
+    stack, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    for dims in ((Indices.Z,), (Indices.ROUND, Indices.CH), (Indices.ROUND, Indices.CH, Indices.Z)):
+        assert np.array_equal(lazy.max_proj(*dims), stack.max_proj(*dims))
+    assert not lazy.is_loaded
+
+
+def test_lazy_apply_matches_eager(written_stack):
+    stack, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    output = lazy.apply(divide, value=2)
+    assert output.is_loaded
+    assert not lazy.is_loaded
+    assert np.array_equal(output.numpy_array, stack.numpy_array / 2)
+
+    volume_output = lazy.apply(divide, value=4, is_volume=True)
+    assert np.array_equal(volume_output.numpy_array, stack.numpy_array / 4)
+
+
+def test_lazy_stack_tile_cache_is_bounded(written_stack):
+    _, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    lazy._tile_cache = TileCache(max_tiles=5)
+    lazy.max_proj(Indices.ROUND, Indices.CH, Indices.Z)
+    assert len(lazy._tile_cache) == 5
+
+
+def test_accessing_numpy_array_loads_lazy_stack(written_stack):
+    stack, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    assert np.array_equal(lazy.numpy_array, stack.numpy_array)
+    assert lazy.is_loaded
+
+
+def test_uncompressed_tiles_are_memory_mapped(written_stack):
+    _, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    tile = next(iter(lazy._image_partition.tiles()))
+    data = read_tile_data(tile)
+    assert isinstance(data, np.memmap)
+
+    # reading the tile data should not store the data on the tile
+    assert tile._numpy_array is None
+
+
+def test_read_tile_dtype_does_not_decode_tiles(written_stack):
+    _, path = written_stack
+    lazy = ImageStack.from_path_or_url(path, lazy=True)
+    for tile in lazy._image_partition.tiles():
+        assert read_tile_dtype(tile) == np.float32
+        assert tile._numpy_array is None
+
+
+@pytest.mark.parametrize("n_io_workers", [1, 4])
+def test_eager_stack_decodes_tiles_concurrently(written_stack, n_io_workers):
+    stack, path = written_stack
+    loaded = ImageStack.from_path_or_url(path, n_io_workers=n_io_workers)
+    assert np.array_equal(loaded.numpy_array, stack.numpy_array)
+
+    # the decoded data is only held by the image tensor, not by the tiles
+    for tile in loaded._image_partition.tiles():
+        assert tile._numpy_array is None
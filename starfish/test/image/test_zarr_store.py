@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from starfish.imagestack._zarr_store import ARRAY_METADATA, is_zarr_store
+from starfish.imagestack.imagestack import ImageStack
+from starfish.types import Coordinates, Indices
+
+
+@pytest.fixture(scope="module")
+def zarr_stack():
+    """write a random (2, 3, 4, 20, 30) ImageStack to a zarr store, and yield it with its path"""
+    array = np.random.rand(2, 3, 4, 20, 30).astype(np.float32)
+    stack = ImageStack.from_numpy_array(array)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "hybridization.zarr")
+        stack.write(path)
+        yield stack, path
+
+
+def test_zarr_store_round_trip(zarr_stack):
+    stack, path = zarr_stack
+    assert is_zarr_store(path)
+
+    loaded = ImageStack.from_path_or_url(path)
+    assert np.array_equal(loaded.numpy_array, stack.numpy_array)
+    assert loaded.tile_metadata.equals(stack.tile_metadata)
+    indices = {Indices.ROUND: 1, Indices.CH: 2, Indices.Z: 3}
+    for axis in (Coordinates.X, Coordinates.Y, Coordinates.Z):
+        assert loaded.coordinates(indices, axis) == stack.coordinates(indices, axis)
+
+
+def test_zarr_store_metadata(zarr_stack):
+    _, path = zarr_stack
+    with open(os.path.join(path, ARRAY_METADATA)) as fh:
+        metadata = json.load(fh)
+    assert metadata["shape"] == [2, 3, 4, 20, 30]
+    assert metadata["chunks"] == [1, 1, 1, 20, 30]
+    assert metadata["dtype"] == "<f4"
+    # one chunk per tile, in addition to the metadata files
+    assert len(os.listdir(path)) == 2 * 3 * 4 + 2
+
+
+def test_lazy_zarr_store_reads_only_requested_tiles(zarr_stack):
+    stack, path = zarr_stack
+    lazy = ImageStack.from_path_or_url(f"file://{path}", lazy=True)
+    assert not lazy.is_loaded
+
+    indices = {Indices.ROUND: 1, Indices.CH: 0}
+    observed, _ = lazy.get_slice(indices)
+    expected, _ = stack.get_slice(indices)
+    assert np.array_equal(observed, expected)
+    assert len(lazy._tile_cache) == 4
+    assert not lazy.is_loaded
+
+
+def test_json_paths_are_not_zarr_stores():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "hybridization.json")
+        ImageStack.synthetic_stack().write(path)
+        assert not is_zarr_store(path)
+        assert not is_zarr_store(directory)
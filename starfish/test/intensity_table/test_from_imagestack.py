@@ -5,7 +5,7 @@ Tests for IntensityTable.from_image_stack method
 import numpy as np
 
 from starfish import ImageStack, IntensityTable
-from starfish.types import Indices
+from starfish.types import Features, Indices
 
 
 # TODO ambrosejcarr: crop is not tested because it should be moved out of this function
@@ -33,3 +33,40 @@ def test_intensity_table_can_be_constructed_from_an_imagestack():
     # the number of channels and hybridizations should match the ImageStack
     assert intensities.sizes[Indices.CH.value] == c
     assert intensities.sizes[Indices.ROUND.value] == r
+
+
+def test_intensity_table_from_imagestack_is_a_view_of_the_imagestack():
+    data = np.random.rand(2, 3, 4, 5, 6).astype(np.float32)
+    image_stack = ImageStack.from_numpy_array(data)
+
+    intensities = IntensityTable.from_image_stack(image_stack)
+    assert np.shares_memory(intensities.values, image_stack.numpy_array)
+
+    # cropping z alone keeps the pixels contiguous
+    intensities = IntensityTable.from_image_stack(image_stack, crop_z=1)
+    assert np.shares_memory(intensities.values, image_stack.numpy_array)
+
+
+def test_intensity_table_from_imagestack_pixel_coordinates_follow_the_raster():
+    r, c, z, y, x = 2, 3, 5, 6, 7
+    data = np.random.rand(r, c, z, y, x).astype(np.float32)
+    image_stack = ImageStack.from_numpy_array(data)
+    intensities = IntensityTable.from_image_stack(image_stack, crop_x=2, crop_y=1, crop_z=1)
+
+    expected_z, expected_y, expected_x = np.meshgrid(
+        np.arange(1, z - 1), np.arange(1, y - 1), np.arange(2, x - 2), indexing='ij')
+    assert np.array_equal(intensities[Indices.Z.value].values, expected_z.ravel())
+    assert np.array_equal(intensities[Indices.Y.value].values, expected_y.ravel())
+    assert np.array_equal(intensities[Indices.X.value].values, expected_x.ravel())
+    assert np.all(intensities[Features.SPOT_RADIUS].values == 0.5)
+
+    # the intensities of each pixel are those of the ImageStack at its coordinates
+    expected = data[:, :, 1:z - 1, 1:y - 1, 2:x - 2].transpose(2, 3, 4, 1, 0).reshape(-1, c, r)
+    assert np.array_equal(intensities.values, expected)
+
+    # the pixel coordinates are int32
+    assert intensities[Indices.Z.value].dtype == np.int32
+
+    selected = intensities.isel(features=[0, 10, 35])
+    assert np.array_equal(selected[Indices.Z.value].values, expected_z.ravel()[[0, 10, 35]])
+    assert np.array_equal(selected[Indices.X.value].values, expected_x.ravel()[[0, 10, 35]])
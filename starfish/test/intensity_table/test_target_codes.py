@@ -0,0 +1,76 @@
+"""
+Tests for the integer encoding of the targets of IntensityTables
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import xarray as xr
+
+from starfish import Codebook, IntensityTable
+from starfish.intensity_table import TARGET_NAMES_ATTRIBUTE
+from starfish.types import Features
+
+
+def decoded_intensity_table_factory():
+    np.random.seed(7)
+    codebook = Codebook.synthetic_one_hot_codebook(n_round=3, n_channel=4, n_codes=6)
+    intensities = IntensityTable.synthetic_intensities(codebook, n_spots=20)
+    decoded = codebook.decode_per_round_max(intensities)
+    return codebook, decoded
+
+
+def test_decoded_targets_are_stored_as_codes_into_the_codebook():
+    codebook, decoded = decoded_intensity_table_factory()
+    codes, names = decoded.target_codes()
+
+    assert codes.dtype.kind == 'i'
+    assert np.array_equal(codes, decoded[Features.TARGET_CODE].values)
+    assert np.array_equal(names, codebook.indexes[Features.TARGET].values)
+    assert np.array_equal(names[codes], decoded[Features.TARGET].values)
+
+
+def test_target_codes_follow_indexing():
+    _, decoded = decoded_intensity_table_factory()
+    codes, names = decoded.target_codes()
+
+    subset = decoded[[3, 1, 4]]
+    subset_codes, subset_names = subset.target_codes()
+    assert np.array_equal(subset_codes, codes[[3, 1, 4]])
+    assert subset_names is names
+    assert np.array_equal(
+        subset[Features.TARGET].values, decoded[Features.TARGET].values[[3, 1, 4]])
+
+
+def test_undecoded_targets_have_code_minus_one():
+    intensities = IntensityTable.synthetic_intensities(
+        Codebook.synthetic_one_hot_codebook(n_round=2, n_channel=2, n_codes=2), n_spots=3)
+    intensities.set_target_codes(np.array([1, -1, 0]), np.array(['a', 'b'], dtype=object))
+    assert np.array_equal(intensities[Features.TARGET].values, ['b', 'nan', 'a'])
+
+    # without target codes, string targets are factorized, with 'nan' mapped to -1
+    intensities = intensities.drop(Features.TARGET_CODE)
+    intensities[Features.TARGET] = (Features.AXIS, np.array(['b', 'nan', 'a']))
+    codes, names = intensities.target_codes()
+    assert codes[1] == -1
+    assert np.array_equal(names[codes[[0, 2]]], ['b', 'a'])
+
+
+def test_targets_are_saved_as_codes():
+    _, decoded = decoded_intensity_table_factory()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'decoded.nc')
+        decoded.save(filename)
+
+        with xr.open_dataarray(filename) as saved:
+            assert Features.TARGET not in saved.coords
+            assert saved[Features.TARGET_CODE].dtype.kind == 'i'
+            assert TARGET_NAMES_ATTRIBUTE in saved.attrs
+
+        loaded = IntensityTable.load(filename)
+        assert decoded.equals(loaded)
+        codes, names = loaded.target_codes()
+        assert np.array_equal(codes, decoded.target_codes()[0])
+        assert np.array_equal(names, decoded.target_codes()[1])
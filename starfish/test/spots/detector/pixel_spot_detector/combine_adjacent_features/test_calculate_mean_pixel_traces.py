@@ -80,3 +80,27 @@ def test_calculate_mean_pixel_traces():
 
     # no values should be filtered, as all spots decoded
     assert np.all(passes_filter)
+
+
+def test_calculate_mean_pixel_traces_matches_groupby_and_does_not_modify_intensities():
+    np.random.seed(2)
+    data = np.random.random_sample((2, 3, 2, 20, 30)).astype(np.float32)
+    intensity_table = IntensityTable.from_image_stack(ImageStack.from_numpy_array(data))
+    intensity_table[Features.DISTANCE] = (
+        Features.AXIS, np.random.random_sample(intensity_table.shape[0]))
+    label_image = label(np.random.randint(0, 3, size=(2, 20, 30)), connectivity=2)
+
+    original = intensity_table.copy(deep=True)
+    mean_pixel_traces = CombineAdjacentFeatures._calculate_mean_pixel_traces(
+        label_image, intensity_table)
+    assert intensity_table.identical(original)
+
+    grouped = original.copy()
+    grouped['spot_id'] = (Features.AXIS, label_image.ravel())
+    expected_traces = grouped.groupby('spot_id').mean(Features.AXIS).drop(0, dim='spot_id')
+    expected_distances = grouped[Features.DISTANCE].groupby('spot_id').mean(Features.AXIS)
+
+    assert np.array_equal(mean_pixel_traces['spot_id'], expected_traces['spot_id'])
+    assert np.allclose(mean_pixel_traces.values, expected_traces.values)
+    assert np.allclose(
+        mean_pixel_traces[Features.DISTANCE].values, expected_distances.values[1:])
@@ -3,7 +3,9 @@ Tests for CombineAdjacentFeatures._create_spot_attributes method
 """
 
 import numpy as np
-from skimage.measure import regionprops
+import pytest
+import xarray as xr
+from skimage.measure import label, regionprops
 
 from starfish.spots._detector.combine_adjacent_features import CombineAdjacentFeatures, TargetsMap
 from starfish.types import Features, Indices, SpotAttributes
@@ -18,11 +20,10 @@ def test_create_spot_attributes():
     """
     # make some fixtures
     intensity_table, label_image, decoded_image = labeled_intensities_factory()
-    region_properties = regionprops(label_image)
     target_map = TargetsMap(np.array(list('abcdef')))
     caf = CombineAdjacentFeatures(min_area=1, max_area=3, connectivity=2)
     spot_attributes, passes_filters = caf._create_spot_attributes(
-        region_properties, decoded_image, target_map
+        label_image, decoded_image, target_map
     )
 
     assert isinstance(spot_attributes, SpotAttributes)
@@ -40,3 +41,51 @@ def test_create_spot_attributes():
     # starts at np.nan, then counts sequentially from 1. Thus, 2 should map to b, and from there
     # the values are sequential. f=6 is not present.
     assert np.array_equal(spot_attributes.data[Features.TARGET].values, list('edcb'))
+
+
+@pytest.mark.parametrize('shape', [(1, 40, 50), (6, 30, 40)])
+def test_create_spot_attributes_matches_regionprops(shape):
+    """
+    Compare the spot attributes of random connected components to those measured from their
+    skimage regionprops, as the attributes were originally created
+    """
+    np.random.seed(11)
+    decoded_image = np.random.randint(0, 4, size=shape) * (np.random.random_sample(shape) < 0.4)
+    label_image = label(decoded_image, connectivity=2)
+    target_map = TargetsMap(np.array(list('abc')))
+    caf = CombineAdjacentFeatures(min_area=2, max_area=6, connectivity=2)
+    spot_attributes, passes_filters = caf._create_spot_attributes(
+        label_image, decoded_image, target_map)
+
+    region_properties = regionprops(np.squeeze(label_image))
+    assert spot_attributes.data.shape[0] == len(region_properties) > 0
+    centroids = np.array([prop.centroid for prop in region_properties]).astype(int)
+    if centroids.shape[1] == 2:
+        centroids = np.column_stack([np.zeros(len(centroids), dtype=int), centroids])
+    for axis, column in zip((Indices.Z, Indices.Y, Indices.X), centroids.T):
+        assert np.array_equal(spot_attributes.data[axis], column)
+    assert np.allclose(
+        spot_attributes.data[Features.SPOT_RADIUS],
+        [prop.equivalent_diameter / 2 for prop in region_properties])
+    assert np.array_equal(
+        spot_attributes.data[Features.TARGET],
+        target_map.targets_as_str(decoded_image[tuple(centroids.T)]))
+    assert np.array_equal(
+        passes_filters, [2 <= prop.area < 6 for prop in region_properties])
+
+
+def test_combine_decoded_image_without_connected_components():
+    decoded_image = np.zeros((1, 5, 5), dtype=int)
+    caf = CombineAdjacentFeatures(min_area=1, max_area=3, connectivity=2)
+
+    def mean_pixel_traces(label_image: np.ndarray) -> xr.DataArray:
+        traces = xr.DataArray(
+            np.zeros((0, 2, 3)), dims=('spot_id', Indices.CH.value, Indices.ROUND.value),
+            coords={Indices.CH.value: np.arange(2), Indices.ROUND.value: np.arange(3)})
+        traces[Features.DISTANCE] = ('spot_id', np.zeros(0))
+        return traces
+
+    intensity_table, results = caf.combine_decoded_image(
+        decoded_image, TargetsMap(np.array(['nan'])), mean_pixel_traces, origin=(0, 1, 1))
+    assert intensity_table.shape == (0, 2, 3)
+    assert results.region_properties == []
@@ -17,3 +17,25 @@ def test_targets_map():
     decoded = target_map.targets_as_str(encoded)
 
     assert np.array_equal(decoded, targets)
+
+
+def test_targets_map_maps_nan_to_zero_and_preserves_shape():
+    targets = np.array([['b', 'nan', 'a'], ['a', 'b', 'nan']])
+    target_map = TargetsMap(targets)
+
+    encoded = target_map.targets_as_int(targets)
+    assert np.array_equal(encoded, [[2, 0, 1], [1, 2, 0]])
+    assert np.array_equal(target_map.targets_as_str(encoded), targets)
+    assert target_map.target_as_str(0) == 'nan'
+
+
+def test_targets_map_from_code_indices():
+    """Test that code indices are mapped to the integer IDs of their targets, and that features
+    that did not decode are mapped to zero"""
+    code_targets = np.array(['c', 'a', 'b', 'a'])
+    code_indices = np.array([[3, -1], [2, 1]])
+
+    target_map, target_ids = TargetsMap.from_code_indices(code_targets, code_indices)
+
+    assert np.array_equal(target_ids, [[1, 0], [2, 1]])
+    assert np.array_equal(target_map.targets_as_str(target_ids), [['a', 'nan'], ['b', 'a']])
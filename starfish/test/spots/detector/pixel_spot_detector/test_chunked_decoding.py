@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from starfish import Codebook, ImageStack
+from starfish.spots._detector.pixel_spot_detector import PixelSpotDetector
+from starfish.types import Features, Indices
+
+
+def multiplexed_stack_and_codebook():
+    """a (3 round, 2 ch, 2 z, 40 y, 50 x) stack containing 3x3 spots of the codes of a one-hot
+    codebook, some of which span more than one chunk"""
+    rng = np.random.RandomState(0)
+    codebook = Codebook.synthetic_one_hot_codebook(n_round=3, n_channel=2, n_codes=4)
+    data = rng.random_sample((3, 2, 2, 40, 50)).astype(np.float32) * 0.05
+    codes = codebook.transpose(Features.TARGET, Indices.ROUND.value, Indices.CH.value).values
+    positions = [(0, 5, 5), (1, 9, 30), (0, 20, 44), (1, 30, 10), (0, 38, 20)]
+    for i, (z, y, x) in enumerate(positions):
+        intensity = 0.5 + 0.4 * rng.random_sample()
+        data[:, :, z, y:y + 3, x:x + 3] += codes[i % len(codes)][:, :, None, None] * intensity
+    return ImageStack.from_numpy_array(data), codebook
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "manhattan"])
+def test_chunked_decoding_matches_decoding_all_pixels(metric):
+    stack, codebook = multiplexed_stack_and_codebook()
+    parameters = dict(
+        codebook=codebook, metric=metric, distance_threshold=0.5, magnitude_threshold=0.5,
+        min_area=2, max_area=np.inf,
+    )
+    expected, expected_results = PixelSpotDetector(**parameters).run(stack)
+    observed, observed_results = PixelSpotDetector(chunk_shape=(1, 8), **parameters).run(stack)
+
+    assert np.array_equal(observed_results.decoded_image, expected_results.decoded_image)
+    assert np.array_equal(observed_results.label_image, expected_results.label_image)
+    assert observed.sizes[Features.AXIS] == expected.sizes[Features.AXIS] == 5
+    assert np.allclose(observed.values, expected.values)
+    for coord in ('z', 'y', 'x', Features.TARGET, Features.PASSES_THRESHOLDS):
+        assert np.array_equal(observed[coord].values, expected[coord].values)
+    assert np.allclose(observed[Features.DISTANCE].values, expected[Features.DISTANCE].values)
+
+
+def test_chunked_decoding_offsets_cropped_spots():
+    stack, codebook = multiplexed_stack_and_codebook()
+    detector = PixelSpotDetector(
+        codebook=codebook, metric="euclidean", distance_threshold=0.5, magnitude_threshold=0.5,
+        min_area=2, max_area=np.inf, crop_x=2, crop_y=3, chunk_shape=(2, 16),
+    )
+    spots, results = detector.run(stack)
+    assert results.decoded_image.shape == (2, 34, 46)
+    assert np.array_equal(np.sort(spots['y'].values), [6, 10, 21, 31])
+
+
+def test_chunked_decoding_reads_a_lazy_stack_chunk_by_chunk():
+    stack, codebook = multiplexed_stack_and_codebook()
+    parameters = dict(
+        codebook=codebook, metric="euclidean", distance_threshold=0.5, magnitude_threshold=0.5,
+        min_area=2, max_area=np.inf, crop_x=2, crop_y=3, chunk_shape=(1, 16),
+    )
+    expected, expected_results = PixelSpotDetector(**parameters).run(stack)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stack.zarr")
+        stack.write(path)
+        lazy = ImageStack.from_path_or_url(path, lazy=True)
+        observed, observed_results = PixelSpotDetector(**parameters).run(lazy)
+
+    assert not lazy.is_loaded
+    assert np.array_equal(observed_results.label_image, expected_results.label_image)
+    assert np.allclose(observed.values, expected.values)
+    assert np.array_equal(observed[Features.TARGET].values, expected[Features.TARGET].values)
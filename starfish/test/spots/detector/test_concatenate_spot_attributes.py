@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from starfish.spots._detector.detect import concatenate_spot_attributes_to_intensities
+from starfish.types import Features, Indices, SpotAttributes
+
+
+def spot_attributes(n_spots: int, intensity_offset: float) -> SpotAttributes:
+    return SpotAttributes(pd.DataFrame({
+        'z': np.zeros(n_spots, dtype=int),
+        'y': np.arange(n_spots),
+        'x': np.arange(n_spots),
+        Features.SPOT_RADIUS: np.ones(n_spots),
+        'spot_id': np.arange(n_spots),
+        'intensity': intensity_offset + np.arange(n_spots) / 10,
+    }))
+
+
+def test_concatenate_spot_attributes_to_intensities():
+    attributes = [
+        (spot_attributes(3, 1), {Indices.CH: 0, Indices.ROUND: 1}),
+        (spot_attributes(0, 2), {Indices.CH: 1, Indices.ROUND: 1}),
+        (spot_attributes(2, 3), {Indices.CH: 2, Indices.ROUND: 0}),
+    ]
+    intensity_table = concatenate_spot_attributes_to_intensities(attributes)
+
+    assert intensity_table.sizes[Features.AXIS] == 5
+    assert intensity_table.sizes[Indices.CH.value] == 3
+    assert intensity_table.sizes[Indices.ROUND.value] == 2
+    assert 'intensity' not in intensity_table.coords
+
+    expected = np.zeros((5, 3, 2))
+    expected[[0, 1, 2], 0, 1] = [1, 1.1, 1.2]
+    expected[[3, 4], 2, 0] = [3, 3.1]
+    assert np.allclose(intensity_table.values, expected)
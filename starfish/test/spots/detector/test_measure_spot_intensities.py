@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from starfish.imagestack.imagestack import ImageStack
+from starfish.spots._detector.detect import (
+    _measure_boxes,
+    _spot_bounding_boxes,
+    measure_spot_intensities,
+    measure_spot_intensity,
+)
+from starfish.types import Features, SpotAttributes
+
+
+def random_spots(n_spots: int, shape, seed: int=0) -> SpotAttributes:
+    """spots at random locations of a (z, y, x) volume, with radii between 0 and 3"""
+    rng = np.random.RandomState(seed)
+    return SpotAttributes(pd.DataFrame({
+        'z': rng.randint(0, shape[0], n_spots),
+        'y': rng.randint(0, shape[1], n_spots),
+        'x': rng.randint(0, shape[2], n_spots),
+        Features.SPOT_RADIUS: rng.randint(0, 4, n_spots).astype(float),
+    }))
+
+
+def measure_each_box(volume: np.ndarray, boxes: np.ndarray, measurement_function) -> np.ndarray:
+    """measure each box on its own, as the vectorized measurement should"""
+    measurements = []
+    for z_min, z_max, y_min, y_max, x_min, x_max in boxes:
+        data = volume[z_min:z_max, y_min:y_max, x_min:x_max]
+        measurements.append(measurement_function(data) if data.size else np.nan)
+    return np.array(measurements)
+
+
+@pytest.mark.parametrize("measurement_function", [np.max, np.min, np.mean, np.median, np.ptp])
+def test_measure_boxes_matches_per_box_measurement(measurement_function):
+    volume = np.random.RandomState(1).rand(5, 40, 50).astype(np.float32)
+    spots = random_spots(200, volume.shape)
+    boxes = _spot_bounding_boxes(spots, volume.shape)
+
+    # use a small gather size so that the boxes are measured in several batches
+    measured = _measure_boxes(volume, boxes, measurement_function, max_gather_bytes=1024)
+    expected = measure_each_box(volume, boxes, measurement_function)
+    assert np.allclose(measured, expected, equal_nan=True, rtol=1e-5)
+
+
+def test_measure_spot_intensity_returns_series_aligned_with_spots():
+    volume = np.random.RandomState(2).rand(5, 40, 50).astype(np.float32)
+    spots = random_spots(50, volume.shape)
+    spots.data.index = np.arange(100, 150)
+    intensities = measure_spot_intensity(volume, spots, np.max, radius_is_gyration=True)
+    assert isinstance(intensities, pd.Series)
+    assert np.array_equal(intensities.index, spots.data.index)
+    boxes = spots.data[['z_min', 'z_max', 'y_min', 'y_max', 'x_min', 'x_max']].values
+    assert np.allclose(intensities.values, measure_each_box(volume, boxes, np.max))
+
+
+def test_measure_spot_intensities_fills_every_channel_and_round():
+    data = np.random.RandomState(3).rand(2, 3, 5, 40, 50).astype(np.float32)
+    stack = ImageStack.from_numpy_array(data)
+    spots = random_spots(100, data.shape[-3:])
+    intensity_table = measure_spot_intensities(stack, spots, np.mean)
+
+    boxes = _spot_bounding_boxes(spots, data.shape[-3:])
+    for r in range(2):
+        for c in range(3):
+            expected = measure_each_box(data[r, c], boxes, np.mean)
+            assert np.allclose(
+                intensity_table.values[:, c, r], expected, equal_nan=True, rtol=1e-5)
@@ -0,0 +1,71 @@
+"""
+Tests for detecting spots tile by tile with GaussianSpotDetector
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.ndimage.filters import gaussian_filter
+
+from starfish.spots._detector.gaussian import _tile_halo, _tiles, GaussianSpotDetector
+from starfish.types import Indices
+
+
+def spot_volume_factory() -> np.ndarray:
+    """a (12, 60, 70) volume of gaussian spots, including spots that straddle the boundaries of
+    20-pixel tiles and pairs of spots close enough to be pruned"""
+    np.random.seed(3)
+    volume = np.zeros((12, 60, 70), dtype=np.float32)
+    centers = np.column_stack([
+        np.random.randint(2, 10, size=40),
+        np.random.randint(0, 60, size=40),
+        np.random.randint(0, 70, size=40),
+    ])
+    boundary_centers = [(5, 20, 10), (6, 39, 40), (4, 19, 20), (7, 21, 21), (5, 40, 60)]
+    for z, y, x in np.concatenate([centers, boundary_centers]):
+        volume[z, y, x] = 1
+    return gaussian_filter(volume, sigma=(1, 2, 2))
+
+
+def sorted_spots(spots) -> pd.DataFrame:
+    columns = [Indices.Z.value, Indices.Y.value, Indices.X.value]
+    return spots.data.sort_values(columns).reset_index(drop=True)
+
+
+def test_tiles_partition_the_volume():
+    shape = (5, 23, 17)
+    covered = np.zeros(shape, dtype=int)
+    for core, block in _tiles(shape, tile_size=8, halo=3):
+        covered[core] += 1
+        for core_axis, block_axis, size in zip(core, block, shape):
+            assert block_axis.start == max(core_axis.start - 3, 0)
+            assert block_axis.stop == min(core_axis.stop + 3, size)
+    assert np.all(covered == 1)
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_tiled_detection_matches_whole_volume(executor):
+    volume = spot_volume_factory()
+    parameters = dict(min_sigma=1, max_sigma=2, num_sigma=3, threshold=0.002)
+
+    expected = GaussianSpotDetector(**parameters).image_to_spots(volume)
+    tiled = GaussianSpotDetector(
+        **parameters, tile_size=20, n_processes=2, executor=executor).image_to_spots(volume)
+
+    assert _tile_halo(parameters["max_sigma"]) < 20
+    assert len(expected.data) > 0
+    observed = sorted_spots(tiled).drop('spot_id', axis=1)
+    pd.testing.assert_frame_equal(observed, sorted_spots(expected).drop('spot_id', axis=1))
+    assert np.array_equal(tiled.data['spot_id'], np.arange(len(tiled.data)))
+
+
+def test_tiled_detection_of_an_empty_volume():
+    volume = np.zeros((4, 30, 30), dtype=np.float32)
+    detector = GaussianSpotDetector(
+        min_sigma=1, max_sigma=2, num_sigma=3, threshold=0.01, tile_size=10, executor="serial")
+    assert len(detector.image_to_spots(volume).data) == 0
+
+
+def test_invalid_tile_size_raises_value_error():
+    with pytest.raises(ValueError):
+        GaussianSpotDetector(min_sigma=1, max_sigma=2, num_sigma=3, threshold=0.01, tile_size=0)
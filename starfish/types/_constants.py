@@ -54,9 +54,14 @@ class Features:
 
     AXIS = 'features'
     TARGET = 'target'
+    TARGET_CODE = 'target_code'
     CODEWORD = 'codeword'
     CODE_VALUE = 'v'
     SPOT_RADIUS = 'radius'
     DISTANCE = 'distance'
+    RANKED_TARGET = 'target_{}'
+    RANKED_DISTANCE = 'distance_{}'
+    MARGIN = 'margin'
+    ERROR_CORRECTED = 'error_corrected'
     PASSES_THRESHOLDS = 'passes_thresholds'
     CELL_ID = 'cell_id'